@@ -1,13 +1,24 @@
 # app.py - Dashboard de Ventas Farmacéuticas
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file, send_from_directory, jsonify, Response, g
+from flask import before_render_template, template_rendered
+from markupsafe import escape
 from dotenv import load_dotenv
 from odoo_manager import OdooManager
+from utils.sales_aggregation import aggregate_sales
+from services.metrics import odoo_metrics, current_endpoint
+from services import request_timing
+from services.slow_log import slow_call_log
+from services.memory_profile import memory_profiler
+from services.request_profile import profile_store
+from services.sampling_profiler import sampling_profiler
+import hmac
 import os
 import pandas as pd
 import json
 import io
 import calendar
+import time
 from datetime import datetime, timedelta
 
 load_dotenv()
@@ -21,6 +32,21 @@ app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 # --- Inicialización de Managers ---
 data_manager = OdooManager()
 
+# Pre-calentado de cachés en segundo plano (un solo worker lo ejecuta)
+if os.getenv('PREWARM_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+    data_manager.prewarmer.start()
+
+# Espejo local de Odoo (ODOO_MIRROR): un worker sincroniza, todos leen
+if data_manager.mirror is not None:
+    data_manager.mirror.start()
+
+# Perfilado de memoria por endpoint (opcional, MEMORY_PROFILE=true)
+if memory_profiler.enabled:
+    memory_profiler.start()
+
+# Profiler de muestreo continuo (SAMPLING_PROFILER, /debug/profile)
+sampling_profiler.start()
+
 # Almacenamiento local para metas (reemplaza Google Sheets)
 # En producción, esto debería ser una base de datos
 LOCAL_STORAGE = {
@@ -44,6 +70,200 @@ def get_meses_del_año(año):
         meses_disponibles.append({'key': mes_key, 'nombre': mes_nombre})
     return meses_disponibles
 
+def token_valido(enviado, token):
+    """Compara el token en tiempo constante (no revela por tiempos cuánto coincide)."""
+    if not enviado or not token:
+        return False
+    return hmac.compare_digest(enviado.encode('utf-8'), token.encode('utf-8'))
+
+def metrics_autorizado():
+    """
+    Acceso a las métricas: con METRICS_TOKEN configurado se exige el token
+    (cabecera 'Authorization: Bearer ...' o parámetro ?token=, para
+    Prometheus); si no, basta con una sesión iniciada.
+    """
+    token = os.getenv('METRICS_TOKEN')
+    if token:
+        enviado = request.headers.get('Authorization', '').replace('Bearer ', '', 1) or request.args.get('token')
+        return token_valido(enviado, token)
+    return 'username' in session
+
+PROFILE_ADMINS = {u.strip() for u in os.getenv('PROFILE_ADMINS', '').split(',') if u.strip()}
+
+def perfil_autorizado():
+    """
+    Perfilado bajo demanda: solo con el token de métricas (cabecera
+    'Authorization: Bearer ...') o para los usuarios de PROFILE_ADMINS.
+    """
+    token = os.getenv('METRICS_TOKEN')
+    if token and token_valido(request.headers.get('Authorization', '').replace('Bearer ', '', 1), token):
+        return True
+    return session.get('username') in PROFILE_ADMINS
+
+# La cabecera Server-Timing expone modelos/métodos de Odoo y sus tiempos: por
+# defecto solo se envía a los administradores (PROFILE_ADMINS o METRICS_TOKEN);
+# SERVER_TIMING=true la activa para todos (entornos internos)
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+SERVER_TIMING_FOOTER = os.getenv('SERVER_TIMING_FOOTER', 'false').lower() in ('1', 'true', 'yes')
+
+@app.before_request
+def registrar_endpoint():
+    # Etiqueta las llamadas a Odoo de esta request con su endpoint
+    current_endpoint.set(request.endpoint or request.path)
+    if SERVER_TIMING or perfil_autorizado():
+        g.timing_token = request_timing.start_request()
+    if memory_profiler.enabled:
+        memory_profiler.begin_request(request.endpoint or request.path)
+    # Perfilado cProfile bajo demanda (?__profile=1|text o cabecera X-Profile)
+    modo = request.args.get('__profile') or request.headers.get('X-Profile')
+    if modo and perfil_autorizado():
+        g.perfil = profile_store.begin(request.endpoint or request.path)
+        g.perfil_modo = modo
+
+@app.after_request
+def guardar_perfil(response):
+    perfil = g.pop('perfil', None)
+    if perfil is None:
+        if g.get('perfil_modo'):
+            response.headers['X-Profile'] = 'busy'
+        return response
+    perfil.stop()
+    profile_id = profile_store.save(perfil)
+    if g.perfil_modo == 'text':
+        response = Response(perfil.text_report(), mimetype='text/plain')
+    response.headers['X-Profile-Id'] = profile_id
+    return response
+
+@app.teardown_request
+def cerrar_perfiles(exc):
+    # Si la request falló antes de after_request el perfilador no puede quedar activo
+    perfil = g.pop('perfil', None)
+    if perfil is not None:
+        perfil.stop()
+    if memory_profiler.enabled:
+        memory_profiler.end_request()
+    # El hilo del worker atiende la siguiente request: sin esto heredaría el registro
+    if 'timing_token' in g:
+        request_timing.end_request(g.pop('timing_token'))
+
+def _inicio_render(sender, template, context, **extra):
+    g.render_inicio = time.perf_counter()
+
+def _fin_render(sender, template, context, **extra):
+    timer = request_timing.current()
+    inicio = g.pop('render_inicio', None)
+    if timer is not None and inicio is not None:
+        timer.add_section('render', time.perf_counter() - inicio)
+
+before_render_template.connect(_inicio_render, app)
+template_rendered.connect(_fin_render, app)
+
+def _pie_tiempos(breakdown):
+    """Pie de página de depuración con el desglose de tiempos."""
+    filas = ''.join(
+        f'<tr><td>{escape(desc)}</td><td style="text-align:right">{ms:,.1f} ms</td></tr>'
+        for _, desc, ms in breakdown
+    )
+    return (
+        '<div id="server-timing" style="position:fixed;bottom:0;right:0;z-index:9999;'
+        'background:#fff;border:1px solid #ccc;font:12px monospace;padding:6px;opacity:.9">'
+        f'<table>{filas}</table></div>'
+    )
+
+@app.after_request
+def agregar_server_timing(response):
+    timer = request_timing.current()
+    if timer is None:
+        return response
+    breakdown = timer.breakdown()
+    response.headers['Server-Timing'] = ', '.join(
+        f'{name};desc="{desc}";dur={ms:.1f}' for name, desc, ms in breakdown
+    )
+    # Pie de depuración opcional (?__timing=1 o SERVER_TIMING_FOOTER) para usuarios con sesión
+    quiere_pie = SERVER_TIMING_FOOTER or request.args.get('__timing') == '1'
+    if quiere_pie and 'username' in session and response.mimetype == 'text/html' and not response.direct_passthrough:
+        html = response.get_data(as_text=True)
+        if '</body>' in html:
+            response.set_data(html.replace('</body>', _pie_tiempos(breakdown) + '</body>', 1))
+    return response
+
+# --- MÉTRICAS DE LLAMADAS A ODOO ---
+@app.route('/metrics')
+def metrics():
+    if not metrics_autorizado():
+        return Response('No autorizado\n', status=401, mimetype='text/plain')
+    return Response(odoo_metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/summary')
+def metrics_summary():
+    if not metrics_autorizado():
+        return jsonify({'error': 'No autorizado'}), 401
+    return jsonify(odoo_metrics.summary(request.args.get('endpoint')))
+
+@app.route('/metrics/slow_calls')
+def metrics_slow_calls():
+    # Llamadas lentas a Odoo agregadas por huella de dominio (este worker)
+    if not metrics_autorizado():
+        return jsonify({'error': 'No autorizado'}), 401
+    return jsonify({
+        'threshold_ms': slow_call_log.threshold_ms,
+        'log': slow_call_log.path,
+        'fingerprints': slow_call_log.summary(),
+    })
+
+@app.route('/metrics/memory')
+def metrics_memory():
+    # Pico de memoria y sitios de asignación por endpoint (MEMORY_PROFILE=true)
+    if not metrics_autorizado():
+        return jsonify({'error': 'No autorizado'}), 401
+    if request.args.get('reset') == '1':
+        memory_profiler.reset()
+    return jsonify({
+        'enabled': memory_profiler.enabled,
+        'sample_rate': memory_profiler.sample_rate,
+        'routes': memory_profiler.summary(),
+    })
+
+@app.route('/metrics/mirror')
+def metrics_mirror():
+    # Estado del espejo local de Odoo (ODOO_MIRROR)
+    if not metrics_autorizado():
+        return jsonify({'error': 'No autorizado'}), 401
+    if data_manager.mirror is None:
+        return jsonify({'enabled': False})
+    estado = data_manager.mirror.status()
+    estado['enabled'] = True
+    return jsonify(estado)
+
+@app.route('/debug/profile')
+def debug_profile():
+    # Pilas muestreadas de este worker en la ventana móvil
+    if not perfil_autorizado():
+        return jsonify({'error': 'No autorizado'}), 401
+    minutos = request.args.get('minutes', type=float)
+    if request.args.get('reset') == '1':
+        sampling_profiler.reset()
+    if request.args.get('format') == 'collapsed':
+        return Response(sampling_profiler.collapsed(minutos), mimetype='text/plain')
+    resumen = sampling_profiler.summary(minutos, top=request.args.get('top', 30, type=int))
+    resumen['pid'] = os.getpid()
+    return jsonify(resumen)
+
+@app.route('/debug/profiles')
+def debug_profiles():
+    if not perfil_autorizado():
+        return jsonify({'error': 'No autorizado'}), 401
+    return jsonify(profile_store.list())
+
+@app.route('/debug/profiles/<path:nombre>')
+def debug_profile_file(nombre):
+    # Descarga de un .pstats o .collapsed
+    if not perfil_autorizado():
+        return jsonify({'error': 'No autorizado'}), 401
+    if not nombre.endswith(('.pstats', '.collapsed')):
+        return jsonify({'error': 'Archivo no válido'}), 404
+    return send_from_directory(os.path.abspath(profile_store.directory), nombre, as_attachment=True)
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
@@ -180,22 +400,11 @@ def dashboard():
         
         # Obtener datos reales de ventas desde Odoo
         try:
-            # Calcular fechas para el mes seleccionado
-            año_sel, mes_sel = mes_seleccionado.split('-')
-            fecha_inicio = f"{año_sel}-{mes_sel}-01"
-            
-            # Último día del mes
-            ultimo_dia = calendar.monthrange(int(año_sel), int(mes_sel))[1]
-            fecha_fin = f"{año_sel}-{mes_sel}-{ultimo_dia}"
-            
-            # Obtener datos de ventas reales desde Odoo
-            sales_data = data_manager.get_sales_lines(
-                date_from=fecha_inicio,
-                date_to=fecha_fin,
-                limit=5000
-            )
+            # Cubo de ventas del mes: el completo si ya está en memoria; si no,
+            # agregado en Odoo por producto (read_group)
+            sales_data = data_manager.get_dashboard_sales_cube(mes_seleccionado)
             
-            print(f"📊 Obtenidas {len(sales_data)} líneas de ventas para el dashboard")
+            print(f"📊 Obtenidas {len(sales_data)} celdas del cubo de ventas para el dashboard")
             
         except Exception as e:
             print(f"⚠️ Error obteniendo datos de Odoo: {e}")
@@ -221,66 +430,12 @@ def dashboard():
             'LICITACIÓN': 'licitacion'
         }
         
-        # Calcular ventas reales por línea comercial
-        ventas_por_linea = {}
-        ventas_por_ruta = {}
-        ventas_ipn_por_linea = {} # Nueva variable para ventas de productos nuevos
-        ventas_por_producto = {}
-        ciclo_vida_por_producto = {}
-        ventas_por_ciclo_vida = {}
-        ventas_por_forma = {}
-        for sale in sales_data:
-            # Excluir VENTA INTERNACIONAL (exportaciones)
-            linea_comercial = sale.get('commercial_line_national_id')
-            nombre_linea_actual = None
-            if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
-                nombre_linea_actual = linea_comercial[1].upper()
-                if 'VENTA INTERNACIONAL' in nombre_linea_actual:
-                    continue
-            
-            # También filtrar por canal de ventas
-            canal_ventas = sale.get('sales_channel_id')
-            if canal_ventas and isinstance(canal_ventas, list) and len(canal_ventas) > 1:
-                nombre_canal = canal_ventas[1].upper()
-                if 'VENTA INTERNACIONAL' in nombre_canal or 'INTERNACIONAL' in nombre_canal:
-                    continue
-            
-            # Procesar el balance de la venta
-            balance_float = float(sale.get('balance', 0))
-            if balance_float != 0:
-                
-                # Sumar a ventas totales por línea
-                if nombre_linea_actual:
-                    ventas_por_linea[nombre_linea_actual] = ventas_por_linea.get(nombre_linea_actual, 0) + balance_float
-                
-                # LÓGICA FINAL: Sumar si la RUTA (route_id) coincide con los valores especificados
-                ruta = sale.get('route_id')
-                # Se cambia la comparación al ID de la ruta (ruta[0]) para evitar problemas con traducciones.
-                if isinstance(ruta, list) and len(ruta) > 0 and ruta[0] in [18, 19]:
-                    if nombre_linea_actual:
-                        ventas_por_ruta[nombre_linea_actual] = ventas_por_ruta.get(nombre_linea_actual, 0) + balance_float
-                
-                # Sumar a ventas de productos nuevos (IPN) - Lógica restaurada
-                ciclo_vida = sale.get('product_life_cycle')
-                if ciclo_vida and ciclo_vida == 'nuevo':
-                    if nombre_linea_actual:
-                        ventas_ipn_por_linea[nombre_linea_actual] = ventas_ipn_por_linea.get(nombre_linea_actual, 0) + balance_float
-                
-                # Agrupar por producto para Top 7
-                producto_nombre = sale.get('name', '').strip()
-                if producto_nombre:
-                    ventas_por_producto[producto_nombre] = ventas_por_producto.get(producto_nombre, 0) + balance_float
-                    if producto_nombre not in ciclo_vida_por_producto:
-                        ciclo_vida_por_producto[producto_nombre] = ciclo_vida
-                
-                # Agrupar por ciclo de vida para el gráfico de dona
-                ciclo_vida_grafico = ciclo_vida if ciclo_vida else 'No definido'
-                ventas_por_ciclo_vida[ciclo_vida_grafico] = ventas_por_ciclo_vida.get(ciclo_vida_grafico, 0) + balance_float
-
-                # Agrupar por forma farmacéutica para el gráfico de ECharts
-                forma_farmaceutica = sale.get('pharmaceutical_forms_id')
-                nombre_forma = forma_farmaceutica[1] if forma_farmaceutica and isinstance(forma_farmaceutica, list) and len(forma_farmaceutica) > 1 else 'Instrumental'
-                ventas_por_forma[nombre_forma] = ventas_por_forma.get(nombre_forma, 0) + balance_float
+        # Calcular todos los desgloses en una sola pasada vectorizada
+        with request_timing.measure('aggregation'):
+            agregados = aggregate_sales(sales_data)
+        ventas_por_linea = agregados['ventas_por_linea']
+        ventas_por_ruta = agregados['ventas_ruta_por_linea']
+        ventas_ipn_por_linea = agregados['ventas_ipn_por_linea'] # Ventas de productos nuevos
 
         print(f"💰 Ventas por línea comercial: {ventas_por_linea}")
         print(f"📦 Ventas por Vencimiento (Ciclo de Vida): {ventas_por_ruta}")
@@ -335,39 +490,16 @@ def dashboard():
             'avance_diario_ipn': ((total_venta_pn / total_meta_pn * 100) / dia_actual) if total_meta_pn > 0 and dia_actual > 0 else 0
         }
         
-        # 3. Ordenar productos para el gráfico Top 7
-        # Ordenar productos por ventas y tomar los top 7
-        productos_ordenados = sorted(ventas_por_producto.items(), key=lambda x: x[1], reverse=True)[:7]
-        
-        datos_productos = []
-        for nombre_producto, venta in productos_ordenados:
-            datos_productos.append({
-                'nombre': nombre_producto,
-                'venta': venta,
-                'ciclo_vida': ciclo_vida_por_producto.get(nombre_producto, 'No definido')
-            })
+        # 3. Top 7 productos, ciclo de vida y forma farmacéutica (ya ordenados)
+        datos_productos = agregados['top_productos']
         
         print(f"🏆 Top 7 productos por ventas: {[p['nombre'] for p in datos_productos]}")
         
-        # 4. Ordenar datos para el gráfico de Ciclo de Vida
-        # Convertir a lista ordenada por ventas
-        datos_ciclo_vida = []
-        for ciclo, venta in sorted(ventas_por_ciclo_vida.items(), key=lambda x: x[1], reverse=True):
-            datos_ciclo_vida.append({
-                'ciclo': ciclo,
-                'venta': venta
-            })
+        datos_ciclo_vida = agregados['ciclo_vida']
         
         print(f"📈 Ventas por Ciclo de Vida: {datos_ciclo_vida}")
         
-        # 5. Ordenar datos para el gráfico de Forma Farmacéutica
-        # Convertir a lista ordenada por ventas
-        datos_forma_farmaceutica = []
-        for forma, venta in sorted(ventas_por_forma.items(), key=lambda x: x[1], reverse=True):
-            datos_forma_farmaceutica.append({
-                'forma': forma,
-                'venta': venta
-            })
+        datos_forma_farmaceutica = agregados['forma_farmaceutica']
         
         return render_template('dashboard_clean.html',
                              meses_disponibles=meses_disponibles,
@@ -378,7 +510,7 @@ def dashboard():
                              datos_lineas=datos_lineas, # Usar para gráficos
                              datos_lineas_tabla=datos_lineas, # Usar para la tabla
                              datos_productos=datos_productos,
-                             datos_ciclo_vida=datos_ciclo_vida if 'datos_ciclo_vida' in locals() else [],
+                             datos_ciclo_vida=datos_ciclo_vida,
                              datos_forma_farmaceutica=datos_forma_farmaceutica)
     
     except Exception as e:
@@ -447,11 +579,6 @@ def dashboard_linea():
         linea_seleccionada_id = mapeo_nombre_a_id.get(linea_seleccionada_nombre.upper(), 'petmedica')
 
         # --- 2. OBTENER DATOS ---
-        año_sel, mes_sel = mes_seleccionado.split('-')
-        fecha_inicio = f"{año_sel}-{mes_sel}-01"
-        ultimo_dia = calendar.monthrange(int(año_sel), int(mes_sel))[1]
-        fecha_fin = f"{año_sel}-{mes_sel}-{ultimo_dia}"
-
         # Cargar metas de vendedores para el mes y línea seleccionados
         # La estructura es metas[equipo_id][vendedor_id][mes_key]
         metas_vendedores_historicas = LOCAL_STORAGE.get('metas_vendedores', {})
@@ -461,56 +588,16 @@ def dashboard_linea():
         # Obtener todos los vendedores de Odoo
         todos_los_vendedores = {str(v['id']): v['name'] for v in data_manager.get_all_sellers()}
 
-        # Obtener ventas del mes
-        sales_data = data_manager.get_sales_lines(
-            date_from=fecha_inicio,
-            date_to=fecha_fin,
-            limit=10000
-        )
+        # Cubo de ventas del mes (materializado en memoria)
+        sales_data = data_manager.get_sales_cube(mes_seleccionado)
 
         # --- 3. PROCESAR Y AGREGAR DATOS POR VENDEDOR ---
-        ventas_por_vendedor = {}
-        ventas_ipn_por_vendedor = {}
-        ventas_vencimiento_por_vendedor = {}
-        ventas_por_producto = {}
-        ventas_por_ciclo_vida = {}
-        ventas_por_forma = {}
-
-        for sale in sales_data:
-            linea_comercial = sale.get('commercial_line_national_id')
-            if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
-                nombre_linea_actual = linea_comercial[1].upper()
-
-                # Filtrar por la línea comercial seleccionada
-                if nombre_linea_actual == linea_seleccionada_nombre.upper():
-                    user_info = sale.get('invoice_user_id')
-                    if user_info and isinstance(user_info, list) and len(user_info) > 1:
-                        vendedor_id = str(user_info[0])
-                        balance = float(sale.get('balance', 0))
-
-                        # Agrupar ventas totales
-                        ventas_por_vendedor[vendedor_id] = ventas_por_vendedor.get(vendedor_id, 0) + balance
-
-                        # Agrupar ventas IPN
-                        if sale.get('product_life_cycle') == 'nuevo':
-                            ventas_ipn_por_vendedor[vendedor_id] = ventas_ipn_por_vendedor.get(vendedor_id, 0) + balance
-
-                        # Agrupar ventas por vencimiento < 6 meses
-                        ruta = sale.get('route_id')
-                        if isinstance(ruta, list) and len(ruta) > 0 and ruta[0] in [18, 19]:
-                            ventas_vencimiento_por_vendedor[vendedor_id] = ventas_vencimiento_por_vendedor.get(vendedor_id, 0) + balance
-
-                        # Agrupar para gráficos (Top Productos, Ciclo Vida, Forma Farmacéutica)
-                        producto_nombre = sale.get('name', '').strip()
-                        if producto_nombre:
-                            ventas_por_producto[producto_nombre] = ventas_por_producto.get(producto_nombre, 0) + balance
-
-                        ciclo_vida = sale.get('product_life_cycle', 'No definido')
-                        ventas_por_ciclo_vida[ciclo_vida] = ventas_por_ciclo_vida.get(ciclo_vida, 0) + balance
-
-                        forma_farma = sale.get('pharmaceutical_forms_id')
-                        nombre_forma = forma_farma[1] if forma_farma and len(forma_farma) > 1 else 'Instrumental'
-                        ventas_por_forma[nombre_forma] = ventas_por_forma.get(nombre_forma, 0) + balance
+        # Mismo motor y criterios que el dashboard principal, filtrado a la línea
+        with request_timing.measure('aggregation'):
+            agregados = aggregate_sales(sales_data, linea=linea_seleccionada_nombre)
+        ventas_por_vendedor = agregados['ventas_por_vendedor']
+        ventas_ipn_por_vendedor = agregados['ventas_ipn_por_vendedor']
+        ventas_vencimiento_por_vendedor = agregados['ventas_ruta_por_vendedor']
 
         # --- 4. CONSTRUIR ESTRUCTURA DE DATOS PARA LA PLANTILLA ---
         datos_vendedores = []
@@ -567,11 +654,9 @@ def dashboard_linea():
         }
 
         # Datos para gráficos
-        productos_ordenados = sorted(ventas_por_producto.items(), key=lambda x: x[1], reverse=True)[:7]
-        datos_productos = [{'nombre': n, 'venta': v} for n, v in productos_ordenados]
-
-        datos_ciclo_vida = [{'ciclo': c, 'venta': v} for c, v in ventas_por_ciclo_vida.items()]
-        datos_forma_farmaceutica = [{'forma': f, 'venta': v} for f, v in ventas_por_forma.items()]
+        datos_productos = agregados['top_productos']
+        datos_ciclo_vida = agregados['ciclo_vida']
+        datos_forma_farmaceutica = agregados['forma_farmaceutica']
 
         # Lista de todas las líneas para el selector
         lineas_comerciales_disponibles = [
@@ -721,8 +806,8 @@ def api_cobranza_internacional_kpis():
         payment_state = request.args.get('payment_state')
         linea_id = request.args.get('linea_id')
         
-        kpis = data_manager.cobranza.get_cobranza_kpis_internacional(
-            date_from, date_to, payment_state, linea_id
+        kpis = data_manager.get_cobranza_kpis_internacional(
+            date_from, date_to, payment_state, linea_id, source=request.args.get('source')
         )
         
         return jsonify(kpis)
@@ -731,6 +816,25 @@ def api_cobranza_internacional_kpis():
         print(f"[ERROR] api_cobranza_internacional_kpis: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/cobranza_internacional/summary')
+def api_cobranza_internacional_summary():
+    if 'username' not in session:
+        return jsonify({'error': 'No autorizado'}), 401
+    
+    try:
+        # KPIs, aging, DSO por país y top 15 con una sola descarga de facturas
+        resumen = data_manager.get_resumen_cobranza_internacional(
+            request.args.get('start'), request.args.get('end'),
+            request.args.get('payment_state'), request.args.get('linea_id'),
+            source=request.args.get('source')
+        )
+        
+        return jsonify(resumen)
+    
+    except Exception as e:
+        print(f"[ERROR] api_cobranza_internacional_summary: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/cobranza_internacional/top15')
 def api_cobranza_internacional_top15():
     if 'username' not in session:
@@ -740,9 +844,11 @@ def api_cobranza_internacional_top15():
         date_from = request.args.get('start')
         date_to = request.args.get('end')
         
-        top15 = data_manager.cobranza.get_top15_deudores_internacional(date_from, date_to)
+        resumen = data_manager.get_resumen_cobranza_internacional(
+            date_from, date_to, source=request.args.get('source')
+        )
         
-        return jsonify(top15)
+        return jsonify(resumen['top15'])
     
     except Exception as e:
         print(f"[ERROR] api_cobranza_internacional_top15: {e}")
@@ -757,20 +863,11 @@ def api_cobranza_internacional_aging():
         date_from = request.args.get('start')
         date_to = request.args.get('end')
         
-        kpis = data_manager.cobranza.get_cobranza_kpis_internacional(date_from, date_to)
-        
-        # Formatear para gráfico
-        aging_buckets = kpis.get('aging_buckets', {})
-        return jsonify({
-            'labels': ['Vigente', '1-30 días', '31-60 días', '61-90 días', '+90 días'],
-            'values': [
-                aging_buckets.get('vigente', 0),
-                aging_buckets.get('1-30', 0),
-                aging_buckets.get('31-60', 0),
-                aging_buckets.get('61-90', 0),
-                aging_buckets.get('+90', 0),
-            ]
-        })
+        resumen = data_manager.get_resumen_cobranza_internacional(
+            date_from, date_to, source=request.args.get('source')
+        )
+        
+        return jsonify(resumen['aging'])
     
     except Exception as e:
         print(f"[ERROR] api_cobranza_internacional_aging: {e}")
@@ -785,13 +882,11 @@ def api_cobranza_internacional_dso_by_country():
         date_from = request.args.get('start')
         date_to = request.args.get('end')
         
-        kpis = data_manager.cobranza.get_cobranza_kpis_internacional(date_from, date_to)
-        dso_by_country = kpis.get('dso_by_country', {})
+        resumen = data_manager.get_resumen_cobranza_internacional(
+            date_from, date_to, source=request.args.get('source')
+        )
         
-        return jsonify({
-            'countries': list(dso_by_country.keys()),
-            'dso_values': list(dso_by_country.values())
-        })
+        return jsonify(resumen['dso_by_country'])
     
     except Exception as e:
         print(f"[ERROR] api_cobranza_internacional_dso_by_country: {e}")
@@ -803,17 +898,42 @@ def api_cobranza_internacional_dso_trend():
         return jsonify({'error': 'No autorizado'}), 401
     
     try:
-        # Placeholder - se necesitaría implementar cálculo por mes
-        return jsonify({
-            'labels': ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun'],
-            'dso_values': [45, 48, 52, 49, 53, 51],
-            'objetivo': [45, 45, 45, 45, 45, 45]
-        })
+        months = min(max(request.args.get('months', 6, type=int), 1), 36)
+        trend = data_manager.cobranza.get_dso_trend_internacional(
+            months, date_to=request.args.get('end'), source=request.args.get('source')
+        )
+        return jsonify(trend)
     
     except Exception as e:
         print(f"[ERROR] api_cobranza_internacional_dso_trend: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/cobranza_internacional/saldos_a_fecha')
+def api_cobranza_internacional_saldos_a_fecha():
+    if 'username' not in session:
+        return jsonify({'error': 'No autorizado'}), 401
+    
+    fecha = request.args.get('fecha')
+    if not fecha:
+        return jsonify({'error': 'Falta el parámetro fecha (YYYY-MM-DD)'}), 400
+    
+    try:
+        datetime.strptime(fecha, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': f'Fecha inválida: {fecha}'}), 400
+    
+    try:
+        saldos = data_manager.cobranza.get_saldos_internacional_a_fecha(
+            fecha, partner_id=request.args.get('partner_id', type=int)
+        )
+        if saldos is None:
+            return jsonify({'error': 'Espejo de Odoo no disponible (ODOO_MIRROR)'}), 503
+        return jsonify(saldos)
+    
+    except Exception as e:
+        print(f"[ERROR] api_cobranza_internacional_saldos_a_fecha: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/export/excel/sales')
 def export_excel_sales():
     if 'username' not in session:
@@ -845,7 +965,7 @@ def export_excel_sales():
             date_to=date_to,
             partner_id=partner_id,
             linea_id=linea_id,
-            limit=10000  # Más datos para export
+            limit=None  # Exportar todo (paginado)
         )
         
         # Filtrar VENTA INTERNACIONAL (exportaciones)
@@ -871,8 +991,9 @@ def export_excel_sales():
         
         # Crear archivo Excel en memoria
         output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        with request_timing.measure('excel'), pd.ExcelWriter(output, engine='openpyxl') as writer:
             df.to_excel(writer, sheet_name='Ventas', index=False)
+        memory_profiler.checkpoint('excel')
         
         output.seek(0)
         
@@ -1010,12 +1131,33 @@ def metas_vendedor():
     # Para la vista, pasamos todas las metas cargadas
     metas_guardadas = LOCAL_STORAGE.get('metas_vendedores', {})
 
+    # Ventas reales por equipo (línea), vendedor y mes desde el cubo de ventas
+    # (solo los meses ya en memoria; los demás se calculan en segundo plano)
+    ventas_reales = {}
+    ventas_pendientes = []
+    try:
+        meses_transcurridos = [m['key'] for m in meses_disponibles if m['key'] <= fecha_actual.strftime('%Y-%m')]
+        cubo, ventas_pendientes = data_manager.get_sales_cube_range_cached(meses_transcurridos)
+        cubo = cubo.slice(internacional=False, vendedor=bool)
+        nombres_equipo = {e['nombre']: e['id'] for e in equipos_definidos}
+        cubo = cubo.slice(linea=list(nombres_equipo))
+        ventas_ipn = cubo.slice(ciclo='nuevo').rollup(['linea', 'vendedor', 'mes'])
+        for (linea, vendedor_id, mes), venta in cubo.rollup(['linea', 'vendedor', 'mes']).items():
+            ventas_reales.setdefault(nombres_equipo[linea], {}).setdefault(vendedor_id, {})[mes] = {
+                'venta': venta,
+                'venta_ipn': ventas_ipn.get((linea, vendedor_id, mes), 0)
+            }
+    except Exception as e:
+        print(f"⚠️ No se pudieron obtener las ventas reales por vendedor: {e}")
+
     return render_template('metas_vendedor.html',
                            meses_disponibles=meses_disponibles,
                            lineas_comerciales=lineas_comerciales_estaticas,
                            equipos_con_vendedores=equipos_con_vendedores,
                            todos_los_vendedores=todos_los_vendedores,
-                           metas_guardadas=metas_guardadas)
+                           metas_guardadas=metas_guardadas,
+                           ventas_reales=ventas_reales,
+                           ventas_pendientes=ventas_pendientes)
 
 @app.route('/export/dashboard/details')
 def export_dashboard_details():
@@ -1029,18 +1171,8 @@ def export_dashboard_details():
             flash('No se especificó un mes para la exportación.', 'danger')
             return redirect(url_for('dashboard'))
 
-        # Calcular fechas para el mes seleccionado
-        año_sel, mes_sel = mes_seleccionado.split('-')
-        fecha_inicio = f"{año_sel}-{mes_sel}-01"
-        ultimo_dia = calendar.monthrange(int(año_sel), int(mes_sel))[1]
-        fecha_fin = f"{año_sel}-{mes_sel}-{ultimo_dia}"
-
-        # Obtener datos de ventas reales desde Odoo para ese mes
-        sales_data = data_manager.get_sales_lines(
-            date_from=fecha_inicio,
-            date_to=fecha_fin,
-            limit=10000  # Límite alto para exportación
-        )
+        # Obtener datos de ventas del mes (snapshot si el mes ya cerró)
+        sales_data = data_manager.get_sales_lines_month(mes_seleccionado)
 
         # Filtrar VENTA INTERNACIONAL (exportaciones), igual que en el dashboard
         sales_data_filtered = []
@@ -1058,18 +1190,14 @@ def export_dashboard_details():
             
             sales_data_filtered.append(sale)
 
-        # Convertir el balance a positivo para que coincida con el dashboard
-        for sale in sales_data_filtered:
-            if 'balance' in sale and sale['balance'] is not None:
-                sale['balance'] = float(sale['balance']) # Ya viene con el signo correcto desde OdooManager
-
         # Crear DataFrame de Pandas con los datos filtrados
         df = pd.DataFrame(sales_data_filtered)
 
         # Crear archivo Excel en memoria
         output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        with request_timing.measure('excel'), pd.ExcelWriter(output, engine='openpyxl') as writer:
             df.to_excel(writer, sheet_name=f'Detalle Ventas {mes_seleccionado}', index=False)
+        memory_profiler.checkpoint('excel')
         output.seek(0)
 
         # Generar nombre de archivo
@@ -1115,7 +1243,8 @@ def reporte_cxc_general():
             customer=selected_filters['customer'],
             account_codes=selected_filters['account_codes'],
             search_term=selected_filters['search_term'],
-            limit=1000
+            limit=1000,
+            source=request.args.get('source')
         )
         
         return render_template('reporte_cxc_general.html', 
@@ -1156,7 +1285,8 @@ def reporte_internacional():
             end_date=selected_filters['date_to'],
             customer=selected_filters['customer'],
             payment_state=selected_filters['payment_state'],
-            limit=2000
+            limit=2000,
+            source=request.args.get('source')
         )
         
         # Ordenar por días vencidos (descendente - mayor a menor)
@@ -1309,7 +1439,7 @@ def export_excel_cxc():
             end_date=date_to,
             customer=customer,
             account_codes=account_codes,
-            limit=10000  # Más datos para export
+            limit=0  # Exportar todo (paginado)
         )
         
         if not cxc_data:
@@ -1367,7 +1497,7 @@ def export_excel_cxc():
         # Crear archivo Excel con formato profesional
         output = io.BytesIO()
         
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        with request_timing.measure('excel'), pd.ExcelWriter(output, engine='openpyxl') as writer:
             df.to_excel(writer, sheet_name='Cuentas por Cobrar', index=False, startrow=1)
             
             # Obtener el workbook y worksheet
@@ -1462,6 +1592,8 @@ def export_excel_cxc():
             
             # Congelar la fila de encabezados
             worksheet.freeze_panes = 'A3'
+        # Datos, DataFrame y workbook siguen vivos: punto cercano al pico de memoria
+        memory_profiler.checkpoint('excel')
         
         output.seek(0)
         
@@ -1502,7 +1634,7 @@ def export_excel_internacional():
             end_date=date_to,
             customer=customer,
             payment_state=payment_state,
-            limit=10000
+            limit=0  # Exportar todo (paginado)
         )
         
         if not internacional_data:
@@ -1552,7 +1684,7 @@ def export_excel_internacional():
         # Crear Excel con formato profesional usando openpyxl
         output = io.BytesIO()
         
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        with request_timing.measure('excel'), pd.ExcelWriter(output, engine='openpyxl') as writer:
             df.to_excel(writer, sheet_name='Reporte Internacional', index=False, startrow=1)
             
             workbook = writer.book
@@ -1611,6 +1743,8 @@ def export_excel_internacional():
             
             # Congelar la fila de encabezados
             worksheet.freeze_panes = 'A3'
+        # Datos, DataFrame y workbook siguen vivos: punto cercano al pico de memoria
+        memory_profiler.checkpoint('excel')
         
         output.seek(0)
         
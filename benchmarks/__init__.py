@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+Herramientas de benchmark sin conexión a Odoo.
+
+- fake_data: Generador determinista de datos sintéticos con forma de Odoo
+- fake_odoo: Servidor XML-RPC que imita a Odoo sobre esos datos
+- suite: Benchmarks de tiempo y memoria del pipeline a 10k/100k/1M líneas
+- load_test: Prueba de carga HTTP de las rutas de Flask
+"""
@@ -0,0 +1,510 @@
+# -*- coding: utf-8 -*-
+"""
+Generador determinista de datos sintéticos con forma de Odoo.
+
+Con la misma semilla y los mismos parámetros produce exactamente los mismos
+registros: clientes (nacionales e internacionales), productos veterinarios
+con línea comercial, ciclo de vida y forma farmacéutica, facturas y notas
+de crédito con sus líneas de producto y su línea por cobrar (cuentas 12x y
+13x), órdenes de venta con rutas (18/19 incluidas), impuestos, cuentas,
+crédito por cliente y conciliaciones parciales de lo cobrado. Todo se
+genera con numpy, así que un millón de líneas contables tarda unos segundos.
+
+La cantidad de registros de cada modelo escala con `lines` (líneas de
+account.move.line); las fechas cubren `months` meses hasta `end_date`.
+"""
+
+import calendar
+from datetime import date
+
+import numpy as np
+
+from .fake_odoo import Field, Table, name_table
+
+
+COMMERCIAL_LINES = [
+    'PETMEDICA', 'AGROVET', 'PET NUTRISCIENCE', 'AVIVET', 'ECOMMERCE',
+    'OTROS', 'GENVET', 'LICITACIÓN', 'VENTA INTERNACIONAL',
+]
+COMMERCIAL_LINE_WEIGHTS = [0.24, 0.22, 0.12, 0.12, 0.06, 0.05, 0.08, 0.04, 0.07]
+
+TEAMS = ['VENTA NACIONAL', 'VENTA INTERNACIONAL', 'ECOMMERCE', 'LICITACIONES', 'DISTRIBUIDORES']
+LIFE_CYCLES = ['nuevo', 'crecimiento', 'madurez', 'declive']
+FORMS = ['INYECTABLE', 'TABLETA', 'SUSPENSIÓN ORAL', 'POLVO', 'SOLUCIÓN TÓPICA', 'PIPETA', 'PREMEZCLA', 'CREMA']
+ADMIN_WAYS = ['ORAL', 'INTRAMUSCULAR', 'SUBCUTÁNEA', 'TÓPICA', 'INTRAVENOSA']
+PHARMA_CLASSES = ['ANTIBIÓTICO', 'ANTIPARASITARIO', 'ANTIINFLAMATORIO', 'VITAMINA', 'HORMONAL', 'DESINFECTANTE', 'NUTRACÉUTICO']
+PRODUCTION_LINES = ['LÍQUIDOS', 'SÓLIDOS', 'INYECTABLES', 'POLVOS', 'BIOLÓGICOS']
+EXCLUDED_CATEGORIES = [315, 333, 304, 314, 318, 339]
+TAXES = ['IGV', 'IGV_INC', 'EXO', 'INA']
+ACCOUNTS = [
+    ('1212001', 'Facturas por cobrar MN'), ('1212002', 'Facturas por cobrar ME'),
+    ('1221001', 'Anticipos de clientes'), ('1231001', 'Letras por cobrar MN'),
+    ('1239001', 'Letras en descuento'), ('1312001', 'Cuentas por cobrar relacionadas'),
+    ('1321001', 'Letras por cobrar relacionadas'), ('7011001', 'Ventas mercaderías locales'),
+    ('7012001', 'Ventas mercaderías exterior'), ('4011001', 'IGV cuenta propia'),
+]
+# (código de país, nombre, peso) — PE concentra la mayoría de clientes
+COUNTRIES = [
+    ('PE', 'Perú', 0.82), ('CO', 'Colombia', 0.03), ('EC', 'Ecuador', 0.03), ('BO', 'Bolivia', 0.03),
+    ('CL', 'Chile', 0.02), ('MX', 'México', 0.02), ('GT', 'Guatemala', 0.015), ('HN', 'Honduras', 0.015),
+    ('CR', 'Costa Rica', 0.01), ('PA', 'Panamá', 0.01), ('DO', 'República Dominicana', 0.01), ('US', 'Estados Unidos', 0.01),
+]
+STATES = ['Lima', 'Arequipa', 'La Libertad', 'Piura', 'Lambayeque', 'Junín', 'Cusco', 'Ica', 'Cajamarca', 'San Martín']
+DISTRICTS = ['Miraflores', 'San Isidro', 'Surco', 'Ate', 'Chorrillos', 'Cercado', 'Los Olivos', 'La Molina', 'Lurín', 'Callao']
+SUB_CHANNELS = ['DISTRIBUIDOR', 'VETERINARIA', 'AVÍCOLA', 'PORCINO', 'GANADERO', 'MASCOTAS', 'INTERNACIONAL', 'N/A']
+PRODUCT_PREFIXES = ['AMOXI', 'ENRO', 'IVER', 'MELOXI', 'DOXI', 'FLORFENI', 'TILMI', 'OXITETRA',
+                    'FIPRO', 'PRAZI', 'CEFTIO', 'KETO', 'GENTA', 'TYLO', 'LINCO', 'SULFA']
+PRODUCT_SUFFIXES = ['VET', 'MAX', 'PLUS', 'FORTE', 'LA', 'SOL', 'PET', 'MIX']
+PRESENTATIONS = ['10 ML', '50 ML', '100 ML', '250 ML', '500 ML', '1 L', '20 TAB', '100 G', '1 KG']
+PARTNER_KINDS = ['VETERINARIA', 'AGROPECUARIA', 'DISTRIBUIDORA', 'CLÍNICA VETERINARIA', 'AVÍCOLA', 'GRANJA', 'PET SHOP', 'COMERCIAL']
+PARTNER_NAMES = ['SAN MARTÍN', 'LOS ANDES', 'EL PORVENIR', 'SANTA ROSA', 'DEL NORTE', 'DEL SUR', 'LA ESPERANZA',
+                 'SAN JUAN', 'EL ROBLE', 'PACÍFICO', 'AMAZONAS', 'LOS PINOS', 'VIRGEN DEL CARMEN', 'SAN PEDRO']
+LEGAL_FORMS = ['S.A.C.', 'E.I.R.L.', 'S.A.', 'S.R.L.']
+# Rutas de stock; 18 y 19 son las rutas de vencimiento que usan los dashboards
+ROUTES = [f'Ruta {i}' for i in range(1, 21)]
+ROUTES[17], ROUTES[18] = 'Ruta 18 - Vencimiento corto', 'Ruta 19 - Vencimiento corto'
+PAYMENT_TERMS = [(0, 'Contado'), (30, '30 días'), (60, '60 días'), (90, '90 días')]
+USD_RATE = 3.75
+
+
+def _end_of_month(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _choice_names(rng, names, size, weights=None):
+    """Índices (base 0) elegidos con pesos opcionales."""
+    p = None if weights is None else np.asarray(weights, dtype=float) / np.sum(weights)
+    return rng.choice(len(names), size=size, p=p)
+
+
+def _zipf_weights(n, s=0.9):
+    w = 1.0 / np.arange(1, n + 1) ** s
+    return w / w.sum()
+
+
+def _csr(counts, data):
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, np.asarray(data, dtype=np.int64)
+
+
+def _fmt(template, numbers):
+    return np.array([template % n for n in numbers.tolist()], dtype=object)
+
+
+def _pick(values, index, mask=None):
+    """Objeto de `values[index]`, con False donde `mask` es False."""
+    out = np.asarray(values, dtype=object)[index]
+    if mask is not None:
+        out = np.where(mask, out, False)
+    return out
+
+
+def generate(lines=10000, seed=42, end_date=None, months=24):
+    """
+    Genera todos los modelos.
+
+    Args:
+        lines (int): Líneas de account.move.line aproximadas (exactas salvo
+            redondeo de la última factura)
+        seed (int): Semilla
+        end_date (str | date, optional): Último día con datos (por defecto
+            fin del mes actual)
+        months (int): Meses de historia
+
+    Returns:
+        dict: {modelo: Table}
+    """
+    rng = np.random.default_rng(seed)
+    if end_date is None:
+        end = _end_of_month(date.today())
+    elif isinstance(end_date, str):
+        end = date.fromisoformat(end_date)
+    else:
+        end = end_date
+    start_month = (end.year * 12 + end.month - 1) - (months - 1)
+    start = date(start_month // 12, start_month % 12 + 1, 1)
+    start_d = np.datetime64(start, 'D')
+    span_days = (end - start).days + 1
+
+    n_partners = int(np.clip(lines // 250, 40, 20000))
+    n_products = int(np.clip(lines // 400, 60, 4000))
+    n_sellers = 25
+
+    tables = {}
+
+    # --- Catálogos ---------------------------------------------------------
+    tables['res.country'] = Table('res.country', len(COUNTRIES), {
+        'name': Field('char', np.array([c[1] for c in COUNTRIES], dtype=object)),
+        'code': Field('char', np.array([c[0] for c in COUNTRIES], dtype=object)),
+    })
+    tables['res.country.state'] = name_table('res.country.state', STATES)
+    tables['res.users'] = name_table('res.users', ['OdooBot', 'Administrator'] + [
+        f'VENDEDOR {i:02d}' for i in range(1, n_sellers + 1)
+    ])
+    tables['crm.team'] = name_table('crm.team', TEAMS)
+    tables['product.category'] = name_table('product.category', [f'Categoría {i}' for i in range(1, 341)])
+    tables['agr.commercial.line'] = name_table('agr.commercial.line', COMMERCIAL_LINES)
+    tables['agr.pharmaceutical.forms'] = name_table('agr.pharmaceutical.forms', FORMS)
+    tables['agr.administration.way'] = name_table('agr.administration.way', ADMIN_WAYS)
+    tables['agr.pharmacological.classification'] = name_table('agr.pharmacological.classification', PHARMA_CLASSES)
+    tables['agr.production.line'] = name_table('agr.production.line', PRODUCTION_LINES)
+    tables['agr.sub.channel'] = name_table('agr.sub.channel', SUB_CHANNELS)
+    tables['agr.sale.type'] = name_table('agr.sale.type', ['VENTA REGULAR', 'MUESTRA', 'BONIFICACIÓN'])
+    tables['stock.route'] = name_table('stock.route', ROUTES)
+    tables['stock.warehouse'] = name_table('stock.warehouse', ['ALMACÉN LIMA', 'ALMACÉN AREQUIPA', 'ALMACÉN TRUJILLO'])
+    tables['uom.uom'] = name_table('uom.uom', ['Unidades', 'Cajas', 'kg', 'L'])
+    tables['res.currency'] = name_table('res.currency', ['PEN', 'USD'])
+    tables['account.journal'] = name_table('account.journal', ['Facturas de cliente', 'Notas de crédito'])
+    tables['account.payment.term'] = name_table('account.payment.term', [t[1] for t in PAYMENT_TERMS])
+    tables['l10n_latam.document.type'] = name_table('l10n_latam.document.type', ['Factura', 'Nota de Crédito', 'Boleta'])
+    tables['account.tax'] = name_table('account.tax', TAXES)
+    tables['account.account'] = Table('account.account', len(ACCOUNTS), {
+        'code': Field('char', np.array([a[0] for a in ACCOUNTS], dtype=object)),
+        'name': Field('char', np.array([a[1] for a in ACCOUNTS], dtype=object)),
+    }, display_field=lambda t: [f'{c} {n}' for c, n in zip(t.fields['code'].data, t.fields['name'].data)])
+    account_id = {code: i + 1 for i, (code, _) in enumerate(ACCOUNTS)}
+
+    # --- Clientes ----------------------------------------------------------
+    country_idx = _choice_names(rng, COUNTRIES, n_partners, [c[2] for c in COUNTRIES])
+    is_pe = country_idx == 0
+    kinds = rng.integers(0, len(PARTNER_KINDS), n_partners)
+    names = rng.integers(0, len(PARTNER_NAMES), n_partners)
+    legal = rng.integers(0, len(LEGAL_FORMS), n_partners)
+    partner_names = np.array([
+        f'{PARTNER_KINDS[k]} {PARTNER_NAMES[n]} {i + 1:05d} {LEGAL_FORMS[l]}'
+        for i, (k, n, l) in enumerate(zip(kinds.tolist(), names.tolist(), legal.tolist()))
+    ], dtype=object)
+    vat_numbers = rng.integers(100000000, 999999999, n_partners)
+    vats = np.where(is_pe, _fmt('20%09d', vat_numbers), _fmt('EX%09d', vat_numbers))
+    codes = np.array([c[0] for c in COUNTRIES], dtype=object)
+    state_idx = rng.integers(0, len(STATES), n_partners)
+    tables['res.partner'] = Table('res.partner', n_partners, {
+        'name': Field('char', partner_names),
+        'vat': Field('char', vats),
+        'customer_rank': Field('integer', np.where(rng.random(n_partners) < 0.97, 1, 0).astype(np.int64)),
+        'country_id': Field('many2one', (country_idx + 1).astype(np.int64), 'res.country'),
+        'country_code': Field('char', codes[country_idx]),
+        'state_id': Field('many2one', np.where(is_pe, state_idx + 1, 0).astype(np.int64), 'res.country.state'),
+        'l10n_pe_district': Field('char', _pick(DISTRICTS, rng.integers(0, len(DISTRICTS), n_partners), is_pe)),
+        'write_date': Field('datetime', np.full(n_partners, np.datetime64(start, 's'))),
+    })
+
+    # --- Productos ---------------------------------------------------------
+    combos = len(PRODUCT_PREFIXES) * len(PRODUCT_SUFFIXES) * len(PRESENTATIONS)
+    product_names = []
+    for i in range(n_products):
+        c = i % combos
+        p, rest = divmod(c, len(PRODUCT_SUFFIXES) * len(PRESENTATIONS))
+        s, pres = divmod(rest, len(PRESENTATIONS))
+        name = f'{PRODUCT_PREFIXES[p]}{PRODUCT_SUFFIXES[s]} {PRESENTATIONS[pres]}'
+        product_names.append(name if i < combos else f'{name} V{i // combos + 1}')
+    product_names = np.array(product_names, dtype=object)[rng.permutation(n_products)]
+    has_code = rng.random(n_products) >= 0.03
+    line_idx = _choice_names(rng, COMMERCIAL_LINES, n_products, COMMERCIAL_LINE_WEIGHTS)
+    has_line = rng.random(n_products) >= 0.04
+    categ = rng.integers(1, 21, n_products)
+    excluded = rng.random(n_products) < 0.05
+    categ = np.where(excluded, np.array(EXCLUDED_CATEGORIES)[rng.integers(0, len(EXCLUDED_CATEGORIES), n_products)], categ)
+    cycle_idx = _choice_names(rng, LIFE_CYCLES, n_products, [0.15, 0.25, 0.45, 0.15])
+    base_price = np.round(np.exp(rng.normal(3.5, 0.9, n_products)), 2)
+    tables['product.product'] = Table('product.product', n_products, {
+        'name': Field('char', product_names),
+        'default_code': Field('char', _pick(_fmt('PT%05d', np.arange(1, n_products + 1)), np.arange(n_products), has_code)),
+        'categ_id': Field('many2one', categ.astype(np.int64), 'product.category'),
+        'commercial_line_national_id': Field('many2one', np.where(has_line, line_idx + 1, 0).astype(np.int64), 'agr.commercial.line'),
+        'pharmacological_classification_id': Field('many2one', rng.integers(1, len(PHARMA_CLASSES) + 1, n_products), 'agr.pharmacological.classification'),
+        'pharmaceutical_forms_id': Field('many2one', rng.integers(1, len(FORMS) + 1, n_products), 'agr.pharmaceutical.forms'),
+        'administration_way_id': Field('many2one', rng.integers(1, len(ADMIN_WAYS) + 1, n_products), 'agr.administration.way'),
+        'production_line_id': Field('many2one', rng.integers(1, len(PRODUCTION_LINES) + 1, n_products), 'agr.production.line'),
+        'product_life_cycle': Field('selection', _pick(LIFE_CYCLES, cycle_idx, rng.random(n_products) >= 0.05)),
+        'list_price': Field('float', base_price),
+        'write_date': Field('datetime', np.full(n_products, np.datetime64(start, 's'))),
+    })
+
+    # --- Facturas (cabecera) -----------------------------------------------
+    # k líneas de producto + 1 línea por cobrar por factura; se generan
+    # facturas hasta cubrir `lines` y se recorta la última.
+    estimate = max(1, lines // 4)
+    k = np.clip(1 + rng.poisson(3.0, estimate * 2), 1, 12)
+    per_move = k + 1
+    total = np.cumsum(per_move)
+    n_moves = int(np.searchsorted(total, lines) + 1) if total[-1] >= lines else len(k)
+    k = k[:n_moves].copy()
+    overflow = int(total[n_moves - 1] - lines)
+    if overflow > 0:
+        k[-1] = max(1, k[-1] - overflow)
+
+    move_partner = rng.choice(n_partners, size=n_moves, p=_zipf_weights(n_partners)) + 1
+    partner_pe = is_pe[move_partner - 1]
+    day_offsets = np.sort(rng.integers(0, span_days, n_moves))
+    invoice_date = start_d + day_offsets.astype('timedelta64[D]')
+    is_refund = rng.random(n_moves) < 0.08
+    state_draw = rng.random(n_moves)
+    state = np.where(state_draw < 0.96, 'posted', np.where(state_draw < 0.98, 'draft', 'cancel')).astype(object)
+    posted = state == 'posted'
+    term_idx = rng.integers(0, len(PAYMENT_TERMS), n_moves)
+    term_days = np.array([t[0] for t in PAYMENT_TERMS])[term_idx]
+    due_date = invoice_date + term_days.astype('timedelta64[D]')
+    team = np.where(partner_pe, rng.choice([1, 3, 4, 5], size=n_moves, p=[0.7, 0.1, 0.1, 0.1]), 2)
+    team = np.where(rng.random(n_moves) < 0.04, 0, team)
+    seller = np.where(rng.random(n_moves) < 0.05, 0, rng.integers(3, n_sellers + 3, n_moves))
+    currency = np.where(partner_pe & (rng.random(n_moves) < 0.85), 1, 2)
+    has_order = (rng.random(n_moves) < 0.75) & ~is_refund
+
+    # Estado de pago según antigüedad (más antiguas, más pagadas)
+    today = np.datetime64(min(date.today(), end), 'D')
+    age = (today - due_date).astype(np.int64)
+    p_paid = np.clip(0.25 + age / 150.0, 0.05, 0.97)
+    draw = rng.random(n_moves)
+    payment_state = np.where(draw < p_paid, 'paid',
+                             np.where(draw < p_paid + 0.05, 'in_payment',
+                                      np.where(draw < p_paid + 0.15, 'partial', 'not_paid'))).astype(object)
+    payment_state = np.where(is_refund & (rng.random(n_moves) < 0.5), 'reversed', payment_state)
+    payment_state = np.where(posted, payment_state, 'not_paid')
+
+    # --- Líneas de producto ------------------------------------------------
+    n_product_lines = int(k.sum())
+    pl_move = np.repeat(np.arange(n_moves), k)  # índice de factura (base 0)
+    pl_product = rng.choice(n_products, size=n_product_lines, p=_zipf_weights(n_products, 0.7)) + 1
+    pl_qty = rng.integers(1, 120, n_product_lines).astype(np.float64)
+    pl_price = np.round(base_price[pl_product - 1] * rng.uniform(0.9, 1.1, n_product_lines), 2)
+    pl_subtotal = np.round(pl_qty * pl_price, 2)
+    pl_pe = partner_pe[pl_move]
+    tax_draw = rng.random(n_product_lines)
+    pl_tax = np.where(pl_pe, np.where(tax_draw < 0.85, 1, np.where(tax_draw < 0.95, 2, 3)), 4)
+
+    untaxed = np.bincount(pl_move, weights=pl_subtotal, minlength=n_moves)
+    igv = np.bincount(pl_move, weights=pl_subtotal * (pl_tax == 1) * 0.18, minlength=n_moves)
+    amount_total = np.round(untaxed + igv, 2)
+    residual = np.where(np.isin(payment_state, ['paid', 'in_payment', 'reversed']), 0.0,
+                        np.where(payment_state == 'partial', np.round(amount_total * rng.uniform(0.1, 0.9, n_moves), 2), amount_total))
+    residual = np.where(posted, residual, amount_total)
+    sign = np.where(is_refund, -1.0, 1.0)
+    rate = np.where(currency == 2, USD_RATE, 1.0)
+
+    # --- Órdenes de venta --------------------------------------------------
+    order_of_move = np.zeros(n_moves, dtype=np.int64)
+    order_of_move[has_order] = np.arange(1, int(has_order.sum()) + 1)
+    n_orders = int(has_order.sum())
+    order_moves = np.flatnonzero(has_order)
+    order_dates = (invoice_date[order_moves] - rng.integers(0, 5, n_orders).astype('timedelta64[D]')).astype('datetime64[s]') \
+        + rng.integers(8 * 3600, 18 * 3600, n_orders).astype('timedelta64[s]')
+    tables['sale.order'] = Table('sale.order', n_orders, {
+        'name': Field('char', _fmt('S%06d', np.arange(1, n_orders + 1))),
+        'partner_id': Field('many2one', move_partner[order_moves].astype(np.int64), 'res.partner'),
+        'partner_shipping_id': Field('many2one', move_partner[order_moves].astype(np.int64), 'res.partner'),
+        'partner_supplying_agency_id': Field('many2one', np.where(rng.random(n_orders) < 0.3, rng.integers(1, n_partners + 1, n_orders), 0).astype(np.int64), 'res.partner'),
+        'delivery_observations': Field('char', _pick(['Entregar en horario de oficina', 'Llamar antes de entregar', 'Entrega en agencia', 'Urgente'],
+                                                     rng.integers(0, 4, n_orders), rng.random(n_orders) < 0.4)),
+        'date_order': Field('datetime', order_dates),
+        'commitment_date': Field('datetime', np.where(rng.random(n_orders) < 0.5, order_dates + np.timedelta64(2, 'D'), np.datetime64('NaT', 's'))),
+        'state': Field('selection', np.full(n_orders, 'sale', dtype=object)),
+        'amount_total': Field('float', amount_total[order_moves]),
+        'user_id': Field('many2one', seller[order_moves].astype(np.int64), 'res.users'),
+        'team_id': Field('many2one', team[order_moves].astype(np.int64), 'crm.team'),
+        'warehouse_id': Field('many2one', rng.integers(1, 4, n_orders), 'stock.warehouse'),
+        'client_order_ref': Field('char', _pick(_fmt('OC-%05d', rng.integers(1, 99999, n_orders)), np.arange(n_orders), rng.random(n_orders) < 0.3)),
+        'origin': Field('char', np.full(n_orders, False, dtype=object)),
+    })
+
+    # Una línea de orden por línea de producto de facturas con orden
+    sol_mask = has_order[pl_move]
+    sol_lines = np.flatnonzero(sol_mask)
+    n_sol = len(sol_lines)
+    route_draw = rng.random(n_sol)
+    route = np.where(route_draw < 0.3, rng.choice([18, 19], size=n_sol),
+                     np.where(route_draw < 0.8, rng.integers(1, 18, n_sol), 0))
+    discount = rng.choice([0.0, 5.0, 10.0], size=n_sol, p=[0.8, 0.15, 0.05])
+    tables['sale.order.line'] = Table('sale.order.line', n_sol, {
+        'order_id': Field('many2one', order_of_move[pl_move[sol_lines]], 'sale.order'),
+        'product_id': Field('many2one', pl_product[sol_lines].astype(np.int64), 'product.product'),
+        'route_id': Field('many2one', route.astype(np.int64), 'stock.route'),
+        'name': Field('char', product_names[pl_product[sol_lines] - 1]),
+        'product_uom_qty': Field('float', pl_qty[sol_lines]),
+        'price_unit': Field('float', pl_price[sol_lines]),
+        'price_subtotal': Field('float', np.round(pl_subtotal[sol_lines] * (1 - discount / 100), 2)),
+        'discount': Field('float', discount),
+        'product_uom': Field('many2one', np.ones(n_sol, dtype=np.int64), 'uom.uom'),
+        'analytic_distribution': Field('char', np.full(n_sol, False, dtype=object)),
+        'display_type': Field('selection', np.full(n_sol, False, dtype=object)),
+    })
+    sol_of_line = np.zeros(n_product_lines, dtype=np.int64)
+    sol_of_line[sol_lines] = np.arange(1, n_sol + 1)
+
+    # --- account.move ------------------------------------------------------
+    move_numbers = np.arange(1, n_moves + 1)
+    move_names = np.where(is_refund, _fmt('NC01-%06d', move_numbers), _fmt('F001-%06d', move_numbers))
+    move_names = np.where(posted, move_names, '/')
+    write_date = invoice_date.astype('datetime64[s]') + rng.integers(8 * 3600, 20 * 3600, n_moves).astype('timedelta64[s]') \
+        + np.where(payment_state == 'paid', term_days, 0).astype('timedelta64[D]')
+    # Línea comercial de la factura: la del primer producto
+    first_product = pl_product[np.concatenate([[0], np.cumsum(k)[:-1]])]
+    move_commercial_line = tables['product.product'].fields['commercial_line_national_id'].data[first_product - 1]
+    tables['account.move'] = Table('account.move', n_moves, {
+        'name': Field('char', move_names),
+        'ref': Field('char', _pick(_fmt('REF-%06d', move_numbers), np.arange(n_moves), rng.random(n_moves) < 0.2)),
+        'move_type': Field('selection', np.where(is_refund, 'out_refund', 'out_invoice').astype(object)),
+        'state': Field('selection', state),
+        'payment_state': Field('selection', payment_state),
+        'partner_id': Field('many2one', move_partner.astype(np.int64), 'res.partner'),
+        'country_code': Field('char', codes[country_idx[move_partner - 1]]),
+        'commercial_partner_id': Field('many2one', move_partner.astype(np.int64), 'res.partner'),
+        'invoice_date': Field('date', invoice_date),
+        'date': Field('date', invoice_date),
+        'invoice_date_due': Field('date', due_date),
+        'invoice_payment_term_id': Field('many2one', (term_idx + 1).astype(np.int64), 'account.payment.term'),
+        'amount_untaxed': Field('float', np.round(untaxed, 2)),
+        'amount_total': Field('float', amount_total),
+        'amount_residual': Field('float', residual),
+        'amount_residual_with_retention': Field('float', np.round(residual * np.where(partner_pe & (amount_total > 700), 0.97, 1.0), 2)),
+        'amount_total_signed': Field('float', np.round(amount_total * sign * rate, 2)),
+        'amount_residual_signed': Field('float', np.round(residual * sign * rate, 2)),
+        'currency_id': Field('many2one', currency.astype(np.int64), 'res.currency'),
+        'team_id': Field('many2one', team.astype(np.int64), 'crm.team'),
+        'sales_channel_id': Field('many2one', team.astype(np.int64), 'crm.team'),
+        'sale_type_id': Field('many2one', np.ones(n_moves, dtype=np.int64), 'agr.sale.type'),
+        'invoice_user_id': Field('many2one', seller.astype(np.int64), 'res.users'),
+        'invoice_origin': Field('char', _pick(tables['sale.order'].fields['name'].data, np.maximum(order_of_move - 1, 0), has_order)),
+        'order_id': Field('many2one', order_of_move, 'sale.order'),
+        'commercial_line_id': Field('many2one', move_commercial_line.astype(np.int64), 'agr.commercial.line'),
+        'l10n_latam_document_type_id': Field('many2one', np.where(is_refund, 2, 1).astype(np.int64), 'l10n_latam.document.type'),
+        'l10n_latam_boe_number': Field('char', np.full(n_moves, False, dtype=object)),
+        'origin_number': Field('char', np.where(is_refund, _fmt('F001-%06d', np.maximum(move_numbers - 50, 1)), False).astype(object)),
+        'journal_id': Field('many2one', np.where(is_refund, 2, 1).astype(np.int64), 'account.journal'),
+        'write_date': Field('datetime', write_date),
+    })
+
+    # --- account.move.line -------------------------------------------------
+    # Orden por factura: primero sus líneas de producto, luego la línea por cobrar
+    n_lines = n_product_lines + n_moves
+    recv_pos = np.cumsum(k + 1) - 1
+    is_recv = np.zeros(n_lines, dtype=bool)
+    is_recv[recv_pos] = True
+    line_move = np.empty(n_lines, dtype=np.int64)
+    line_move[~is_recv] = pl_move
+    line_move[is_recv] = np.arange(n_moves)
+    prod_rows = np.flatnonzero(~is_recv)
+
+    product = np.zeros(n_lines, dtype=np.int64)
+    product[prod_rows] = pl_product
+    quantity = np.zeros(n_lines)
+    quantity[prod_rows] = pl_qty
+    price_unit = np.zeros(n_lines)
+    price_unit[prod_rows] = pl_price
+
+    msign = sign[line_move]
+    mrate = rate[line_move]
+    amount_currency = np.zeros(n_lines)
+    amount_currency[prod_rows] = -pl_subtotal * msign[prod_rows]
+    amount_currency[is_recv] = amount_total * sign
+    balance = np.round(amount_currency * mrate, 2)
+    line_residual = np.zeros(n_lines)
+    line_residual[is_recv] = residual * sign
+
+    recv_pe = partner_pe
+    recv_draw = rng.random(n_moves)
+    recv_code = np.where(recv_pe,
+                         np.where(recv_draw < 0.70, account_id['1212001'],
+                                  np.where(recv_draw < 0.82, account_id['1231001'],
+                                           np.where(recv_draw < 0.87, account_id['1239001'],
+                                                    np.where(recv_draw < 0.95, account_id['1221001'], account_id['1312001'])))),
+                         np.where(recv_draw < 0.9, account_id['1212002'], account_id['1321001']))
+    account = np.empty(n_lines, dtype=np.int64)
+    account[prod_rows] = np.where(pl_pe, account_id['7011001'], account_id['7012001'])
+    account[is_recv] = recv_code
+
+    tax_counts = np.zeros(n_lines, dtype=np.int64)
+    tax_counts[prod_rows] = 1
+    tax_offsets, tax_data = _csr(tax_counts, pl_tax)
+    sol_counts = np.zeros(n_lines, dtype=np.int64)
+    sol_counts[prod_rows] = sol_of_line > 0
+    sol_offsets, sol_data = _csr(sol_counts, sol_of_line[sol_of_line > 0])
+
+    line_names = np.empty(n_lines, dtype=object)
+    line_names[prod_rows] = product_names[pl_product - 1]
+    line_names[is_recv] = move_names
+    maturity = np.full(n_lines, np.datetime64('NaT'), dtype='datetime64[D]')
+    maturity[is_recv] = due_date
+    reconciled = np.zeros(n_lines, dtype=bool)
+    reconciled[is_recv] = posted & (residual == 0)
+
+    tables['account.move.line'] = Table('account.move.line', n_lines, {
+        'move_id': Field('many2one', line_move + 1, 'account.move'),
+        'move_name': Field('char', move_names[line_move]),
+        'parent_state': Field('selection', state[line_move]),
+        'partner_id': Field('many2one', move_partner[line_move].astype(np.int64), 'res.partner'),
+        'product_id': Field('many2one', product, 'product.product'),
+        'account_id': Field('many2one', account, 'account.account'),
+        'name': Field('char', line_names),
+        'date': Field('date', invoice_date[line_move]),
+        'date_maturity': Field('date', maturity),
+        'quantity': Field('float', quantity),
+        'price_unit': Field('float', price_unit),
+        'balance': Field('float', balance),
+        'debit': Field('float', np.where(balance > 0, balance, 0.0)),
+        'credit': Field('float', np.where(balance < 0, -balance, 0.0)),
+        'amount_currency': Field('float', np.round(amount_currency, 2)),
+        'amount_residual': Field('float', np.round(line_residual * mrate, 2)),
+        'amount_residual_currency': Field('float', np.round(line_residual, 2)),
+        'amount_residual_with_retention': Field('float', np.round(line_residual * mrate, 2)),
+        'currency_id': Field('many2one', currency[line_move].astype(np.int64), 'res.currency'),
+        'reconciled': Field('boolean', reconciled),
+        'tax_ids': Field('x2many', tax_data, 'account.tax', tax_offsets),
+        'sale_line_ids': Field('x2many', sol_data, 'sale.order.line', sol_offsets),
+        'display_type': Field('selection', np.where(is_recv, 'payment_term', 'product').astype(object)),
+        'write_date': Field('datetime', write_date[line_move]),
+    })
+
+    # --- Crédito por cliente -----------------------------------------------
+    with_credit = np.flatnonzero(rng.random(n_partners) < 0.7)
+    sub_channel = np.where(is_pe[with_credit], rng.integers(1, 7, len(with_credit)), 7)
+    sub_channel = np.where(rng.random(len(with_credit)) < 0.05, 8, sub_channel)
+    tables['agr.credit.customer'] = Table('agr.credit.customer', len(with_credit), {
+        'partner_id': Field('many2one', (with_credit + 1).astype(np.int64), 'res.partner'),
+        'sub_channel_id': Field('many2one', sub_channel.astype(np.int64), 'agr.sub.channel'),
+        'credit_limit': Field('float', np.round(rng.uniform(5000, 200000, len(with_credit)), -2)),
+    }, display_field=lambda t: partner_names[with_credit])
+
+    # --- Conciliaciones parciales --------------------------------------------
+    # Lo cobrado de cada línea por cobrar (saldo - residual) en uno o dos
+    # pagos fechados entre la factura y hoy; así el residual reconstruido a
+    # hoy coincide con amount_residual. La contrapartida (línea del pago) no
+    # se genera: el lado del pago queda en False.
+    recv_balance = balance[recv_pos]
+    recv_residual = np.round(line_residual[recv_pos] * mrate[recv_pos], 2)
+    paid_amount = np.round(np.abs(recv_balance) - np.abs(recv_residual), 2)
+    paid_moves = np.flatnonzero(posted & (paid_amount > 0.005))
+    split = rng.random(len(paid_moves)) < 0.35
+    n_apr = len(paid_moves) + int(split.sum())
+    apr_move = np.repeat(paid_moves, np.where(split, 2, 1))
+    first = np.concatenate([[True], apr_move[1:] != apr_move[:-1]])
+    second = ~first | ~np.repeat(split, np.where(split, 2, 1))  # último (o único) pago de la línea
+
+    inv_day = invoice_date[apr_move]
+    last_day = np.where(payment_state[apr_move] == 'paid', inv_day + term_days[apr_move].astype('timedelta64[D]'),
+                        inv_day + rng.integers(0, 120, n_apr).astype('timedelta64[D]'))
+    last_day = np.minimum(np.maximum(last_day, inv_day), np.maximum(today, inv_day))
+    span = (last_day - inv_day).astype(np.int64)
+    first_day = inv_day + (span * rng.uniform(0.2, 0.8, n_apr)).astype(np.int64).astype('timedelta64[D]')
+    max_date = np.where(second, last_day, first_day)
+
+    total_paid = paid_amount[apr_move]
+    first_amount = np.round(total_paid * rng.uniform(0.2, 0.8, n_apr), 2)
+    rest = np.round(total_paid - np.roll(first_amount, 1), 2)
+    amount = np.where(~second, first_amount, np.where(first, total_paid, rest))
+    recv_line = (recv_pos[apr_move] + 1).astype(np.int64)
+    is_debit = recv_balance[apr_move] > 0
+    apr_rate = rate[apr_move]
+    tables['account.partial.reconcile'] = Table('account.partial.reconcile', n_apr, {
+        'debit_move_id': Field('many2one', np.where(is_debit, recv_line, 0), 'account.move.line'),
+        'credit_move_id': Field('many2one', np.where(is_debit, 0, recv_line), 'account.move.line'),
+        'amount': Field('float', amount),
+        'debit_amount_currency': Field('float', np.round(amount / apr_rate, 2)),
+        'credit_amount_currency': Field('float', np.round(amount / apr_rate, 2)),
+        'max_date': Field('date', max_date),
+        'write_date': Field('datetime', max_date.astype('datetime64[s]')
+                            + rng.integers(8 * 3600, 20 * 3600, n_apr).astype('timedelta64[s]')),
+    }, display_field=lambda t: _fmt('Conciliación %d', np.arange(1, t.size + 1)))
+
+    return tables
@@ -0,0 +1,714 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor XML-RPC que imita a Odoo para benchmarks sin conexión.
+
+Implementa `common.authenticate` / `common.version` y `object.execute_kw`
+con `search_read`, `read`, `read_group`, `search_count`, `search` y
+`fields_get` sobre los datos sintéticos de `benchmarks.fake_data`. Los
+datos se guardan por columnas (numpy) y los dominios se evalúan de forma
+vectorizada, incluidas las rutas con punto (`partner_id.name`,
+`move_id.invoice_date`, `tax_ids.name`, ...), así que escala a millones de
+líneas. Cada llamada puede simular latencia de red y de base de datos.
+
+Uso desde la consola:
+    python -m benchmarks.fake_odoo --lines 100000 --port 8069 --latency-ms 20
+
+y luego en el .env de la app:
+    ODOO_URL=http://127.0.0.1:8069  ODOO_DB=fake  ODOO_USER=admin  ODOO_PASSWORD=admin
+"""
+
+import argparse
+import random
+import re
+import socketserver
+import threading
+import time
+import traceback
+import xmlrpc.client
+from xmlrpc.server import MultiPathXMLRPCServer, SimpleXMLRPCDispatcher, SimpleXMLRPCRequestHandler
+
+import numpy as np
+import pandas as pd
+
+
+FAKE_DB = 'fake'
+FAKE_LOGIN = 'admin'
+FAKE_PASSWORD = 'admin'
+FAKE_UID = 2
+
+# Operadores negativos y su versión positiva
+_NEGATIONS = {
+    '!=': '=', '<>': '=', 'not in': 'in', 'not like': 'like',
+    'not ilike': 'ilike', 'not =like': '=like', 'not =ilike': '=ilike',
+}
+
+_MONTHS = {
+    'es': ('enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio',
+           'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre'),
+    'en': ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+           'August', 'September', 'October', 'November', 'December'),
+}
+
+
+class Field:
+    """
+    Columna de un modelo falso.
+
+    Tipos: 'char', 'selection', 'integer', 'float', 'boolean', 'date',
+    'datetime', 'many2one' y 'x2many'. Un many2one guarda ids (0 = False);
+    un x2many guarda una lista CSR: `offsets` (tamaño n+1) y `data` (ids).
+    """
+
+    __slots__ = ('kind', 'data', 'comodel', 'offsets', 'string')
+
+    def __init__(self, kind, data, comodel=None, offsets=None, string=None):
+        self.kind = kind
+        self.data = data
+        self.comodel = comodel
+        self.offsets = offsets
+        self.string = string
+
+
+class Table:
+    """Registros de un modelo con ids 1..n guardados por columnas."""
+
+    def __init__(self, name, size, fields, display_field='name'):
+        self.name = name
+        self.size = size
+        self.fields = dict(fields)
+        self.fields['id'] = Field('integer', np.arange(1, size + 1, dtype=np.int64))
+        self.display_field = display_field
+        self._display = None
+
+    def display_names(self):
+        """Nombres para los many2one, indexados por id (posición 0 = False)."""
+        if self._display is None:
+            names = np.empty(self.size + 1, dtype=object)
+            names[0] = False
+            if callable(self.display_field):
+                names[1:] = self.display_field(self)
+            else:
+                names[1:] = self.fields[self.display_field].data
+            self._display = names
+        return self._display
+
+    def field(self, name):
+        try:
+            return self.fields[name]
+        except KeyError:
+            raise ValueError(f"Invalid field '{name}' on model '{self.name}'")
+
+
+def name_table(model, names):
+    """Modelo auxiliar con solo `name` (equipos, categorías, rutas...)."""
+    return Table(model, len(names), {'name': Field('char', np.array(names, dtype=object))})
+
+
+# ---------------------------------------------------------------------------
+# Evaluación de dominios
+# ---------------------------------------------------------------------------
+
+def _sql_pattern(pattern, anchored):
+    """Expresión regular equivalente a un patrón LIKE de SQL."""
+    regex = ''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in pattern)
+    return f'^{regex}$' if anchored else regex
+
+
+def _like(values, op, pattern):
+    series = pd.Series(values, dtype=object)
+    case = op in ('like', '=like')
+    pattern = str(pattern)
+    if op in ('like', 'ilike') and '%' not in pattern and '_' not in pattern:
+        result = series.str.contains(pattern, case=case, regex=False)
+    elif op in ('=like', '=ilike') and pattern.endswith('%') and not re.search('[%_]', pattern[:-1]):
+        prefix = pattern[:-1]
+        result = series.str.startswith(prefix) if case else series.str.lower().str.startswith(prefix.lower())
+    else:
+        regex = _sql_pattern(pattern, op in ('=like', '=ilike'))
+        result = series.str.contains(regex, case=case, regex=True)
+    return result.fillna(False).to_numpy(dtype=bool)
+
+
+def _to_date(value, kind):
+    if kind == 'date':
+        return np.datetime64(str(value)[:10], 'D')
+    return np.datetime64(str(value).replace(' ', 'T'), 's')
+
+
+def _null_mask(field):
+    data = field.data
+    if field.kind == 'many2one':
+        return data == 0
+    if field.kind == 'x2many':
+        return np.diff(field.offsets) == 0
+    if field.kind in ('date', 'datetime'):
+        return np.isnat(data)
+    if field.kind == 'boolean':
+        return ~data
+    if field.kind in ('integer', 'float'):
+        return np.zeros(len(data), dtype=bool)
+    return pd.Series(data, dtype=object).isin([False, None, '']).to_numpy(dtype=bool)
+
+
+def _any_x2many(field, target_mask):
+    """Registros con al menos un id relacionado que cumple `target_mask` (indexada por id)."""
+    hits = target_mask[field.data].astype(np.int64)
+    counts = np.add.reduceat(np.concatenate([hits, [0]]), field.offsets[:-1]) if len(hits) else np.zeros(len(field.offsets) - 1, dtype=np.int64)
+    counts[np.diff(field.offsets) == 0] = 0
+    return counts > 0
+
+
+def _compare(field, op, value):
+    data = field.data
+    kind = field.kind
+
+    if op in ('=', '!=', '<>') and (value is False or value is None):
+        null = _null_mask(field)
+        return null if op == '=' else ~null
+
+    if op in ('in', 'not in'):
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        has_null = any(v is False or v is None for v in values)
+        values = [v for v in values if v is not False and v is not None]
+        if kind in ('date', 'datetime'):
+            mask = np.isin(data, [_to_date(v, kind) for v in values])
+        elif kind in ('integer', 'float', 'many2one'):
+            mask = np.isin(data, np.array(values, dtype=data.dtype)) if values else np.zeros(len(data), dtype=bool)
+        elif kind == 'boolean':
+            mask = np.isin(data, [bool(v) for v in values])
+        else:
+            mask = pd.Series(data, dtype=object).isin(values).to_numpy(dtype=bool)
+        if has_null:
+            mask |= _null_mask(field)
+        return mask if op == 'in' else ~mask
+
+    if op in ('like', 'ilike', '=like', '=ilike', 'not like', 'not ilike', 'not =like', 'not =ilike'):
+        positive = _NEGATIONS.get(op, op)
+        mask = _like(data, positive, value)
+        return mask if positive == op else ~mask
+
+    if kind in ('date', 'datetime'):
+        value = _to_date(value, kind)
+    elif kind == 'boolean':
+        value = bool(value)
+    elif kind in ('char', 'selection'):
+        series = pd.Series(data, dtype=object)
+        if op == '=':
+            return (series == value).to_numpy(dtype=bool)
+        if op in ('!=', '<>'):
+            return (series != value).to_numpy(dtype=bool)
+        data = series.where(series.map(lambda v: isinstance(v, str)), '').to_numpy(dtype=object)
+
+    with np.errstate(invalid='ignore'):
+        if op == '=':
+            return data == value
+        if op in ('!=', '<>'):
+            return data != value
+        if op == '>':
+            return data > value
+        if op == '>=':
+            return data >= value
+        if op == '<':
+            return data < value
+        if op == '<=':
+            return data <= value
+    raise ValueError(f"Invalid domain operator '{op}'")
+
+
+def _leaf(db, table, path, op, value):
+    """Máscara booleana (tamaño del modelo) de una hoja de dominio."""
+    op = op.lower()
+    if op in ('child_of', 'parent_of'):
+        op = 'in'
+    head, _, rest = path.partition('.')
+    field = table.field(head)
+
+    if field.kind in ('many2one', 'x2many'):
+        comodel = db[field.comodel]
+        if rest or (isinstance(value, str) and op not in ('in', 'not in')):
+            # Ruta relacionada o búsqueda por nombre: se evalúa en el comodelo
+            sub_path = rest or 'name'
+            negated = field.kind == 'x2many' and op in _NEGATIONS
+            sub_op = _NEGATIONS[op] if negated else op
+            target = np.concatenate([[False], _leaf(db, comodel, sub_path, sub_op, value)])
+            if field.kind == 'many2one':
+                return target[field.data]
+            hits = _any_x2many(field, target)
+            return ~hits if negated else hits
+        if field.kind == 'x2many':
+            if value is False or value is None:
+                null = _null_mask(field)
+                return null if op == '=' else ~null
+            ids = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            target = np.zeros(comodel.size + 1, dtype=bool)
+            target[[i for i in ids if 0 < i <= comodel.size]] = True
+            hits = _any_x2many(field, target)
+            return ~hits if op in _NEGATIONS else hits
+
+    return _compare(field, op, value)
+
+
+def evaluate_domain(db, table, domain):
+    """
+    Evalúa un dominio de Odoo (notación prefija con '&', '|', '!').
+
+    Returns:
+        np.ndarray: Máscara booleana del tamaño del modelo
+    """
+    stack = []
+    for item in reversed(list(domain or [])):
+        if item == '!':
+            stack.append(~stack.pop())
+        elif item in ('&', '|'):
+            a, b = stack.pop(), stack.pop()
+            stack.append(a & b if item == '&' else a | b)
+        elif isinstance(item, (list, tuple)) and len(item) == 3:
+            path, op, value = item
+            if not isinstance(path, str):
+                # TRUE_LEAF / FALSE_LEAF: (1, '=', 1) / (0, '=', 1)
+                stack.append(np.full(table.size, path == value, dtype=bool))
+            else:
+                stack.append(_leaf(db, table, path, op, value))
+        else:
+            raise ValueError(f"Invalid domain term {item!r}")
+    mask = np.ones(table.size, dtype=bool)
+    for m in stack:
+        mask &= m
+    return mask
+
+
+# ---------------------------------------------------------------------------
+# Lectura y agrupación
+# ---------------------------------------------------------------------------
+
+def _sort_key(field, rows):
+    values = field.data[rows]
+    if field.kind in ('char', 'selection'):
+        values = pd.Series(values, dtype=object).map(lambda v: v if isinstance(v, str) else '')
+        return pd.factorize(values, sort=True)[0]
+    if field.kind in ('date', 'datetime'):
+        # NaT al principio, como NULLS FIRST en orden ascendente
+        return np.where(np.isnat(values), np.iinfo(np.int64).min, values.astype(np.int64))
+    if field.kind == 'x2many':
+        raise ValueError('No se puede ordenar por un campo x2many')
+    return values
+
+
+def order_rows(table, rows, order):
+    """Ordena posiciones de registros según una cláusula `order` de Odoo."""
+    terms = [t.split() for t in (order or 'id').split(',') if t.strip()]
+    if terms == [['id']] or terms == [['id', 'asc']]:
+        return rows
+    keys = []
+    for term in terms:
+        field = table.field(term[0])
+        key = _sort_key(field, rows)
+        if len(term) > 1 and term[1].lower() == 'desc':
+            key = -key.astype(np.int64) if key.dtype.kind in 'iub' else -key
+        keys.append(key)
+    keys.append(rows)  # desempate estable por id
+    return rows[np.lexsort(keys[::-1])]
+
+
+def _column_values(db, table, field, rows):
+    """Valores de una columna en el formato que devuelve Odoo por XML-RPC."""
+    data = field.data
+    if field.kind == 'many2one':
+        ids = data[rows]
+        names = db[field.comodel].display_names()[ids]
+        return [[int(i), n] if i else False for i, n in zip(ids.tolist(), names.tolist())]
+    if field.kind == 'x2many':
+        offsets = field.offsets
+        return [data[offsets[r]:offsets[r + 1]].tolist() for r in rows.tolist()]
+    if field.kind == 'date':
+        values = data[rows]
+        return [False if s == 'NaT' else s for s in np.datetime_as_string(values, unit='D').tolist()]
+    if field.kind == 'datetime':
+        values = data[rows]
+        return [False if s == 'NaT' else s.replace('T', ' ') for s in np.datetime_as_string(values, unit='s').tolist()]
+    return data[rows].tolist()
+
+
+def read_rows(db, table, rows, fields):
+    """Materializa registros (lista de dicts) de las posiciones indicadas."""
+    names = list(dict.fromkeys(['id'] + list(fields or [f for f in table.fields if f != 'id'])))
+    columns = [(name, _column_values(db, table, table.field(name), rows)) for name in names]
+    return [dict(zip(names, values)) for values in zip(*(col for _, col in columns))]
+
+
+def _group_spec(spec):
+    field, _, granularity = spec.partition(':')
+    return field.strip(), (granularity.strip() or None)
+
+
+def _date_bucket(values, granularity):
+    """Inicio del período de cada fecha (datetime64[D])."""
+    days = values.astype('datetime64[D]')
+    if granularity == 'day':
+        return days
+    if granularity == 'week':
+        # Semana ISO: lunes como inicio
+        weekday = (days.astype(np.int64) - 4) % 7
+        return days - weekday.astype('timedelta64[D]')
+    if granularity == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    if granularity == 'quarter':
+        months = days.astype('datetime64[M]').astype(np.int64)
+        return (months - months % 3).astype('datetime64[M]').astype('datetime64[D]')
+    if granularity == 'year':
+        return days.astype('datetime64[Y]').astype('datetime64[D]')
+    raise ValueError(f"Invalid granularity '{granularity}'")
+
+
+def _period_end(start, granularity):
+    start = np.datetime64(start, 'D')
+    if granularity == 'day':
+        return start + 1
+    if granularity == 'week':
+        return start + 7
+    months = {'month': 1, 'quarter': 3, 'year': 12}[granularity]
+    return (start.astype('datetime64[M]') + months).astype('datetime64[D]')
+
+
+def _period_label(start, granularity, lang):
+    start = np.datetime64(start, 'D').astype(object)
+    months = _MONTHS['es' if (lang or '').startswith('es') else 'en']
+    if granularity == 'day':
+        return f'{start.day:02d} {months[start.month - 1][:3]} {start.year}'
+    if granularity == 'week':
+        return f'W{start.isocalendar()[1]} {start.isocalendar()[0]}'
+    if granularity == 'month':
+        return f'{months[start.month - 1]} {start.year}'
+    if granularity == 'quarter':
+        return f'Q{(start.month - 1) // 3 + 1} {start.year}'
+    return str(start.year)
+
+
+def _aggregate_specs(table, fields, groupby_fields):
+    """[(alias, campo, función)] de los campos numéricos pedidos."""
+    specs = []
+    for spec in fields or []:
+        match = re.match(r'^\s*(\w+)\s*(?::\s*(\w+)\s*(?:\(\s*(\w+)\s*\))?)?\s*$', spec)
+        if not match:
+            raise ValueError(f"Invalid field specification '{spec}'")
+        alias, func, source = match.groups()
+        name = source or alias
+        if name in groupby_fields or name == 'id' and not func:
+            continue
+        field = table.field(name)
+        if func is None:
+            if field.kind not in ('integer', 'float'):
+                continue  # Odoo ignora los campos sin operador de agregación
+            func = 'sum'
+        specs.append((alias, name, func))
+    return specs
+
+
+def read_group(db, table, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True, context=None):
+    """Equivalente de `read_group` de Odoo 16 sobre un modelo falso."""
+    groupby = [groupby] if isinstance(groupby, str) else list(groupby or [])
+    if lazy and groupby:
+        groupby_used, remaining = groupby[:1], groupby[1:]
+    else:
+        groupby_used, remaining = groupby, []
+    specs_gb = [_group_spec(g) for g in groupby_used]
+    lang = (context or {}).get('lang')
+
+    rows = np.flatnonzero(evaluate_domain(db, table, domain))
+    frame = {}
+    for i, (name, granularity) in enumerate(specs_gb):
+        field = table.field(name)
+        values = field.data[rows]
+        if field.kind in ('date', 'datetime'):
+            values = _date_bucket(values, granularity or 'month')
+        elif field.kind == 'x2many':
+            raise ValueError('read_group por campos x2many no está soportado en el servidor falso')
+        elif field.kind in ('char', 'selection'):
+            values = pd.Series(values, dtype=object).where(lambda s: s.map(lambda v: isinstance(v, str)), None)
+        frame[f'g{i}'] = values
+    aggregates = _aggregate_specs(table, fields, {n for n, _ in specs_gb})
+    for alias, name, _ in aggregates:
+        frame[alias] = table.field(name).data[rows]
+    frame['__count'] = np.ones(len(rows), dtype=np.int64)
+    df = pd.DataFrame(frame)
+
+    agg_funcs = {'__count': 'sum'}
+    for alias, _, func in aggregates:
+        agg_funcs[alias] = {'avg': 'mean', 'count_distinct': 'nunique', 'bool_or': 'max', 'bool_and': 'min'}.get(func, func)
+    keys = [f'g{i}' for i in range(len(specs_gb))]
+    if keys:
+        grouped = df.groupby(keys, dropna=False, sort=True).agg(agg_funcs).reset_index()
+    else:
+        grouped = pd.DataFrame([{k: df[k].agg(v) for k, v in agg_funcs.items()}])
+
+    if orderby:
+        terms = [t.split() for t in orderby.split(',') if t.strip()]
+        columns = {name: f'g{i}' for i, (name, _) in enumerate(specs_gb)}
+        columns.update({alias: alias for alias, _, _ in aggregates})
+        columns['__count'] = '__count'
+        by = [columns[t[0].split(':')[0]] for t in terms if t[0].split(':')[0] in columns]
+        ascending = [not (len(t) > 1 and t[1].lower() == 'desc') for t in terms if t[0].split(':')[0] in columns]
+        if by:
+            grouped = grouped.sort_values(by, ascending=ascending, kind='stable', na_position='first')
+    grouped = grouped.iloc[offset:offset + limit if limit else None]
+
+    result = []
+    for record in grouped.to_dict('records'):
+        group = {}
+        group_domain = list(domain or [])
+        ranges = {}
+        for i, (name, granularity) in enumerate(specs_gb):
+            field = table.field(name)
+            key = groupby_used[i]
+            value = record[f'g{i}']
+            if field.kind == 'many2one':
+                value = int(value)
+                group[key] = [value, db[field.comodel].display_names()[value]] if value else False
+                group_domain.append((name, '=', value or False))
+            elif field.kind in ('date', 'datetime'):
+                granularity = granularity or 'month'
+                if pd.isna(value):
+                    group[key] = False
+                    ranges[key] = False
+                    group_domain.append((name, '=', False))
+                else:
+                    start = np.datetime64(value, 'D')
+                    end = _period_end(start, granularity)
+                    group[key] = _period_label(start, granularity, lang)
+                    ranges[key] = {'from': str(start), 'to': str(end)}
+                    group_domain += [(name, '>=', str(start)), (name, '<', str(end))]
+            else:
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    value = False
+                elif isinstance(value, np.generic):
+                    value = value.item()
+                group[key] = value
+                group_domain.append((name, '=', value))
+        for alias, _, _ in aggregates:
+            value = record[alias]
+            group[alias] = value.item() if isinstance(value, np.generic) else value
+        count = int(record['__count'])
+        if lazy and groupby_used:
+            group[f'{groupby_used[0].split(":")[0]}_count'] = count
+            if remaining:
+                group['__context'] = {'group_by': remaining}
+        else:
+            group['__count'] = count
+        if ranges:
+            group['__range'] = ranges
+        group['__domain'] = group_domain
+        result.append(group)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Servidor
+# ---------------------------------------------------------------------------
+
+class Latency:
+    """
+    Latencia simulada por llamada: base + por fila devuelta, con jitter.
+
+    Es determinista para una misma semilla y secuencia de llamadas.
+    """
+
+    def __init__(self, base_ms=0.0, per_1000_rows_ms=0.0, jitter_ms=0.0, seed=0):
+        self.base = base_ms / 1000.0
+        self.per_row = per_1000_rows_ms / 1000.0 / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, rows=0):
+        if not (self.base or self.per_row or self.jitter):
+            return
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        time.sleep(self.base + self.per_row * rows + jitter)
+
+
+class FakeOdoo:
+    """
+    Implementación de los servicios `common` y `object` de Odoo sobre un
+    diccionario de tablas {modelo: Table}.
+    """
+
+    def __init__(self, tables, latency=None, login=FAKE_LOGIN, password=FAKE_PASSWORD, db_name=FAKE_DB):
+        self.db = tables
+        self.latency = latency or Latency()
+        self.login = login
+        self.password = password
+        self.db_name = db_name
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    # common ---------------------------------------------------------------
+    def authenticate(self, db, login, password, user_agent_env=None):
+        if db == self.db_name and login == self.login and password == self.password:
+            return FAKE_UID
+        return False
+
+    def version(self):
+        return {'server_version': '16.0', 'server_version_info': [16, 0, 0, 'final', 0, ''],
+                'server_serie': '16.0', 'protocol_version': 1}
+
+    # object ---------------------------------------------------------------
+    def execute_kw(self, db, uid, password, model, method, args=None, kwargs=None):
+        if db != self.db_name or uid != FAKE_UID or password != self.password:
+            raise xmlrpc.client.Fault(3, 'Access Denied')
+        table = self.db.get(model)
+        if table is None:
+            raise xmlrpc.client.Fault(2, f"Object {model} doesn't exist")
+        handler = getattr(self, f'_m_{method}', None)
+        if handler is None:
+            raise xmlrpc.client.Fault(2, f"The method '{method}' does not exist on the model '{model}' (servidor falso)")
+        with self._lock:
+            self.calls += 1
+        try:
+            result = handler(table, list(args or []), dict(kwargs or {}))
+        except xmlrpc.client.Fault:
+            raise
+        except Exception as e:
+            raise xmlrpc.client.Fault(1, f'{type(e).__name__}: {e}\n{traceback.format_exc()}')
+        self.latency.delay(len(result) if isinstance(result, list) else 0)
+        return result
+
+    @staticmethod
+    def _arg(args, kwargs, index, name, default=None):
+        if name in kwargs:
+            return kwargs[name]
+        return args[index] if len(args) > index else default
+
+    def _search(self, table, args, kwargs):
+        domain = self._arg(args, kwargs, 0, 'domain', [])
+        offset = self._arg(args, kwargs, 2, 'offset', 0) or 0
+        limit = self._arg(args, kwargs, 3, 'limit')
+        order = self._arg(args, kwargs, 4, 'order')
+        rows = order_rows(table, np.flatnonzero(evaluate_domain(self.db, table, domain)), order)
+        return rows[offset:offset + limit if limit else None]
+
+    def _m_search_read(self, table, args, kwargs):
+        fields = self._arg(args, kwargs, 1, 'fields')
+        return read_rows(self.db, table, self._search(table, args, kwargs), fields)
+
+    def _m_search(self, table, args, kwargs):
+        args = args[:1] + [None] + args[1:]  # search(domain, offset, limit, order)
+        return (self._search(table, args, kwargs) + 1).tolist()
+
+    def _m_search_count(self, table, args, kwargs):
+        domain = self._arg(args, kwargs, 0, 'domain', [])
+        return int(evaluate_domain(self.db, table, domain).sum())
+
+    def _m_read(self, table, args, kwargs):
+        ids = self._arg(args, kwargs, 0, 'ids', [])
+        ids = [ids] if isinstance(ids, int) else list(ids)
+        rows = np.array([i - 1 for i in ids if 0 < i <= table.size], dtype=np.int64)
+        return read_rows(self.db, table, rows, self._arg(args, kwargs, 1, 'fields'))
+
+    def _m_read_group(self, table, args, kwargs):
+        return read_group(
+            self.db, table,
+            self._arg(args, kwargs, 0, 'domain', []),
+            self._arg(args, kwargs, 1, 'fields', []),
+            self._arg(args, kwargs, 2, 'groupby', []),
+            offset=self._arg(args, kwargs, 3, 'offset', 0) or 0,
+            limit=self._arg(args, kwargs, 4, 'limit'),
+            orderby=self._arg(args, kwargs, 5, 'orderby', False),
+            lazy=self._arg(args, kwargs, 6, 'lazy', True),
+            context=kwargs.get('context'),
+        )
+
+    def _m_fields_get(self, table, args, kwargs):
+        types = {'x2many': 'many2many'}
+        return {
+            name: {'type': types.get(f.kind, f.kind), 'string': f.string or name,
+                   **({'relation': f.comodel} if f.comodel else {})}
+            for name, f in table.fields.items()
+        }
+
+
+class _RequestHandler(SimpleXMLRPCRequestHandler):
+    # Keep-alive como Odoo/werkzeug, para que el pool de transportes reutilice conexiones
+    protocol_version = 'HTTP/1.1'
+    rpc_paths = ()
+    # Odoo no comprime las respuestas XML-RPC; así los bytes medidos son comparables
+    encode_threshold = None
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadedXMLRPCServer(socketserver.ThreadingMixIn, MultiPathXMLRPCServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(fake, host='127.0.0.1', port=8069):
+    """Servidor XML-RPC multihilo con las rutas /xmlrpc/2/common y /xmlrpc/2/object."""
+    server = ThreadedXMLRPCServer((host, port), requestHandler=_RequestHandler,
+                                  allow_none=True, logRequests=False)
+    common = SimpleXMLRPCDispatcher(allow_none=True)
+    common.register_function(fake.authenticate, 'authenticate')
+    common.register_function(fake.version, 'version')
+    obj = SimpleXMLRPCDispatcher(allow_none=True)
+    obj.register_function(fake.execute_kw, 'execute_kw')
+    for prefix in ('/xmlrpc/2', '/xmlrpc'):
+        server.add_dispatcher(f'{prefix}/common', common)
+        server.add_dispatcher(f'{prefix}/object', obj)
+    return server
+
+
+def start_fake_odoo(lines=10000, seed=42, latency=None, host='127.0.0.1', port=0, **data_options):
+    """
+    Genera los datos y levanta el servidor en un hilo.
+
+    Args:
+        lines (int): Líneas de account.move.line a generar
+        seed (int): Semilla del generador
+        latency (Latency, optional): Latencia simulada por llamada
+        port (int): Puerto (0 = uno libre)
+        **data_options: Opciones extra de `benchmarks.fake_data.generate`
+
+    Returns:
+        tuple: (server, fake, url); `server.shutdown()` lo detiene
+    """
+    from .fake_data import generate
+
+    fake = FakeOdoo(generate(lines=lines, seed=seed, **data_options), latency)
+    server = make_server(fake, host, port)
+    threading.Thread(target=server.serve_forever, name='fake-odoo', daemon=True).start()
+    url = f'http://{host}:{server.server_address[1]}'
+    return server, fake, url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Servidor Odoo falso para benchmarks')
+    parser.add_argument('--lines', type=int, default=100000, help='líneas de account.move.line')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', help='último día de datos (YYYY-MM-DD, por defecto fin del mes actual)')
+    parser.add_argument('--months', type=int, default=24, help='meses de historia')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8069)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='latencia fija por llamada')
+    parser.add_argument('--per-1000-rows-ms', type=float, default=0.0, help='latencia extra por cada 1000 filas devueltas')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='jitter aleatorio por llamada')
+    args = parser.parse_args(argv)
+
+    from .fake_data import generate
+
+    start = time.perf_counter()
+    tables = generate(lines=args.lines, seed=args.seed, end_date=args.end_date, months=args.months)
+    print(f"[OK] Datos generados en {time.perf_counter() - start:.1f}s: "
+          + ', '.join(f'{name} {t.size:,}' for name, t in tables.items() if t.size >= 1000))
+    latency = Latency(args.latency_ms, args.per_1000_rows_ms, args.jitter_ms, args.seed)
+    server = make_server(FakeOdoo(tables, latency), args.host, args.port)
+    print(f"[OK] Odoo falso en http://{args.host}:{args.port}")
+    print(f"     ODOO_URL=http://{args.host}:{args.port} ODOO_DB={FAKE_DB} ODOO_USER={FAKE_LOGIN} ODOO_PASSWORD={FAKE_PASSWORD}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Servidor detenido")
+
+
+if __name__ == '__main__':
+    main()
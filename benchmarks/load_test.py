@@ -0,0 +1,528 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga HTTP de las rutas de Flask.
+
+Inicia sesión una vez y reproduce una mezcla de tráfico realista con N
+usuarios concurrentes (hilos):
+
+- dashboard_mes: /dashboard cambiando de mes
+- cobranza_internacional: las cinco llamadas /api/cobranza_internacional/*
+  en paralelo, como las lanza el navegador al cargar el dashboard
+- cxc_filtros: /reporte_cxc_general con distintos filtros de fecha,
+  cliente y cuentas
+- excel: una de las cuatro exportaciones a Excel
+
+Reporta p50/p95/p99 por ruta, throughput y tasa de error para cada nivel de
+concurrencia, y guarda el resultado en benchmarks/results/load-*.json. Con
+`--compare` se contrasta contra una corrida anterior, para comprobar si un
+cambio de caché realmente ayuda bajo concurrencia.
+
+Uso:
+    # contra la app ya levantada (con el Odoo falso o uno real)
+    python -m benchmarks.load_test --base-url http://127.0.0.1:5002 --concurrency 1,4,8
+
+    # levanta el Odoo falso y gunicorn con la configuración a dimensionar
+    python -m benchmarks.load_test --spawn --lines 100000 --workers 2 --threads 4 --concurrency 1,4,8,16
+"""
+
+import argparse
+import calendar
+import http.client
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.fake_data import ACCOUNTS, PARTNER_NAMES
+from benchmarks.fake_odoo import FAKE_DB, FAKE_LOGIN, FAKE_PASSWORD
+from benchmarks.suite import RESULTS_DIR, ROOT, _free_port, _wait_for_server
+
+DEFAULT_MIX = 'dashboard_mes=4,cobranza_internacional=3,cxc_filtros=2,excel=1'
+
+# Lo que pide el dashboard de cobranza internacional por cambio de filtros
+COBRANZA_INTERNACIONAL_APIS = ('summary', 'dso_trend')
+
+# Combinaciones de cuentas de CxC que usan los analistas
+ACCOUNT_FILTERS = (None, ACCOUNTS[0][0], f'{ACCOUNTS[0][0]},{ACCOUNTS[1][0]}', f'{ACCOUNTS[3][0]},{ACCOUNTS[4][0]}')
+
+
+# ---------------------------------------------------------------------------
+# Cliente HTTP
+# ---------------------------------------------------------------------------
+
+class Client:
+    """
+    Cliente HTTP con keep-alive: una conexión por hilo y la cookie de sesión
+    compartida entre todos los hilos.
+    """
+
+    def __init__(self, base_url, timeout=300):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.timeout = timeout
+        self.cookie = ''
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        """Returns: (status, cuerpo, cabeceras). Status 0 si falló la conexión."""
+        headers = dict(headers or {})
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                return response.status, data, response.headers
+            except (http.client.HTTPException, OSError):
+                # Conexión keep-alive cerrada por el servidor: se reintenta una vez
+                self._reset()
+                if attempt == 2:
+                    raise
+
+    def _store_cookie(self, headers):
+        cookie = SimpleCookie()
+        for value in headers.get_all('Set-Cookie') or []:
+            cookie.load(value)
+        if cookie:
+            jar = SimpleCookie(self.cookie)
+            jar.update(cookie)
+            self.cookie = '; '.join(f'{k}={m.value}' for k, m in jar.items() if m.value)
+
+    def login(self, username, password):
+        """Inicia sesión y guarda la cookie. Returns: bool"""
+        body = urlencode({'username': username, 'password': password})
+        status, _, headers = self.request('POST', '/login', body,
+                                          {'Content-Type': 'application/x-www-form-urlencoded'})
+        # El login exitoso redirige al dashboard; si falla vuelve a mostrar el formulario
+        if status != 302:
+            return False
+        self._store_cookie(headers)
+        # Seguir la redirección consume el mensaje flash del login
+        location = urlsplit(headers.get('Location', '/dashboard'))
+        status, _, headers = self.request('GET', location.path + (f'?{location.query}' if location.query else ''))
+        self._store_cookie(headers)
+        return status == 200
+
+
+# ---------------------------------------------------------------------------
+# Registro de resultados
+# ---------------------------------------------------------------------------
+
+def percentile(values, p):
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def _stats(samples):
+    times = sorted(s[0] for s in samples)
+    errors = sum(1 for s in samples if not s[1])
+    return {
+        'count': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'p50_ms': percentile(times, 50) * 1000,
+        'p95_ms': percentile(times, 95) * 1000,
+        'p99_ms': percentile(times, 99) * 1000,
+        'mean_ms': sum(times) / len(times) * 1000,
+        'max_ms': times[-1] * 1000,
+        'bytes': sum(s[2] for s in samples),
+    }
+
+
+class Recorder:
+    """Muestras (segundos, ok, bytes) por ruta y por escenario."""
+
+    def __init__(self):
+        self.routes = {}
+        self.scenarios = {}
+        self.errors = {}
+        self.enabled = True
+        self._lock = threading.Lock()
+
+    def add(self, route, seconds, ok, size, detail=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.routes.setdefault(route, []).append((seconds, ok, size))
+            if not ok and detail:
+                key = f'{route}: {detail}'
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def add_scenario(self, name, seconds, ok):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.scenarios.setdefault(name, []).append((seconds, ok, 0))
+
+    def summary(self, elapsed):
+        with self._lock:
+            routes = {route: _stats(samples) for route, samples in sorted(self.routes.items())}
+            scenarios = {name: _stats(samples) for name, samples in sorted(self.scenarios.items())}
+            errors = dict(sorted(self.errors.items(), key=lambda x: x[1], reverse=True))
+        total = sum(r['count'] for r in routes.values())
+        failed = sum(r['errors'] for r in routes.values())
+        return {
+            'duration_s': elapsed,
+            'requests': total,
+            'errors': failed,
+            'error_rate': failed / total if total else 0.0,
+            'throughput_rps': total / elapsed if elapsed else 0.0,
+            'routes': routes,
+            'scenarios': scenarios,
+            'error_samples': errors,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Escenarios
+# ---------------------------------------------------------------------------
+
+class Traffic:
+    """Mezcla de tráfico: cada escenario hace una o más requests y las registra."""
+
+    def __init__(self, client, recorder, months, fanout_pool):
+        self.client = client
+        self.recorder = recorder
+        self.months = months
+        self.fanout_pool = fanout_pool
+
+    def get(self, route, params=None):
+        """GET registrado bajo `route`; cualquier status distinto de 200 es error."""
+        path = route + (f'?{urlencode(params)}' if params else '')
+        start = time.perf_counter()
+        try:
+            status, body, _ = self.client.request('GET', path)
+            detail = None if status == 200 else f'HTTP {status}'
+            size = len(body)
+        except Exception as e:
+            status, size, detail = 0, 0, type(e).__name__
+        self.recorder.add(route, time.perf_counter() - start, status == 200, size, detail)
+        return status == 200
+
+    def _month_range(self, month):
+        year, number = map(int, month.split('-'))
+        return f'{month}-01', f'{month}-{calendar.monthrange(year, number)[1]:02d}'
+
+    def dashboard_mes(self, rng):
+        return self.get('/dashboard', {'mes': rng.choice(self.months)})
+
+    def cobranza_internacional(self, rng):
+        params = {}
+        if rng.random() < 0.5:
+            start, _ = self._month_range(self.months[-1])
+            _, end = self._month_range(self.months[0])
+            params = {'start': start, 'end': end}
+        futures = [self.fanout_pool.submit(self.get, f'/api/cobranza_internacional/{api}', params)
+                   for api in COBRANZA_INTERNACIONAL_APIS]
+        return all(f.result() for f in futures)
+
+    def cxc_filtros(self, rng):
+        params = {}
+        if rng.random() < 0.6:
+            params['date_from'], params['date_to'] = self._month_range(rng.choice(self.months))
+        if rng.random() < 0.3:
+            params['customer'] = rng.choice(PARTNER_NAMES)
+        codes = rng.choice(ACCOUNT_FILTERS)
+        if codes:
+            params['account_codes'] = codes
+        return self.get('/reporte_cxc_general', params)
+
+    def excel(self, rng):
+        month = rng.choice(self.months)
+        date_from, date_to = self._month_range(month)
+        route, params = rng.choice((
+            ('/export/excel/sales', {'date_from': date_from, 'date_to': date_to}),
+            ('/export/dashboard/details', {'mes': month}),
+            ('/export/excel/cxc', {'date_from': date_from, 'date_to': date_to}),
+            ('/export/excel/internacional', {}),
+        ))
+        return self.get(route, params)
+
+
+def parse_mix(text):
+    """'a=4,b=1' -> [('a', 4.0), ('b', 1.0)]"""
+    mix = []
+    for item in text.split(','):
+        name, _, weight = item.strip().partition('=')
+        if not hasattr(Traffic, name) or name.startswith('_') or name == 'get':
+            raise ValueError(f'Escenario desconocido: {name}')
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def run_level(client, mix, months, concurrency, duration, warmup, think_ms, seed):
+    """
+    Ejecuta `concurrency` usuarios durante `warmup` + `duration` segundos.
+
+    Returns:
+        dict: Resumen del nivel (ver Recorder.summary)
+    """
+    recorder = Recorder()
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    fanout_pool = ThreadPoolExecutor(max_workers=concurrency * len(COBRANZA_INTERNACIONAL_APIS),
+                                     thread_name_prefix='fanout')
+    traffic = Traffic(client, recorder, months, fanout_pool)
+    stop = threading.Event()
+
+    def user(index):
+        rng = random.Random(seed * 1000 + index)
+        while not stop.is_set():
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            ok = getattr(traffic, name)(rng)
+            traffic.recorder.add_scenario(name, time.perf_counter() - start, ok)
+            if think_ms:
+                stop.wait(rng.expovariate(1000 / think_ms))
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    recorder.enabled = not warmup
+    for t in threads:
+        t.start()
+    if warmup:
+        time.sleep(warmup)
+        recorder.enabled = True
+    start = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    # Las requests en curso al cortar también cuentan
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    fanout_pool.shutdown()
+    return recorder.summary(elapsed)
+
+
+# ---------------------------------------------------------------------------
+# Levantar Odoo falso + gunicorn
+# ---------------------------------------------------------------------------
+
+def _wait_for_app(base_url, process, timeout=120):
+    client = Client(base_url, timeout=5)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn terminó antes de estar listo')
+        try:
+            if client.request('GET', '/login')[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError('La app no respondió a tiempo')
+
+
+def spawn(args, end_date, log_dir):
+    """
+    Levanta el Odoo falso y la app con gunicorn.
+
+    Returns:
+        tuple: (base_url, [procesos])
+    """
+    odoo_port, app_port = _free_port(), _free_port()
+    odoo_url = f'http://127.0.0.1:{odoo_port}'
+    processes = []
+    server_log = open(os.path.join(log_dir, 'fake_odoo.log'), 'w', encoding='utf-8')
+    server = subprocess.Popen([
+        sys.executable, '-m', 'benchmarks.fake_odoo', '--lines', str(args.lines), '--seed', str(args.seed),
+        '--port', str(odoo_port), '--end-date', end_date, '--latency-ms', str(args.latency_ms),
+        '--per-1000-rows-ms', str(args.per_1000_rows_ms),
+    ], cwd=ROOT, stdout=server_log, stderr=subprocess.STDOUT)
+    processes.append(server)
+    _wait_for_server(odoo_url, server)
+
+    instance_dir = os.path.join(log_dir, 'instance')
+    env = dict(os.environ,
+               ODOO_URL=odoo_url, ODOO_DB=FAKE_DB, ODOO_USER=FAKE_LOGIN, ODOO_PASSWORD=FAKE_PASSWORD,
+               SECRET_KEY=os.getenv('SECRET_KEY', 'load-test'),
+               PREWARM_ENABLED=os.getenv('PREWARM_ENABLED', 'false'),
+               SALES_SNAPSHOT_DIR=os.path.join(instance_dir, 'snapshots'),
+               PREWARM_DIR=os.path.join(instance_dir, 'warm'),
+               PREWARM_LOCK=os.path.join(instance_dir, 'prewarm.lock'),
+               SLOW_CALL_LOG=os.path.join(instance_dir, 'slow_odoo_calls.jsonl'),
+               PYTHONIOENCODING='utf-8')
+    app_log = open(os.path.join(log_dir, 'gunicorn.log'), 'w', encoding='utf-8')
+    app = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{app_port}',
+        '--workers', str(args.workers), '--threads', str(args.threads), '--timeout', '600',
+    ], cwd=ROOT, env=env, stdout=app_log, stderr=subprocess.STDOUT)
+    processes.append(app)
+    base_url = f'http://127.0.0.1:{app_port}'
+    _wait_for_app(base_url, app)
+    return base_url, processes
+
+
+# ---------------------------------------------------------------------------
+# Reporte
+# ---------------------------------------------------------------------------
+
+def _print_level(level):
+    print(f"\n== Concurrencia {level['concurrency']}: {level['requests']} requests en {level['duration_s']:.1f}s, "
+          f"{level['throughput_rps']:.2f} req/s, errores {level['error_rate'] * 100:.1f}%")
+    print(f"   {'ruta':<44}{'n':>6}{'err':>6}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for title, items in (('', level['routes']), ('escenario ', level['scenarios'])):
+        for name, r in items.items():
+            print(f"   {title + name:<44}{r['count']:>6}{r['errors']:>6}"
+                  f"{r['p50_ms']:>8.0f}ms{r['p95_ms']:>8.0f}ms{r['p99_ms']:>8.0f}ms")
+    for detail, count in list(level['error_samples'].items())[:5]:
+        print(f"   [WARN] {count}x {detail}")
+
+
+def compare(current, previous):
+    """
+    Compara p95 por ruta y throughput con una corrida anterior, por nivel de
+    concurrencia.
+
+    Returns:
+        list: Filas {'concurrency', 'route', 'before_ms', 'after_ms', 'delta_pct'};
+            la ruta '*' es el throughput (req/s)
+    """
+    rows = []
+    before = {level['concurrency']: level for level in previous.get('levels', [])}
+    for level in current['levels']:
+        old = before.get(level['concurrency'])
+        if not old:
+            continue
+        if old['throughput_rps']:
+            rows.append({'concurrency': level['concurrency'], 'route': '*',
+                         'before_ms': old['throughput_rps'], 'after_ms': level['throughput_rps'],
+                         'delta_pct': (level['throughput_rps'] - old['throughput_rps']) / old['throughput_rps'] * 100})
+        for route, r in level['routes'].items():
+            o = old['routes'].get(route)
+            if o and o['p95_ms']:
+                rows.append({'concurrency': level['concurrency'], 'route': route,
+                             'before_ms': o['p95_ms'], 'after_ms': r['p95_ms'],
+                             'delta_pct': (r['p95_ms'] - o['p95_ms']) / o['p95_ms'] * 100})
+    return rows
+
+
+def _print_comparison(rows):
+    if not rows:
+        print("\n[INFO] Sin niveles comparables con la corrida anterior")
+        return
+    print("\nComparación (p95 por ruta; '*' = throughput req/s):")
+    for r in rows:
+        unit = ' req/s' if r['route'] == '*' else 'ms'
+        print(f"   c={r['concurrency']:<4}{r['route']:<44}{r['before_ms']:>9.1f} -> {r['after_ms']:.1f}{unit} "
+              f"({r['delta_pct']:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga HTTP de las rutas de Flask')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5002', help='URL de la app (sin --spawn)')
+    parser.add_argument('--username', default=os.getenv('LOAD_TEST_USER', FAKE_LOGIN))
+    parser.add_argument('--password', default=os.getenv('LOAD_TEST_PASSWORD', FAKE_PASSWORD))
+    parser.add_argument('--concurrency', default='1,4,8', help='usuarios concurrentes por nivel, separados por coma')
+    parser.add_argument('--duration', type=float, default=30.0, help='segundos medidos por nivel')
+    parser.add_argument('--warmup', type=float, default=0.0, help='segundos sin medir antes de cada nivel')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='pausa media entre escenarios de un usuario')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='pesos de los escenarios (escenario=peso,...)')
+    parser.add_argument('--months', type=int, default=6, help='meses entre los que se cambia el dashboard')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--compare', help='JSON de una corrida anterior para comparar')
+    parser.add_argument('--output', help='archivo JSON de salida (por defecto benchmarks/results/load-*.json)')
+    spawn_group = parser.add_argument_group('levantar Odoo falso + gunicorn')
+    spawn_group.add_argument('--spawn', action='store_true')
+    spawn_group.add_argument('--lines', type=int, default=100000, help='líneas de account.move.line del Odoo falso')
+    spawn_group.add_argument('--workers', type=int, default=2, help='workers de gunicorn')
+    spawn_group.add_argument('--threads', type=int, default=4, help='hilos por worker de gunicorn')
+    spawn_group.add_argument('--latency-ms', type=float, default=0.0, help='latencia simulada por llamada a Odoo')
+    spawn_group.add_argument('--per-1000-rows-ms', type=float, default=0.0, help='latencia simulada por cada 1000 filas')
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+
+    # Meses cerrados más recientes (el primero es el último mes cerrado)
+    today = date.today()
+    months = []
+    first = today.replace(day=1)
+    for _ in range(args.months):
+        first = date.fromordinal(first.toordinal() - 1).replace(day=1)
+        months.append(first.strftime('%Y-%m'))
+
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    processes = []
+    base_url = args.base_url
+    try:
+        if args.spawn:
+            log_dir = os.path.join(RESULTS_DIR, f'load-logs-{stamp}')
+            os.makedirs(log_dir, exist_ok=True)
+            end_date = today.replace(day=calendar.monthrange(today.year, today.month)[1]).isoformat()
+            print(f"[INFO] Levantando Odoo falso ({args.lines:,} líneas) y gunicorn "
+                  f"({args.workers} workers x {args.threads} hilos)...")
+            base_url, processes = spawn(args, end_date, log_dir)
+
+        client = Client(base_url)
+        if not client.login(args.username, args.password):
+            print(f"[ERROR] No se pudo iniciar sesión en {base_url} como {args.username}")
+            return 1
+        print(f"[OK] Sesión iniciada en {base_url}")
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'base_url': base_url,
+                'mix': dict(mix),
+                'months': months,
+                'duration_s': args.duration,
+                'warmup_s': args.warmup,
+                'think_ms': args.think_ms,
+                'spawn': {'lines': args.lines, 'workers': args.workers, 'threads': args.threads,
+                          'latency_ms': args.latency_ms} if args.spawn else None,
+            },
+            'levels': [],
+        }
+        for concurrency in levels:
+            print(f"[INFO] Concurrencia {concurrency} durante {args.duration:.0f}s...")
+            level = run_level(client, mix, months, concurrency, args.duration, args.warmup, args.think_ms, args.seed)
+            level['concurrency'] = concurrency
+            report['levels'].append(level)
+            _print_level(level)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+    path = args.output or os.path.join(RESULTS_DIR, f'load-{stamp}.json')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
+    print(f"\n[OK] Resultados guardados en {path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fh:
+            _print_comparison(compare(report, json.load(fh)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
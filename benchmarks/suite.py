@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+Suite de benchmarks del pipeline de datos contra el Odoo falso.
+
+Para cada escala (por defecto 10k, 100k y 1M líneas de account.move.line)
+levanta `benchmarks.fake_odoo` en un proceso aparte y ejecuta en otro
+proceso limpio los casos:
+
+- get_sales_lines: OdooManager.get_sales_lines de un mes completo
+- get_report_lines: ReportService.get_report_lines sin filtros
+- get_report_internacional: ReportService.get_report_internacional
+- get_cobranza_kpis_internacional: CobranzaService.get_cobranza_kpis_internacional
+- dashboard: ruta /dashboard del mes (cubo + aggregate_sales + render)
+- aggregate_sales: solo la agregación sobre el cubo ya construido
+- export_excel_sales, export_dashboard_details, export_excel_cxc,
+  export_excel_internacional: las cuatro exportaciones a Excel
+
+Cada caso corre en su propio proceso y se mide en frío (cachés vacías)
+`--repeat` veces (por defecto 3, y 1 desde un millón de líneas). El pico de
+memoria es lo que crece el máximo de RSS del proceso durante el caso
+(tracemalloc multiplicaba varias veces el tiempo del parseo XML-RPC). Con
+`--memory-sites` se hace además una ejecución con tracemalloc que agrega el
+pico de memoria de Python y los principales sitios de asignación. Los
+resultados se guardan en benchmarks/results/ como JSON y se comparan con
+benchmarks/baseline.json.
+
+Uso:
+    python -m benchmarks.suite                       # 10k, 100k y 1M
+    python -m benchmarks.suite --scales 10000 --repeat 5
+    python -m benchmarks.suite --save-baseline       # guarda la línea base
+    python -m benchmarks.suite --fail-on-regression  # exit 1 si empeora
+"""
+
+import argparse
+import calendar
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import xmlrpc.client
+from datetime import date, datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+DEFAULT_SCALES = (10000, 100000, 1000000)
+CASES = (
+    'get_sales_lines', 'get_report_lines', 'get_report_internacional', 'get_cobranza_kpis_internacional',
+    'dashboard', 'aggregate_sales', 'export_excel_sales', 'export_dashboard_details',
+    'export_excel_cxc', 'export_excel_internacional',
+)
+
+
+# ---------------------------------------------------------------------------
+# Proceso de trabajo: ejecuta los casos contra un Odoo falso ya levantado
+# ---------------------------------------------------------------------------
+
+def _reset_caches(dm):
+    """Deja el proceso en frío: sin cubos, datos maestros, snapshots ni resúmenes de cobranza."""
+    from services.metrics import odoo_metrics
+
+    dm.sales_cubes.clear()
+    dm.master_data.invalidate()
+    dm.sales_snapshots.invalidate()
+    dm.cobranza._summaries.clear()
+    odoo_metrics.reset()
+
+
+def _odoo_totals():
+    from services.metrics import odoo_metrics
+
+    calls = odoo_metrics.summary()['calls']
+    return {
+        'odoo_calls': sum(c['count'] for c in calls),
+        'odoo_rows': sum(c['rows'] for c in calls),
+        'odoo_bytes_received': sum(c['bytes_received'] for c in calls),
+    }
+
+
+def _route(client, url):
+    def run():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} respondió {response.status_code}')
+        return len(response.data)
+    return run
+
+
+def _build_cases(dm, client, month):
+    from utils.sales_aggregation import aggregate_sales
+
+    date_from, date_to = dm._month_range(month)
+
+    def aggregate():
+        cube = dm.get_sales_cube(month)
+        start = time.perf_counter()
+        aggregate_sales(cube)
+        return time.perf_counter() - start
+
+    return {
+        'get_sales_lines': (lambda: len(dm.get_sales_lines(date_from=date_from, date_to=date_to, limit=None)), None),
+        'get_report_lines': (lambda: len(dm.reports.get_report_lines(limit=0)), None),
+        'get_report_internacional': (lambda: len(dm.reports.get_report_internacional()), None),
+        'get_cobranza_kpis_internacional': (lambda: dm.cobranza.get_cobranza_kpis_internacional()['total_facturas'], None),
+        'dashboard': (_route(client, f'/dashboard?mes={month}'), None),
+        # Se mide solo la agregación: el cubo se construye fuera del cronómetro
+        'aggregate_sales': (None, aggregate),
+        'export_excel_sales': (_route(client, f'/export/excel/sales?date_from={date_from}&date_to={date_to}'), None),
+        'export_dashboard_details': (_route(client, f'/export/dashboard/details?mes={month}'), None),
+        'export_excel_cxc': (_route(client, '/export/excel/cxc'), None),
+        'export_excel_internacional': (_route(client, '/export/excel/internacional'), None),
+    }
+
+
+def _measure(dm, func, timer):
+    """Una ejecución en frío. Returns: (segundos, tamaño del resultado)"""
+    _reset_caches(dm)
+    if timer is not None:
+        return timer(), None
+    start = time.perf_counter()
+    size = func()
+    return time.perf_counter() - start, size
+
+
+def _max_rss_mb():
+    """Máximo de RSS del proceso en MB (None si no se puede medir)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo reporta en KB, macOS en bytes
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+def _memory_sites(dm, func, timer, name):
+    """Una ejecución extra con tracemalloc. Returns: dict con pico y sitios"""
+    import tracemalloc
+    from services.memory_profile import memory_profiler
+
+    memory_profiler.start()
+    try:
+        memory_profiler.begin_request(name, snapshots=True)
+        _measure(dm, func, timer)
+        result = memory_profiler.end_request()
+    finally:
+        tracemalloc.stop()
+    return {'peak_mb': result['peak_mb'], 'checkpoint': result['checkpoint'], 'sites': result['sites'][:5]}
+
+
+def run_worker(month, repeat, cases, output, memory_sites=False):
+    """Ejecuta los casos en este proceso y escribe el JSON en `output`."""
+    sys.path.insert(0, ROOT)
+    import app as webapp
+
+    dm = webapp.data_manager
+    if not dm.connection.is_connected():
+        raise SystemExit('[ERROR] No se pudo conectar al Odoo falso')
+    client = webapp.app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = 'benchmark'
+
+    all_cases = _build_cases(dm, client, month)
+    selected = cases or list(all_cases)
+    results = {}
+    for name in selected:
+        func, timer = all_cases[name]
+        times, size, error = [], None, None
+        rss_before = _max_rss_mb()
+        try:
+            for _ in range(repeat):
+                seconds, size = _measure(dm, func, timer)
+                times.append(seconds)
+            entry = {'runs': len(times), 'min_s': min(times), 'median_s': sorted(times)[len(times) // 2],
+                     'max_s': max(times), 'result_size': size}
+            entry.update(_odoo_totals())
+            rss_after = _max_rss_mb()
+            entry['peak_mb'] = rss_after - rss_before if rss_after is not None else None
+            if memory_sites:
+                entry['tracemalloc'] = _memory_sites(dm, func, timer, name)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            entry = {'error': error}
+        results[name] = entry
+        sys.__stderr__.write(f"[{'ERROR' if error else 'OK'}] {name}: "
+                             + (error or f"mediana {entry['median_s']:.3f}s") + '\n')
+
+    with open(output, 'w', encoding='utf-8') as fh:
+        json.dump(results, fh, indent=2)
+
+
+# ---------------------------------------------------------------------------
+# Orquestación
+# ---------------------------------------------------------------------------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_server(url, process, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('El Odoo falso terminó antes de estar listo')
+        try:
+            xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/common').version()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError('El Odoo falso no respondió a tiempo')
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def run_scale(scale, args, end_date, month, log_dir):
+    """Levanta el Odoo falso con `scale` líneas y ejecuta los casos."""
+    port = _free_port()
+    url = f'http://127.0.0.1:{port}'
+    server_cmd = [
+        sys.executable, '-m', 'benchmarks.fake_odoo', '--lines', str(scale), '--seed', str(args.seed),
+        '--port', str(port), '--end-date', end_date, '--latency-ms', str(args.latency_ms),
+        '--per-1000-rows-ms', str(args.per_1000_rows_ms),
+    ]
+    work_dir = tempfile.mkdtemp(prefix='bench-')
+    log_path = os.path.join(log_dir, f'scale-{scale}.log')
+    with open(log_path, 'w', encoding='utf-8') as log:
+        server = subprocess.Popen(server_cmd, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            _wait_for_server(url, server)
+            env = dict(os.environ,
+                       ODOO_URL=url, ODOO_DB='fake', ODOO_USER='admin', ODOO_PASSWORD='admin',
+                       SECRET_KEY='benchmark', PREWARM_ENABLED='false', ODOO_METRICS='true',
+                       SALES_SNAPSHOT_DIR=os.path.join(work_dir, 'snapshots'),
+                       PREWARM_DIR=os.path.join(work_dir, 'warm'),
+                       PREWARM_LOCK=os.path.join(work_dir, 'prewarm.lock'),
+                       SLOW_CALL_LOG='', PYTHONIOENCODING='utf-8')
+            repeat = args.repeat or (3 if scale < 1000000 else 1)
+            results = {}
+            # Un proceso por caso: el pico de RSS de uno no se mezcla con otro
+            for case in (args.cases.split(',') if args.cases else CASES):
+                case = case.strip()
+                output = os.path.join(work_dir, f'{case}.json')
+                worker_cmd = [sys.executable, '-m', 'benchmarks.suite', '--worker', '--month', month,
+                              '--repeat', str(repeat), '--cases', case, '--output', output]
+                if args.memory_sites:
+                    worker_cmd.append('--memory-sites')
+                subprocess.run(worker_cmd, cwd=ROOT, env=env, stdout=log, check=True)
+                with open(output, encoding='utf-8') as fh:
+                    results.update(json.load(fh))
+            return results
+        finally:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def compare(current, baseline, threshold):
+    """
+    Compara medianas y picos de memoria con la línea base.
+
+    Returns:
+        list: Filas {'scale', 'case', 'baseline_s', 'current_s', 'delta_pct',
+            'baseline_mb', 'current_mb', 'regression'}
+    """
+    rows = []
+    for scale, cases in current['results'].items():
+        for case, result in cases.items():
+            base = baseline.get('results', {}).get(scale, {}).get(case)
+            if not base or 'median_s' not in base or 'median_s' not in result:
+                continue
+            delta = (result['median_s'] - base['median_s']) / base['median_s'] * 100 if base['median_s'] else 0.0
+            rows.append({
+                'scale': scale, 'case': case,
+                'baseline_s': base['median_s'], 'current_s': result['median_s'], 'delta_pct': delta,
+                'baseline_mb': base.get('peak_mb'), 'current_mb': result.get('peak_mb'),
+                'regression': delta > threshold,
+            })
+    return rows
+
+
+def _print_results(results):
+    print(f"\n{'escala':>9}  {'caso':<32}{'mediana':>10}{'mín':>10}{'pico MB':>10}{'llamadas':>10}{'tamaño':>10}")
+    for scale, cases in results.items():
+        for case, r in cases.items():
+            if 'error' in r:
+                print(f"{int(scale):>9,}  {case:<32}  ERROR {r['error']}")
+                continue
+            peak = f"{r['peak_mb']:.1f}" if r.get('peak_mb') is not None else '-'
+            size = r['result_size'] if r.get('result_size') is not None else '-'
+            print(f"{int(scale):>9,}  {case:<32}{r['median_s']:>9.3f}s{r['min_s']:>9.3f}s{peak:>10}"
+                  f"{r.get('odoo_calls', 0):>10}{size:>10}")
+            for site in r.get('tracemalloc', {}).get('sites', [])[:3]:
+                print(f"{'':>13}{site['size_mb']:>8.1f} MB  {site['site']}")
+
+
+def _print_comparison(rows, threshold):
+    if not rows:
+        print("\n[INFO] Sin casos comparables con la línea base")
+        return
+    print(f"\nComparación con la línea base (umbral {threshold:.0f}%):")
+    for r in rows:
+        flag = '  <-- REGRESIÓN' if r['regression'] else ''
+        memory = ''
+        if r['baseline_mb'] is not None and r['current_mb'] is not None:
+            memory = f"  mem {r['baseline_mb']:.1f} -> {r['current_mb']:.1f} MB"
+        print(f"{int(r['scale']):>9,}  {r['case']:<32}{r['baseline_s']:>9.3f}s -> {r['current_s']:.3f}s "
+              f"({r['delta_pct']:+.1f}%){memory}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks del pipeline de datos con el Odoo falso')
+    parser.add_argument('--scales', default=','.join(str(s) for s in DEFAULT_SCALES),
+                        help='líneas de account.move.line por escala, separadas por coma')
+    parser.add_argument('--repeat', type=int, help='ejecuciones en frío por caso (por defecto 3; 1 desde 1M líneas)')
+    parser.add_argument('--memory-sites', action='store_true',
+                        help='ejecución extra con tracemalloc: pico de Python y sitios de asignación')
+    parser.add_argument('--cases', help='casos a ejecutar, separados por coma (por defecto todos)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='latencia simulada por llamada a Odoo')
+    parser.add_argument('--per-1000-rows-ms', type=float, default=0.0, help='latencia simulada por cada 1000 filas')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='archivo de línea base')
+    parser.add_argument('--save-baseline', action='store_true', help='guardar estos resultados como línea base')
+    parser.add_argument('--threshold', type=float, default=10.0, help='%% de empeoramiento que cuenta como regresión')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    # Modo interno: proceso que ejecuta los casos
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--month', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    cases = [c.strip() for c in args.cases.split(',')] if args.cases else None
+    if args.worker:
+        run_worker(args.month, args.repeat, cases, args.output, args.memory_sites)
+        return 0
+
+    # Datos hasta fin del mes actual; se mide el último mes cerrado
+    today = date.today()
+    end_date = today.replace(day=calendar.monthrange(today.year, today.month)[1]).isoformat()
+    previous = today.replace(day=1).toordinal() - 1
+    month = date.fromordinal(previous).strftime('%Y-%m')
+
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    log_dir = os.path.join(RESULTS_DIR, f'logs-{stamp}')
+    os.makedirs(log_dir, exist_ok=True)
+
+    results = {}
+    for scale in [int(s) for s in args.scales.split(',') if s.strip()]:
+        print(f"[INFO] Escala {scale:,} líneas (mes {month})...")
+        start = time.perf_counter()
+        try:
+            results[str(scale)] = run_scale(scale, args, end_date, month, log_dir)
+        except Exception as e:
+            print(f"[ERROR] Escala {scale:,} falló: {e} (ver {log_dir})")
+            continue
+        print(f"[OK] Escala {scale:,} en {time.perf_counter() - start:.1f}s")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': args.seed,
+            'month': month,
+            'repeat': args.repeat or 'auto',
+            'latency_ms': args.latency_ms,
+            'per_1000_rows_ms': args.per_1000_rows_ms,
+        },
+        'results': results,
+    }
+    path = os.path.join(RESULTS_DIR, f'bench-{stamp}.json')
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, indent=2)
+    _print_results(results)
+    print(f"\n[OK] Resultados guardados en {path}")
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as fh:
+            rows = compare(report, json.load(fh), args.threshold)
+        _print_comparison(rows, args.threshold)
+        regressions = [r for r in rows if r['regression']]
+    if args.save_baseline:
+        shutil.copyfile(path, args.baseline)
+        print(f"[OK] Línea base actualizada: {args.baseline}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
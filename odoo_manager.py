@@ -4,17 +4,56 @@
 import xmlrpc.client
 import os
 import pandas as pd
+import calendar
+import threading
 from datetime import datetime, timedelta
 from services.odoo_connection import OdooConnection
 from services.report_service import ReportService
 from services.cobranza_service import CobranzaService
+from services.fanout import run_task_graph
+from services.master_data import MasterDataCache
+from services.sales_snapshots import SalesSnapshotStore
+from services.singleflight import StampedeCache
+from services.prewarm import CachePrewarmer, SharedResultStore
+from services.memory_profile import memory_profiler
+from services.odoo_mirror import OdooMirror, MirrorConnection, mirror_enabled, connection_for
+from services.receivables_asof import ReceivablesAsOf
+from utils.sales_cube import SalesCube, DIMENSIONS as SALES_CUBE_DIMENSIONS
 
 class OdooManager:
+    # Campos de producto usados para enriquecer las líneas de venta
+    SALES_PRODUCT_FIELDS = [
+        'name', 'default_code', 'categ_id', 'commercial_line_national_id',
+        'pharmacological_classification_id', 'pharmaceutical_forms_id',
+        'administration_way_id', 'production_line_id', 'product_life_cycle',
+    ]
+    
+    # Vistas del cubo de ventas que se materializan por mes
+    SALES_CUBE_VIEWS = {
+        'ventas': SALES_CUBE_DIMENSIONS,
+        'clientes': ('mes', 'cliente', 'internacional'),
+    }
+
     def __init__(self):
         # Inicializar servicios
         self.connection = OdooConnection()
-        self.reports = ReportService(self.connection)
-        self.cobranza = CobranzaService(self.connection)
+        self.master_data = MasterDataCache(self.connection)
+        self.sales_snapshots = SalesSnapshotStore()
+        # Cubos de ventas por mes: el mes en curso se reconstruye cada
+        # SALES_CUBE_LIVE_TTL segundos; los cerrados siguen al snapshot
+        self.sales_cubes = StampedeCache(float(os.getenv('SALES_CUBE_LIVE_TTL', 120)), 32)
+        # Meses cuyo cubo se está construyendo en segundo plano
+        self._cubes_pending = set()
+        self._cubes_lock = threading.Lock()
+        # Cubos por producto (read_group) de /dashboard cuando el mes no tiene cubo completo
+        self.sales_group_cubes = StampedeCache(float(os.getenv('SALES_CUBE_LIVE_TTL', 120)), 32)
+        # Espejo local de facturas y líneas contables (ODOO_MIRROR, source='mirror')
+        self.mirror = OdooMirror(self.connection) if mirror_enabled() else None
+        self.mirror_connection = MirrorConnection(self.connection, self.mirror) if self.mirror else None
+        self.reports = ReportService(self.connection, self.master_data, self.mirror_connection)
+        # Saldos por cobrar a fechas pasadas, reconstruidos desde el espejo
+        self.receivables = ReceivablesAsOf(self.mirror) if self.mirror else None
+        self.cobranza = CobranzaService(self.connection, self.mirror_connection, self.receivables)
         
         # Mantener atributos para retrocompatibilidad
         self.url = self.connection.url
@@ -23,6 +62,20 @@ class OdooManager:
         self.password = self.connection.password
         self.uid = self.connection.uid
         self.models = self.connection.models
+        
+        # Tiempos por lectura del último fan-out de get_sales_lines
+        self.last_fanout_timings = {}
+        
+        # Pre-calentado: un worker refresca y todos leen del almacén compartido
+        self.warm_store = SharedResultStore()
+        self.prewarmer = CachePrewarmer({
+            'ventas_mes': self._warm_sales_month,
+            'cobranza_resumen': self._warm_cobranza_resumen,
+            'reporte_cxc': self._warm_report_cxc,
+        })
+        # Un resultado pre-calentado sirve hasta dos ciclos (por si el líder se retrasa)
+        self.warm_max_age = 2 * self.prewarmer.interval
+        self.warm_cxc_limit = int(os.getenv('PREWARM_CXC_LIMIT', 1000))
 
     def authenticate_user(self, username, password):
         """Delegar autenticación al servicio de conexión."""
@@ -102,32 +155,359 @@ class OdooManager:
             if not self.uid or not self.models:
                 return []
             
-            # Usamos read_group para obtener vendedores únicos de forma eficiente
-            seller_groups = self.models.execute_kw(
-                self.db, self.uid, self.password, 'account.move', 'read_group',
-                [[('invoice_user_id', '!=', False)]],
-                {'fields': ['invoice_user_id'], 'groupby': ['invoice_user_id']}
-            )
-            
-            # Formatear la lista para el frontend
-            sellers = []
-            for group in seller_groups:
-                if group.get('invoice_user_id'):
-                    seller_id, seller_name = group['invoice_user_id']
-                    sellers.append({'id': seller_id, 'name': seller_name})
+            def load_sellers():
+                # Usamos read_group para obtener vendedores únicos de forma eficiente
+                seller_groups = self.models.execute_kw(
+                    self.db, self.uid, self.password, 'account.move', 'read_group',
+                    [[('invoice_user_id', '!=', False)]],
+                    {'fields': ['invoice_user_id'], 'groupby': ['invoice_user_id']}
+                )
+                
+                # Formatear la lista para el frontend
+                sellers = []
+                for group in seller_groups:
+                    if group.get('invoice_user_id'):
+                        seller_id, seller_name = group['invoice_user_id']
+                        sellers.append({'id': seller_id, 'name': seller_name})
+                
+                return sorted(sellers, key=lambda x: x['name'])
             
-            return sorted(sellers, key=lambda x: x['name'])
+            # Copia para que los llamadores no modifiquen la lista en caché
+            return list(self.master_data.get_value('sellers', load_sellers))
         except Exception as e:
             print(f"Error obteniendo la lista de vendedores: {e}")
             return []
 
-    def get_sales_lines(self, page=None, per_page=None, filters=None, date_from=None, date_to=None, partner_id=None, linea_id=None, search=None, limit=5000):
-        """Obtener líneas de venta completas con todas las 27 columnas"""
+    def _sales_lines_domain(self, date_from=None, date_to=None, partner_id=None, linea_id=None):
+        """Dominio de account.move.line para las líneas de venta."""
+        domain = [
+            ('move_id.move_type', 'in', ['out_invoice', 'out_refund']),
+            ('move_id.state', '=', 'posted'),
+            ('product_id.default_code', '!=', False)  # Solo productos con código
+        ]
+        
+        # Filtros de exclusión de categorías específicas
+        excluded_categories = [315, 333, 304, 314, 318, 339]
+        domain.append(('product_id.categ_id', 'not in', excluded_categories))
+        
+        # Filtros de fecha
+        if date_from:
+            domain.append(('move_id.invoice_date', '>=', date_from))
+        if date_to:
+            domain.append(('move_id.invoice_date', '<=', date_to))
+        
+        # Filtro de cliente
+        if partner_id:
+            domain.append(('partner_id', '=', partner_id))
+        
+        # Filtro de línea comercial
+        if linea_id:
+            domain.append(('product_id.commercial_line_national_id', '=', linea_id))
+        
+        return domain
+
+    def get_sales_month_version(self, date_from, date_to):
+        """
+        Versión barata de las ventas de un período: cantidad de líneas y
+        último write_date. Cambia si se publica, cancela o edita una factura.
+        
+        Returns:
+            str: Versión, o None si Odoo no está disponible
+        """
+        try:
+            if not self.connection.is_connected():
+                return None
+            domain = self._sales_lines_domain(date_from, date_to)
+            count = self.connection._call('account.move.line', 'search_count', [domain])
+            last = self.connection._call(
+                'account.move.line', 'search_read', [domain],
+                {'fields': ['write_date'], 'order': 'write_date desc', 'limit': 1}
+            )
+            return f"{count}:{last[0]['write_date'] if last else ''}"
+        except Exception as e:
+            print(f"⚠️ No se pudo obtener la versión de ventas {date_from}..{date_to}: {e}")
+            return None
+
+    @staticmethod
+    def _month_range(mes):
+        """Primer y último día ('YYYY-MM-DD') de un mes 'YYYY-MM'."""
+        año_sel, mes_sel = mes.split('-')
+        ultimo_dia = calendar.monthrange(int(año_sel), int(mes_sel))[1]
+        return f"{año_sel}-{mes_sel}-01", f"{año_sel}-{mes_sel}-{ultimo_dia}"
+
+    def get_sales_lines_month(self, mes):
+        """
+        Líneas de venta de un mes completo ('YYYY-MM').
+        
+        Los meses cerrados se sirven desde un snapshot en disco mientras su
+        versión en Odoo no cambie; el mes actual (o futuro) siempre se
+        consulta en vivo. Las líneas devueltas no deben modificarse.
+        
+        Un snapshot solo se escribe si todas las lecturas relacionadas
+        funcionaron; si alguna falla se devuelven las líneas en vivo (con
+        los datos que se pudieron leer) sin guardarlas.
+        """
+        fecha_inicio, fecha_fin = self._month_range(mes)
+        
+        def load(strict=False):
+            return self.get_sales_lines(date_from=fecha_inicio, date_to=fecha_fin, limit=None, strict=strict)
+        
+        if mes >= datetime.now().strftime('%Y-%m'):
+            warm = self.warm_store.get(f'ventas_{mes}', self.warm_max_age)
+            if warm is not None:
+                return warm
+            return load()
+        
+        try:
+            return self.sales_snapshots.get(
+                mes,
+                version_loader=lambda: self.get_sales_month_version(fecha_inicio, fecha_fin),
+                loader=lambda: load(strict=True)
+            )
+        except Exception as e:
+            print(f"[WARN] Ventas de {mes} incompletas, no se guarda snapshot: {e}")
+            return load()
+
+    def get_sales_cube(self, mes, view='ventas'):
+        """
+        Cubo de ventas materializado de un mes 'YYYY-MM'.
+        
+        Todas las vistas del mes (SALES_CUBE_VIEWS) se construyen juntas a
+        partir de sus líneas (snapshot si el mes ya cerró) y se guardan en
+        memoria: el mes en curso durante SALES_CUBE_LIVE_TTL segundos y los
+        meses cerrados durante el intervalo de verificación de los snapshots.
+        
+        Args:
+            mes (str): Mes 'YYYY-MM'
+            view (str): 'ventas' (dimensiones comerciales) o 'clientes'
+        
+        Returns:
+            SalesCube
+        """
+        def build():
+            lines = self.get_sales_lines_month(mes)
+            cubes = SalesCube.views_from_lines(lines, mes, self.SALES_CUBE_VIEWS)
+            print(f"🧊 Cubo de ventas {mes}: {len(lines)} líneas -> {len(cubes['ventas'])} celdas")
+            return cubes
+        
+        def ttl_for(cubes):
+            if not len(cubes['ventas']):
+                # Sin ventas (mes vacío u Odoo caído) no se recuerda por mucho tiempo
+                return min(self.sales_cubes.ttl, 30)
+            if mes >= datetime.now().strftime('%Y-%m'):
+                return None
+            return self.sales_snapshots.check_interval
+        
+        # Usuarios simultáneos comparten una sola construcción por mes
+        return self.sales_cubes.get_or_load(mes, build, ttl_for)[view]
+
+    def get_sales_cube_range(self, meses, view='ventas'):
+        """Cubo de ventas de varios meses 'YYYY-MM' (une los cubos mensuales)."""
+        return SalesCube.concat([self.get_sales_cube(mes, view) for mes in meses])
+
+    def get_sales_cube_range_cached(self, meses, view='ventas'):
+        """
+        Cubo de los meses que ya están en memoria, sin esperar a Odoo.
+        
+        Los meses sin cubo se construyen en segundo plano (uno tras otro,
+        en un solo hilo) para que una página que solo complementa sus datos
+        con ventas reales no quede bloqueada con la caché fría.
+        
+        Args:
+            meses (list): Meses 'YYYY-MM'
+            view (str): 'ventas' o 'clientes'
+        
+        Returns:
+            tuple: (SalesCube de los meses disponibles, lista de meses pendientes)
+        """
+        cubes, pendientes = [], []
+        for mes in meses:
+            views = self.sales_cubes.get(mes)
+            if views is None:
+                pendientes.append(mes)
+            else:
+                cubes.append(views[view])
+        if pendientes:
+            self._build_cubes_in_background(pendientes)
+        return SalesCube.concat(cubes), pendientes
+
+    def _build_cubes_in_background(self, meses):
+        with self._cubes_lock:
+            nuevos = [mes for mes in meses if mes not in self._cubes_pending]
+            self._cubes_pending.update(nuevos)
+        if not nuevos:
+            return
+        
+        def run():
+            for mes in nuevos:
+                try:
+                    self.get_sales_cube(mes)
+                except Exception as e:
+                    print(f"[WARN] No se pudo construir el cubo de ventas {mes}: {e}")
+                finally:
+                    with self._cubes_lock:
+                        self._cubes_pending.discard(mes)
+        
+        threading.Thread(target=run, name='sales-cube-build', daemon=True).start()
+
+    def get_sales_groups(self, date_from=None, date_to=None):
+        """
+        Ventas nacionales del período agregadas en Odoo con read_group.
+        
+        En lugar de descargar y enriquecer cada línea, se agrupa
+        account.move.line por producto en el servidor (con los filtros de
+        IGV y de canal internacional dentro del dominio) y luego se unen
+        localmente los atributos del producto desde la caché de datos
+        maestros. Una segunda agrupación obtiene la parte de cada producto
+        vendida con ruta 18/19 (vía sale_line_ids).
+        
+        Devuelve "líneas agregadas" con las claves que usa el cubo de ventas
+        (sin vendedor ni cliente) y la cantidad de líneas en `line_count`.
+        
+        Returns:
+            list: Líneas agregadas, o None si read_group no está disponible
+        """
+        try:
+            if not self.connection.is_connected():
+                return None
+            
+            domain = self._sales_lines_domain(date_from, date_to)
+            # Mismo criterio que el filtro de impuestos de get_sales_lines
+            domain.append(('tax_ids.name', 'in', ['IGV', 'IGV_INC']))
+            # Excluir canal internacional (las facturas sin canal se mantienen)
+            domain += ['|', ('move_id.team_id', '=', False), ('move_id.team_id.name', 'not ilike', 'INTERNACIONAL')]
+            
+            def group_by_product(extra_domain):
+                groups = self.connection._call(
+                    'account.move.line', 'read_group',
+                    [domain + extra_domain, ['balance:sum', 'quantity:sum'], ['product_id']],
+                    {'lazy': False, 'context': {'lang': 'es_PE'}}
+                )
+                return {
+                    g['product_id'][0]: g for g in groups if g.get('product_id')
+                }
+            
+            totals = group_by_product([])
+            rutas = group_by_product([('sale_line_ids.route_id', 'in', [18, 19])])
+            
+            products = self.master_data.get_records(
+                'product.product', list(totals), self.SALES_PRODUCT_FIELDS, context={'lang': 'es_PE'}, strict=True
+            )
+            
+            grouped_lines = []
+            for product_id, group in totals.items():
+                product = products.get(product_id, {})
+                ruta_group = rutas.get(product_id, {})
+                base = {
+                    'commercial_line_national_id': product.get('commercial_line_national_id'),
+                    'sales_channel_id': False,
+                    'product_id': group['product_id'],
+                    'name': product.get('name', ''),
+                    'default_code': product.get('default_code', ''),
+                    'product_life_cycle': product.get('product_life_cycle'),
+                    'pharmaceutical_forms_id': product.get('pharmaceutical_forms_id'),
+                    'categ_id': product.get('categ_id'),
+                }
+                # El saldo contable de ventas es negativo: se invierte como en get_sales_lines
+                balance_total = -(group.get('balance') or 0.0)
+                balance_ruta = -(ruta_group.get('balance') or 0.0)
+                quantity_total = group.get('quantity') or 0.0
+                quantity_ruta = ruta_group.get('quantity') or 0.0
+                count_total = group.get('__count', 0)
+                count_ruta = ruta_group.get('__count', 0)
+                
+                if count_ruta:
+                    grouped_lines.append(dict(base, route_id=[18, 'Ruta 18/19'], balance=balance_ruta,
+                                              quantity=quantity_ruta, line_count=count_ruta))
+                if count_total - count_ruta:
+                    grouped_lines.append(dict(base, route_id=False, balance=balance_total - balance_ruta,
+                                              quantity=quantity_total - quantity_ruta,
+                                              line_count=count_total - count_ruta))
+            
+            print(f"📊 read_group: {len(totals)} productos agrupados en {len(grouped_lines)} líneas agregadas")
+            return grouped_lines
+        
+        except Exception as e:
+            print(f"⚠️ read_group de ventas no disponible, se usarán líneas completas: {e}")
+            return None
+
+    def get_dashboard_sales_cube(self, mes):
+        """
+        Cubo de ventas de un mes para /dashboard.
+        
+        Si el cubo completo del mes ya está en memoria se usa tal cual. Si
+        no, en lugar de descargar y enriquecer todas las líneas se arma un
+        cubo por producto × ruta con get_sales_groups (read_group), que
+        alcanza para los desgloses de /dashboard (línea, ruta, IPN, top de
+        productos, ciclo de vida y forma); no tiene vendedor ni cliente. Si
+        read_group no está disponible se construye el cubo completo.
+        
+        Args:
+            mes (str): Mes 'YYYY-MM'
+        
+        Returns:
+            SalesCube
+        """
+        views = self.sales_cubes.get(mes)
+        if views is not None:
+            return views['ventas']
+        
+        def build():
+            groups = self.get_sales_groups(*self._month_range(mes))
+            return None if groups is None else SalesCube.from_lines(groups, mes)
+        
+        def ttl_for(cube):
+            if cube is None or not len(cube):
+                return min(self.sales_cubes.ttl, 30)
+            if mes >= datetime.now().strftime('%Y-%m'):
+                return None
+            return self.sales_snapshots.check_interval
+        
+        cube = self.sales_group_cubes.get_or_load(mes, build, ttl_for)
+        if cube is None:
+            return self.get_sales_cube(mes)
+        return cube
+
+    @staticmethod
+    def _whole_months(date_from, date_to):
+        """
+        Meses 'YYYY-MM' cubiertos por el rango si este empieza el día 1 y
+        termina el último día de un mes; None en otro caso.
+        """
+        if not date_from or not date_to:
+            return None
+        try:
+            inicio = datetime.strptime(date_from, '%Y-%m-%d')
+            fin = datetime.strptime(date_to, '%Y-%m-%d')
+        except (TypeError, ValueError):
+            return None
+        if inicio.day != 1 or fin.day != calendar.monthrange(fin.year, fin.month)[1] or fin < inicio:
+            return None
+        meses = []
+        año, mes = inicio.year, inicio.month
+        while (año, mes) <= (fin.year, fin.month):
+            meses.append(f"{año}-{mes:02d}")
+            año, mes = (año + 1, 1) if mes == 12 else (año, mes + 1)
+        return meses
+
+    def get_sales_lines(self, page=None, per_page=None, filters=None, date_from=None, date_to=None, partner_id=None, linea_id=None, search=None, limit=5000, source=None, strict=False):
+        """
+        Obtener líneas de venta completas con todas las 27 columnas.
+        
+        Con source='mirror' (o ODOO_DATA_SOURCE=mirror) las líneas y las
+        facturas se leen del espejo local; el resto sigue yendo a Odoo.
+        
+        Con strict=True cualquier lectura fallida (líneas base, datos
+        maestros u órdenes) lanza la excepción en lugar de devolver líneas
+        incompletas; lo usan los snapshots de meses cerrados.
+        """
         try:
             print(f"🔍 Obteniendo líneas de venta completas...")
+            connection = connection_for(source, self.connection, self.mirror_connection)
+            models = connection.models
             
             # Verificar conexión
-            if not self.uid or not self.models:
+            if not connection.is_connected():
                 print("❌ No hay conexión a Odoo disponible")
                 if page is not None and per_page is not None:
                     return [], {'page': page, 'per_page': per_page, 'total': 0, 'pages': 0}
@@ -142,48 +522,22 @@ class OdooManager:
                 search = filters.get('search')
             
             # Construir dominio de filtro
-            domain = [
-                ('move_id.move_type', 'in', ['out_invoice', 'out_refund']),
-                ('move_id.state', '=', 'posted'),
-                ('product_id.default_code', '!=', False)  # Solo productos con código
-            ]
-            
-            # Filtros de exclusión de categorías específicas
-            excluded_categories = [315, 333, 304, 314, 318, 339]
-            domain.append(('product_id.categ_id', 'not in', excluded_categories))
-            
-            # Filtros de fecha
-            if date_from:
-                domain.append(('move_id.invoice_date', '>=', date_from))
-            if date_to:
-                domain.append(('move_id.invoice_date', '<=', date_to))
-            
-            # Filtro de cliente
-            if partner_id:
-                domain.append(('partner_id', '=', partner_id))
-            
-            # Filtro de línea comercial
-            if linea_id:
-                domain.append(('product_id.commercial_line_national_id', '=', linea_id))
-            
-            # Obtener líneas base con todos los campos necesarios
-            query_options = {
-                'fields': [
+            domain = self._sales_lines_domain(date_from, date_to, partner_id, linea_id)
+            
+            # Obtener líneas base con todos los campos necesarios.
+            # Se pagina por id para no truncar meses grandes (limit=None = todas);
+            # con tope se devuelven las más recientes, como el listado de Odoo.
+            read_all = connection.iter_search_read if strict else connection.search_read_all
+            sales_lines_base = list(read_all(
+                'account.move.line', domain,
+                [
                     'move_id', 'partner_id', 'product_id', 'balance', 'move_name',
                     'quantity', 'price_unit', 'tax_ids'
                 ],
-                'context': {'lang': 'es_PE'}
-            }
-            
-            # Solo agregar limit si no es None (XML-RPC no maneja None)
-            if limit is not None:
-                query_options['limit'] = limit
-            
-            sales_lines_base = self.models.execute_kw(
-                self.db, self.uid, self.password, 'account.move.line', 'search_read',
-                [domain],
-                query_options
-            )
+                limit=limit,
+                context={'lang': 'es_PE'},
+                order='date desc, id desc'
+            ))
             
             print(f"📊 Base obtenida: {len(sales_lines_base)} líneas")
             
@@ -197,10 +551,20 @@ class OdooManager:
             
             print(f"📊 IDs únicos: {len(move_ids)} facturas, {len(product_ids)} productos, {len(partner_ids)} clientes")
             
-            # Obtener datos de facturas (account.move) - Asientos contables
-            move_data = {}
-            if move_ids:
-                moves = self.models.execute_kw(
+            # Obtener todos los tax_ids únicos de las líneas contables
+            all_tax_ids = set()
+            for line in sales_lines_base:
+                if line.get('tax_ids'):
+                    all_tax_ids.update(line['tax_ids'])
+            
+            # Lecturas relacionadas como grafo: facturas, productos, clientes e
+            # impuestos son independientes y corren en paralelo; órdenes y
+            # líneas de orden esperan solo a las facturas (necesitan order_id).
+            def read_moves(results):
+                # Obtener datos de facturas (account.move) - Asientos contables
+                if not move_ids:
+                    return {}
+                moves = models.execute_kw(
                     self.db, self.uid, self.password, 'account.move', 'search_read',
                     [[('id', 'in', move_ids)]],
                     {
@@ -212,50 +576,39 @@ class OdooManager:
                         'context': {'lang': 'es_PE'}
                     }
                 )
-                move_data = {m['id']: m for m in moves}
-                print(f"✅ Asientos contables (account.move): {len(move_data)} registros")
-            
-            # Obtener datos de productos con todos los campos farmacéuticos
-            product_data = {}
-            if product_ids:
-                products = self.models.execute_kw(
-                    self.db, self.uid, self.password, 'product.product', 'search_read',
-                    [[('id', 'in', product_ids)]],
-                    {
-                        'fields': [
-                            'name', 'default_code', 'categ_id', 'commercial_line_national_id',
-                            'pharmacological_classification_id', 'pharmaceutical_forms_id',
-                            'administration_way_id', 'production_line_id', 'product_life_cycle',
-                        ],
-                        'context': {'lang': 'es_PE'}
-                    }
+                return {m['id']: m for m in moves}
+            
+            # Productos, clientes e impuestos son datos maestros: se leen de la
+            # caché compartida y solo los ids faltantes van a Odoo.
+            def read_products(results):
+                # Obtener datos de productos con todos los campos farmacéuticos
+                return self.master_data.get_records(
+                    'product.product', product_ids, self.SALES_PRODUCT_FIELDS, context={'lang': 'es_PE'}, strict=strict
                 )
-                product_data = {p['id']: p for p in products}
-                # --- DEBUG: Imprimir los campos del primer producto para verificar el nombre del campo ---
-                if products:
-                    print("🔍 DEBUG: Campos del primer producto obtenido:")
-                    print(products[0])
-                # --- FIN DEBUG ---
-                print(f"✅ Productos: {len(product_data)} registros")
-            
-            # Obtener datos de clientes
-            partner_data = {}
-            if partner_ids:
-                partners = self.models.execute_kw(
-                    self.db, self.uid, self.password, 'res.partner', 'search_read',
-                    [[('id', 'in', partner_ids)]],
-                    {'fields': ['vat', 'name'], 'context': {'lang': 'es_PE'}}
+            
+            def read_partners(results):
+                # Obtener datos de clientes
+                return self.master_data.get_records(
+                    'res.partner', partner_ids, ['vat', 'name'], context={'lang': 'es_PE'}, strict=strict
+                )
+            
+            def read_taxes(results):
+                taxes = self.master_data.get_records(
+                    'account.tax', all_tax_ids, ['id', 'name'], context={'lang': 'es_PE'}, strict=strict
                 )
-                partner_data = {p['id']: p for p in partners}
-                print(f"✅ Clientes: {len(partner_data)} registros")
-            
-            # Obtener datos de órdenes de venta con más campos
-            order_ids = [move['order_id'][0] for move in move_data.values() if move.get('order_id')]
-            order_data = {}
-            if order_ids:
-                orders = self.models.execute_kw(
+                return {tax_id: t['name'] for tax_id, t in taxes.items()}
+            
+            def order_ids_from(results):
+                return list(set(move['order_id'][0] for move in results['moves'].values() if move.get('order_id')))
+            
+            def read_orders(results):
+                # Obtener datos de órdenes de venta con más campos
+                order_ids = order_ids_from(results)
+                if not order_ids:
+                    return {}
+                orders = models.execute_kw(
                     self.db, self.uid, self.password, 'sale.order', 'search_read',
-                    [[('id', 'in', list(set(order_ids)))]],
+                    [[('id', 'in', order_ids)]],
                     {
                         'fields': [
                             'name', 'delivery_observations', 'partner_supplying_agency_id', 
@@ -265,46 +618,59 @@ class OdooManager:
                         ]
                     }
                 )
-                order_data = {o['id']: o for o in orders}
-                print(f"✅ Órdenes de venta (sale.order): {len(order_data)} registros con observaciones de entrega")
-            
-            # Obtener datos de líneas de orden de venta con más campos
-            sale_line_data = {}
-            if order_ids and product_ids:
-                try:
-                    sale_lines = self.models.execute_kw(
-                        self.db, self.uid, self.password, 'sale.order.line', 'search_read',
-                        [[('order_id', 'in', list(set(order_ids))), ('product_id', 'in', product_ids)]],
-                        {
-                            'fields': [
-                                'order_id', 'product_id', 'route_id', 'name', 'product_uom_qty',
-                                'price_unit', 'price_subtotal', 'discount', 'product_uom',
-                                'analytic_distribution', 'display_type'
-                            ],
-                            'context': {'lang': 'es_PE'}
-                        }
-                    )
-                    for sl in sale_lines:
-                        if sl.get('order_id') and sl.get('product_id'):
-                            key = (sl['order_id'][0], sl['product_id'][0])
-                            sale_line_data[key] = sl
-                    print(f"✅ Líneas de orden de venta (sale.order.line): {len(sale_line_data)} registros con rutas")
-                except Exception as e:
-                    print(f"⚠️ Error obteniendo líneas de orden: {e}")
+                return {o['id']: o for o in orders}
             
-            # Obtener todos los tax_ids únicos de las líneas contables
-            all_tax_ids = set()
-            for line in sales_lines_base:
-                if line.get('tax_ids'):
-                    all_tax_ids.update(line['tax_ids'])
-            tax_names = {}
-            if all_tax_ids:
-                taxes = self.models.execute_kw(
-                    self.db, self.uid, self.password, 'account.tax', 'search_read',
-                    [[('id', 'in', list(all_tax_ids))]],
-                    {'fields': ['id', 'name'], 'context': {'lang': 'es_PE'}}
-                )
-                tax_names = {t['id']: t['name'] for t in taxes}
+            def read_sale_lines(results):
+                # Obtener datos de líneas de orden de venta con más campos
+                order_ids = order_ids_from(results)
+                sale_line_data = {}
+                if order_ids and product_ids:
+                    try:
+                        sale_lines = models.execute_kw(
+                            self.db, self.uid, self.password, 'sale.order.line', 'search_read',
+                            [[('order_id', 'in', order_ids), ('product_id', 'in', product_ids)]],
+                            {
+                                'fields': [
+                                    'order_id', 'product_id', 'route_id', 'name', 'product_uom_qty',
+                                    'price_unit', 'price_subtotal', 'discount', 'product_uom',
+                                    'analytic_distribution', 'display_type'
+                                ],
+                                'context': {'lang': 'es_PE'}
+                            }
+                        )
+                        for sl in sale_lines:
+                            if sl.get('order_id') and sl.get('product_id'):
+                                key = (sl['order_id'][0], sl['product_id'][0])
+                                sale_line_data[key] = sl
+                    except Exception as e:
+                        print(f"⚠️ Error obteniendo líneas de orden: {e}")
+                        if strict:
+                            raise
+                return sale_line_data
+            
+            related, timings = run_task_graph({
+                'moves': ((), read_moves),
+                'products': ((), read_products),
+                'partners': ((), read_partners),
+                'taxes': ((), read_taxes),
+                'orders': (('moves',), read_orders),
+                'sale_lines': (('moves',), read_sale_lines),
+            })
+            self.last_fanout_timings = timings
+            
+            move_data = related['moves']
+            product_data = related['products']
+            partner_data = related['partners']
+            order_data = related['orders']
+            sale_line_data = related['sale_lines']
+            tax_names = related['taxes']
+            
+            print(f"✅ Asientos contables (account.move): {len(move_data)} registros")
+            print(f"✅ Productos: {len(product_data)} registros")
+            print(f"✅ Clientes: {len(partner_data)} registros")
+            print(f"✅ Órdenes de venta (sale.order): {len(order_data)} registros con observaciones de entrega")
+            print(f"✅ Líneas de orden de venta (sale.order.line): {len(sale_line_data)} registros con rutas")
+            print("⏱️ Lecturas relacionadas: " + ", ".join(f"{name} {secs:.2f}s" for name, secs in timings.items()))
             
             # Procesar y combinar todos los datos para las 27 columnas
             sales_lines = []
@@ -446,6 +812,7 @@ class OdooManager:
                     })
             
             print(f"✅ Procesadas {len(sales_lines)} líneas con 27 columnas completas")
+            memory_profiler.checkpoint('sales_lines')
             
             # Si se solicita paginación, devolver tupla (datos, paginación)
             if page is not None and per_page is not None:
@@ -469,175 +836,123 @@ class OdooManager:
             
         except Exception as e:
             print(f"Error al obtener las líneas de venta de Odoo: {e}")
+            if strict:
+                raise
             # Devolver formato apropiado según si se solicitó paginación
             if page is not None and per_page is not None:
                 return [], {'page': page, 'per_page': per_page, 'total': 0, 'pages': 0}
             return []
 
     def get_sales_dashboard_data(self, date_from=None, date_to=None, linea_id=None, partner_id=None):
-        """Obtener datos para el dashboard de ventas"""
+        """
+        Obtener datos para el dashboard de ventas.
+        
+        Las ventas son saldos netos (las notas de crédito restan), igual que
+        en /dashboard. Con meses completos y sin filtros de cliente/línea se
+        responde desde el cubo de ventas en memoria; en otro caso se arma un
+        cubo con las líneas del período. Ambos caminos usan los mismos rollups.
+        """
         try:
-            # Obtener líneas de venta
-            sales_lines = self.get_sales_lines(
-                date_from=date_from,
-                date_to=date_to,
-                partner_id=partner_id,
-                linea_id=linea_id,
-                limit=5000
-            )
-            
-            # Filtrar VENTA INTERNACIONAL (exportaciones)
-            sales_lines_filtered = []
-            for line in sales_lines:
-                # Filtrar por línea comercial
-                linea_comercial = line.get('commercial_line_national_id')
-                if linea_comercial and isinstance(linea_comercial, list) and len(linea_comercial) > 1:
-                    nombre_linea = linea_comercial[1].upper()
-                    if 'VENTA INTERNACIONAL' in nombre_linea:
-                        continue
-                
-                # Filtrar por canal de ventas
-                canal_ventas = line.get('sales_channel_id')
-                if canal_ventas and isinstance(canal_ventas, list) and len(canal_ventas) > 1:
-                    nombre_canal = canal_ventas[1].upper()
-                    if 'VENTA INTERNACIONAL' in nombre_canal or 'INTERNACIONAL' in nombre_canal:
-                        continue
-                
-                sales_lines_filtered.append(line)
-            
-            sales_lines = sales_lines_filtered  # Usar los datos filtrados
-            
-            if not sales_lines:
-                return self._get_empty_dashboard_data()
-            
-            # Calcular métricas básicas
-            total_sales = sum([abs(line.get('balance', 0)) for line in sales_lines])
-            total_quantity = sum([line.get('quantity', 0) for line in sales_lines])
-            total_lines = len(sales_lines)
-            
-            # Métricas por cliente
-            clients_data = {}
-            for line in sales_lines:
-                client_name = line.get('partner_name', 'Sin Cliente')
-                if client_name not in clients_data:
-                    clients_data[client_name] = {'sales': 0, 'quantity': 0}
-                clients_data[client_name]['sales'] += abs(line.get('balance', 0))
-                clients_data[client_name]['quantity'] += line.get('quantity', 0)
-            
-            # Top clientes
-            top_clients = sorted(clients_data.items(), key=lambda x: x[1]['sales'], reverse=True)[:10]
-            
-            # Métricas por producto
-            products_data = {}
-            for line in sales_lines:
-                product_name = line.get('name', 'Sin Producto')
-                if product_name not in products_data:
-                    products_data[product_name] = {'sales': 0, 'quantity': 0}
-                products_data[product_name]['sales'] += abs(line.get('balance', 0))
-                products_data[product_name]['quantity'] += line.get('quantity', 0)
-            
-            # Top productos
-            top_products = sorted(products_data.items(), key=lambda x: x[1]['sales'], reverse=True)[:10]
-            
-            # Métricas por canal
-            channels_data = {}
-            for line in sales_lines:
-                channel = line.get('sales_channel_id')
-                channel_name = channel[1] if channel and len(channel) > 1 else 'Sin Canal'
-                if channel_name not in channels_data:
-                    channels_data[channel_name] = {'sales': 0, 'quantity': 0}
-                channels_data[channel_name]['sales'] += abs(line.get('balance', 0))
-                channels_data[channel_name]['quantity'] += line.get('quantity', 0)
-            
-            sales_by_channel = list(channels_data.items())
-            
-            # Métricas por línea comercial (NUEVO)
-            commercial_lines_data = {}
-            for line in sales_lines:
-                commercial_line = line.get('commercial_line_national_id')
-                if commercial_line:
-                    line_name = commercial_line[1] if commercial_line and len(commercial_line) > 1 else 'Sin Línea'
-                else:
-                    line_name = 'Sin Línea Comercial'
-                
-                if line_name not in commercial_lines_data:
-                    commercial_lines_data[line_name] = {'sales': 0, 'quantity': 0}
-                commercial_lines_data[line_name]['sales'] += abs(line.get('balance', 0))
-                commercial_lines_data[line_name]['quantity'] += line.get('quantity', 0)
-            
-            # Preparar datos de líneas comerciales para el gráfico
-            commercial_lines_sorted = sorted(commercial_lines_data.items(), key=lambda x: x[1]['sales'], reverse=True)
-            commercial_lines = [
-                {
-                    'name': line_name,
-                    'amount': data['sales'],
-                    'quantity': data['quantity']
-                } 
-                for line_name, data in commercial_lines_sorted
-            ]
+            meses = self._whole_months(date_from, date_to)
+            if meses and not linea_id and not partner_id:
+                cube = self.get_sales_cube_range(meses)
+                clientes = self.get_sales_cube_range(meses, 'clientes')
+            else:
+                sales_lines = self.get_sales_lines(
+                    date_from=date_from,
+                    date_to=date_to,
+                    partner_id=partner_id,
+                    linea_id=linea_id,
+                    limit=None
+                )
+                cube, clientes = self._sales_cubes_from_lines(sales_lines)
+            return self._sales_dashboard_data_from_cube(cube, clientes)
             
-            # Estadísticas de líneas comerciales
-            commercial_lines_stats = {
+        except Exception as e:
+            print(f"Error obteniendo datos del dashboard: {e}")
+            return self._get_empty_dashboard_data()
+
+    def _sales_cubes_from_lines(self, sales_lines):
+        """
+        Cubos 'ventas' y 'clientes' de líneas de cualquier período (un cubo
+        por mes de factura, unidos).
+        
+        Returns:
+            tuple: (SalesCube de ventas, SalesCube de clientes)
+        """
+        por_mes = {}
+        for line in sales_lines:
+            por_mes.setdefault((line.get('invoice_date') or '')[:7], []).append(line)
+        views = [
+            SalesCube.views_from_lines(lines, mes, self.SALES_CUBE_VIEWS)
+            for mes, lines in sorted(por_mes.items())
+        ]
+        return (SalesCube.concat([v['ventas'] for v in views]),
+                SalesCube.concat([v['clientes'] for v in views]))
+
+    def _sales_dashboard_data_from_cube(self, cube, clientes):
+        """
+        Estructura de get_sales_dashboard_data calculada con rollups de los
+        cubos de ventas y de clientes (saldos netos de notas de crédito).
+        """
+        cube = cube.slice(internacional=False)
+        if not len(cube):
+            return self._get_empty_dashboard_data()
+        clientes = clientes.slice(internacional=False)
+        
+        totals = cube.totals()
+        total_sales = totals['balance']
+        total_quantity = totals['quantity']
+        total_lines = int(totals['line_count'])
+        
+        def breakdown(source, dim, empty_name, names=None):
+            sales = source.rollup(dim, 'balance')
+            quantity = source.rollup(dim, 'quantity')
+            data = {}
+            for key, amount in sales.items():
+                name = (names or {}).get(key, key) or empty_name
+                entry = data.setdefault(name, {'sales': 0, 'quantity': 0})
+                entry['sales'] += amount
+                entry['quantity'] += quantity.get(key, 0)
+            return sorted(data.items(), key=lambda x: x[1]['sales'], reverse=True)
+        
+        commercial_lines = [
+            {'name': name, 'amount': data['sales'], 'quantity': data['quantity']}
+            for name, data in breakdown(cube, 'linea', 'Sin Línea Comercial')
+        ]
+        sellers_all = breakdown(cube, 'vendedor', 'Sin Vendedor Asignado', cube.labels.get('vendedor'))
+        sellers = [
+            {'name': name, 'amount': data['sales'], 'quantity': data['quantity']}
+            for name, data in sellers_all[:8]
+        ]
+        
+        return {
+            'total_sales': total_sales,
+            'total_quantity': total_quantity,
+            'total_lines': total_lines,
+            'top_clients': breakdown(clientes, 'cliente', 'Sin Cliente')[:10],
+            'top_products': breakdown(cube, 'producto', 'Sin Producto')[:10],
+            'sales_by_month': [
+                {'month': mes, 'amount': amount}
+                for mes, amount in sorted(cube.rollup('mes').items())
+            ],
+            'sales_by_channel': breakdown(cube, 'canal', 'Sin Canal'),
+            'commercial_lines': commercial_lines,
+            'commercial_lines_stats': {
                 'total_lines': len(commercial_lines),
                 'top_line_name': commercial_lines[0]['name'] if commercial_lines else 'N/A',
                 'top_line_amount': commercial_lines[0]['amount'] if commercial_lines else 0
-            }
-            
-            # Métricas por vendedor (NUEVO)
-            sellers_data = {}
-            for line in sales_lines:
-                seller = line.get('invoice_user_id')
-                if seller:
-                    seller_name = seller[1] if seller and len(seller) > 1 else 'Sin Vendedor'
-                else:
-                    seller_name = 'Sin Vendedor Asignado'
-                
-                if seller_name not in sellers_data:
-                    sellers_data[seller_name] = {'sales': 0, 'quantity': 0}
-                sellers_data[seller_name]['sales'] += abs(line.get('balance', 0))
-                sellers_data[seller_name]['quantity'] += line.get('quantity', 0)
-            
-            # Preparar datos de vendedores para el gráfico (Top 8 vendedores)
-            sellers_sorted = sorted(sellers_data.items(), key=lambda x: x[1]['sales'], reverse=True)[:8]
-            sellers = [
-                {
-                    'name': seller_name,
-                    'amount': data['sales'],
-                    'quantity': data['quantity']
-                } 
-                for seller_name, data in sellers_sorted
-            ]
-            
-            # Estadísticas de vendedores
-            sellers_stats = {
-                'total_sellers': len(sellers_data),
+            },
+            'sellers': sellers,
+            'sellers_stats': {
+                'total_sellers': len(sellers_all),
                 'top_seller_name': sellers[0]['name'] if sellers else 'N/A',
                 'top_seller_amount': sellers[0]['amount'] if sellers else 0
-            }
-            
-            return {
-                'total_sales': total_sales,
-                'total_quantity': total_quantity,
-                'total_lines': total_lines,
-                'top_clients': top_clients,
-                'top_products': top_products,
-                'sales_by_month': [],  # Puede implementarse después
-                'sales_by_channel': sales_by_channel,
-                # Datos específicos para líneas comerciales
-                'commercial_lines': commercial_lines,
-                'commercial_lines_stats': commercial_lines_stats,
-                # Datos específicos para vendedores
-                'sellers': sellers,
-                'sellers_stats': sellers_stats,
-                # Campos KPI para el template
-                'kpi_total_sales': total_sales,
-                'kpi_total_invoices': total_lines,
-                'kpi_total_quantity': total_quantity
-            }
-            
-        except Exception as e:
-            print(f"Error obteniendo datos del dashboard: {e}")
-            return self._get_empty_dashboard_data()
+            },
+            'kpi_total_sales': total_sales,
+            'kpi_total_invoices': total_lines,
+            'kpi_total_quantity': total_quantity
+        }
 
     def _get_empty_dashboard_data(self):
         """Datos vacíos para el dashboard"""
@@ -669,13 +984,52 @@ class OdooManager:
             'kpi_total_quantity': 0
         }
 
-    def get_report_lines(self, start_date=None, end_date=None, customer=None, limit=0, account_codes=None, search_term=None):
-        """Delegar al servicio de reportes."""
-        return self.reports.get_report_lines(start_date, end_date, customer, limit, account_codes, search_term)
+    def get_report_lines(self, start_date=None, end_date=None, customer=None, limit=0, account_codes=None, search_term=None, source=None):
+        """Delegar al servicio de reportes (sin filtros, desde el pre-calentado)."""
+        # El pre-calentado es del origen por defecto: con source explícito se consulta
+        if not any([start_date, end_date, customer, account_codes, search_term, source]):
+            warm = self.warm_store.get('reporte_cxc', self.warm_max_age)
+            # Con tope las líneas vienen de la más reciente a la más antigua: las
+            # primeras N equivalen a limit=N. Sin tope vienen por id, así que
+            # solo sirven para una lectura también sin tope.
+            if warm is not None and (warm['limit'] == limit == 0 or 0 < limit <= warm['limit']):
+                return warm['lines'][:limit] if limit else warm['lines']
+        return self.reports.get_report_lines(start_date, end_date, customer, limit, account_codes, search_term, source)
+    
+    def get_resumen_cobranza_internacional(self, date_from=None, date_to=None, payment_state=None, linea_id=None, source=None):
+        """Resumen de cobranza internacional (sin filtros, desde el pre-calentado)."""
+        if not any([date_from, date_to, payment_state, linea_id, source]):
+            warm = self.warm_store.get('cobranza_resumen', self.warm_max_age)
+            if warm is not None:
+                return warm
+        return self.cobranza.get_resumen_internacional(date_from, date_to, payment_state, linea_id, source)
+    
+    def get_cobranza_kpis_internacional(self, date_from=None, date_to=None, payment_state=None, linea_id=None, source=None):
+        """KPIs de cobranza internacional (parte del resumen)."""
+        return self.get_resumen_cobranza_internacional(date_from, date_to, payment_state, linea_id, source)['kpis']
+    
+    def _warm_sales_month(self):
+        """Pre-calienta las líneas de venta del mes en curso."""
+        mes = datetime.now().strftime('%Y-%m')
+        fecha_inicio, fecha_fin = self._month_range(mes)
+        lines = self.get_sales_lines(date_from=fecha_inicio, date_to=fecha_fin, limit=None)
+        if lines:
+            self.warm_store.put(f'ventas_{mes}', lines)
+    
+    def _warm_cobranza_resumen(self):
+        """Pre-calienta el resumen de cobranza internacional sin filtros (KPIs, aging, DSO y top 15)."""
+        if self.connection.is_connected():
+            self.warm_store.put('cobranza_resumen', self.cobranza.get_resumen_internacional())
+    
+    def _warm_report_cxc(self):
+        """Pre-calienta el reporte CxC general sin filtros."""
+        lines = self.reports.get_report_lines(limit=self.warm_cxc_limit)
+        if lines:
+            self.warm_store.put('reporte_cxc', {'limit': self.warm_cxc_limit, 'lines': lines})
     
-    def get_report_internacional(self, start_date=None, end_date=None, customer=None, payment_state=None, limit=0):
+    def get_report_internacional(self, start_date=None, end_date=None, customer=None, payment_state=None, limit=0, source=None):
         """Obtener reporte internacional con campos calculados."""
-        return self.reports.get_report_internacional(start_date, end_date, customer, payment_state, limit)
+        return self.reports.get_report_internacional(start_date, end_date, customer, payment_state, limit, source)
     
 
     def get_cobranza_kpis(self, date_from=None, date_to=None, payment_state=None):
@@ -4,6 +4,21 @@ Servicios de la aplicación Dashboard Cobranzas.
 
 Este paquete contiene los servicios para interactuar con Odoo:
 - odoo_connection: Conexión base XML-RPC
+- odoo_transport: Pool de conexiones XML-RPC persistentes
+- xmlrpc_fast: Decodificación rápida de respuestas XML-RPC (ODOO_FAST_XMLRPC)
+- fanout: Ejecución concurrente de lecturas dependientes
+- singleflight: Coalescencia de lecturas idénticas y protección de estampidas
+- metrics: Métricas por llamada a Odoo (Prometheus / JSON)
+- request_timing: Desglose de tiempos por request (cabecera Server-Timing)
+- slow_log: Log JSON-lines de llamadas lentas con huella de dominio
+- memory_profile: Pico de memoria y sitios de asignación por endpoint (tracemalloc)
+- request_profile: Perfilado cProfile bajo demanda de una request (?__profile=1)
+- sampling_profiler: Profiler de muestreo continuo de pilas (/debug/profile)
+- cache / master_data: Caché TTL+LRU de datos maestros de Odoo
+- sales_snapshots: Snapshots en disco de ventas de meses cerrados
+- odoo_mirror: Espejo local SQLite de facturas y líneas contables (source='mirror')
+- receivables_asof: Saldos y aging por cobrar a una fecha pasada desde el espejo
+- prewarm: Pre-calentado de cachés con un solo worker líder
 - sales_service: Lógica de ventas
 - cobranza_service: Lógica de cobranza internacional
 - report_service: Generación de reportes CxC
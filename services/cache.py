@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Caché en memoria con expiración (TTL) y desalojo LRU.
+
+Es compartida por todos los hilos del proceso, por lo que todas las
+operaciones están protegidas por un lock.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Diccionario acotado con expiración por entrada.
+
+    Al superar `max_size` se descarta la entrada usada hace más tiempo.
+    Los valores `None` son válidos (sirven como caché negativa).
+    """
+
+    def __init__(self, ttl, max_size=10000):
+        """
+        Args:
+            ttl (float): Segundos de vida por defecto de cada entrada
+            max_size (int): Número máximo de entradas
+        """
+        self.ttl = float(ttl)
+        self.max_size = max(1, int(max_size))
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _get_entry(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def get(self, key, default=None):
+        """
+        Returns:
+            Valor almacenado, o `default` si no existe o expiró
+        """
+        with self._lock:
+            entry = self._get_entry(key, time.monotonic())
+            return entry[1] if entry else default
+
+    def get_entry(self, key):
+        """
+        Returns:
+            tuple: (valor, segundos_restantes) o None si no existe o expiró
+        """
+        with self._lock:
+            now = time.monotonic()
+            entry = self._get_entry(key, now)
+            return (entry[1], entry[0] - now) if entry else None
+
+    def get_many(self, keys):
+        """
+        Busca varias claves de una vez.
+
+        Returns:
+            tuple: (encontrados dict, faltantes set)
+        """
+        found = {}
+        missing = set()
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                entry = self._get_entry(key, now)
+                if entry is None:
+                    missing.add(key)
+                else:
+                    found[key] = entry[1]
+        return found, missing
+
+    def set(self, key, value, ttl=None):
+        """Guarda un valor con el TTL indicado (o el por defecto)."""
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, mapping, ttl=None):
+        """Guarda varios valores con el mismo TTL."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = (expires_at, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def update_existing(self, mapping):
+        """
+        Reemplaza valores solo para claves ya presentes, conservando su
+        expiración.
+
+        Returns:
+            int: Entradas actualizadas
+        """
+        updated = 0
+        with self._lock:
+            for key, value in mapping.items():
+                entry = self._data.get(key)
+                if entry is not None:
+                    self._data[key] = (entry[0], value)
+                    updated += 1
+        return updated
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[1] if entry else default
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
@@ -5,9 +5,68 @@ Servicio de Cobranza Internacional.
 Maneja KPIs y métricas de cobranza internacional.
 """
 
+import calendar
+import json
+import os
+import tempfile
+import threading
+import xmlrpc.client
 from datetime import datetime, date
 from utils.calculators import calcular_dso, calcular_cei, calcular_dias_vencido, get_aging_bucket_key
 from utils.filters import filter_internacional
+from .odoo_mirror import connection_for, MirrorUnsupported
+from .receivables_asof import month_ends, month_label, receivable_account_prefixes
+from .singleflight import StampedeCache
+
+
+# Mismo criterio que filter_internacional, como dominio de account.move
+INTERNACIONAL_DOMAIN = [
+    '|', '&', ('country_code', '!=', False), ('country_code', '!=', 'PE'),
+    ('team_id.name', 'ilike', 'INTERNACIONAL'),
+]
+
+# El top 15 de deudores solo considera el país (no el equipo de ventas)
+PAIS_EXTRANJERO_DOMAIN = [('country_code', '!=', False), ('country_code', '!=', 'PE')]
+
+
+# Formato del archivo DSO_TREND_CACHE; cambiarlo invalida los meses guardados
+DSO_CACHE_VERSION = 2
+
+
+def _prefixed(domain, prefix):
+    """Dominio con todas las hojas bajo la ruta `prefix` (p. ej. 'move_id.')."""
+    return [(prefix + leaf[0], leaf[1], leaf[2]) if isinstance(leaf, tuple) else leaf for leaf in domain]
+
+
+# Textos de los Fault de Odoo cuando un campo no se puede filtrar ni agrupar
+_READ_GROUP_UNSUPPORTED = ('invalid field', 'unknown field', 'not stored', 'non-stored',
+                           'cannot be grouped', 'cannot be searched')
+
+
+def _read_group_unsupported(error):
+    """True si el error es un Fault de Odoo por un campo o agrupación no soportados."""
+    if not isinstance(error, xmlrpc.client.Fault):
+        return False
+    message = str(error.faultString).lower()
+    return any(marker in message for marker in _READ_GROUP_UNSUPPORTED)
+
+
+def _group_start(group, field, granularity='month'):
+    """Primer día ('YYYY-MM-DD') de un grupo de read_group por `field:granularity`; None si la fecha está vacía."""
+    bounds = (group.get('__range') or {}).get(f'{field}:{granularity}')
+    if bounds:
+        return str(bounds['from'])[:10]
+    # Odoo < 16 no devuelve __range: se toma el límite inferior del __domain
+    for leaf in group.get('__domain', []):
+        if isinstance(leaf, (list, tuple)) and leaf[0] == field and leaf[1] == '>=':
+            return str(leaf[2])[:10]
+    return None
+
+
+def _group_month(group, field):
+    """'YYYY-MM' de un grupo de read_group por `field:month`."""
+    start = _group_start(group, field)
+    return start[:7] if start else None
 
 
 class CobranzaService:
@@ -15,139 +74,372 @@ class CobranzaService:
     Servicio para métricas de cobranza internacional.
     """
     
-    def __init__(self, connection):
+    def __init__(self, connection, mirror_connection=None, receivables=None, dso_cache_path=None, kpi_mode=None):
         """
         Args:
             connection (OdooConnection): Conexión a Odoo
+            mirror_connection (MirrorConnection, optional): Conexión al espejo local (source='mirror')
+            receivables (ReceivablesAsOf, optional): Saldos a fechas pasadas desde el espejo
+            dso_cache_path (str, optional): Archivo con el DSO de los meses
+                cerrados (DSO_TREND_CACHE, por defecto
+                'instance/dso_trend_internacional.json')
+            kpi_mode (str, optional): Cálculo del resumen en vivo
+                (COBRANZA_KPI_MODE): 'read_group' (agregado en Odoo, por
+                defecto), 'python' (descarga de facturas) o 'parity'
+                (ambos, compara y devuelve el de Python)
         """
         self.connection = connection
+        self.mirror_connection = mirror_connection
+        self.receivables = receivables
+        self.dso_cache_path = dso_cache_path or os.getenv(
+            'DSO_TREND_CACHE', os.path.join('instance', 'dso_trend_internacional.json'))
+        self._dso_cache_lock = threading.Lock()
+        # Facturas y resúmenes por filtro (el dashboard pide KPIs y top 15 a la vez)
+        self._summaries = StampedeCache(float(os.getenv('COBRANZA_SUMMARY_TTL', 60)), 128)
+        self.kpi_mode = kpi_mode or os.getenv('COBRANZA_KPI_MODE', 'read_group')
+        self._read_group_ok = True
     
-    def get_cobranza_kpis_internacional(self, date_from=None, date_to=None, payment_state=None, linea_id=None):
+    def get_resumen_internacional(self, date_from=None, date_to=None, payment_state=None, linea_id=None, source=None):
         """
-        Obtener KPIs de cobranza internacional.
+        KPIs, aging, DSO por país y top 15 de cobranza internacional en una pasada.
+        
+        En vivo se arma con tres read_group de account.move (ver
+        _grupos_internacional); con kpi_mode='python', desde el espejo o si
+        Odoo no permite agrupar, las facturas del rango se descargan una sola
+        vez por (fechas, origen). Ambos se reutilizan COBRANZA_SUMMARY_TTL
+        segundos y el estado de pago se filtra localmente para que el top 15
+        (que no lo usa) salga de los mismos datos.
+        
+        Args:
+            date_from (str): Fecha inicial de factura
+            date_to (str): Fecha final de factura
+            payment_state (str): Estado de pago para los KPIs
+            linea_id (int): No se usa (las facturas no tienen línea comercial)
+            source (str): 'live' o 'mirror' (por defecto ODOO_DATA_SOURCE)
         
         Returns:
-            dict: KPIs calculados
+            dict: {'kpis', 'aging', 'dso_by_country', 'top15'}
         """
         try:
-            if not self.connection.is_connected():
-                return self._get_empty_kpis()
-            
-            # Construir dominio
-            domain = [('move_type', 'in', ['out_invoice', 'out_refund']), ('state', '=', 'posted')]
+            connection = connection_for(source, self.connection, self.mirror_connection)
+            if not connection.is_connected():
+                return self._resumen_vacio()
             
-            if date_from:
-                domain.append(('invoice_date', '>=', date_from))
-            if date_to:
-                domain.append(('invoice_date', '<=', date_to))
-            if payment_state:
-                domain.append(('payment_state', '=', payment_state))
+            origin = source or os.getenv('ODOO_DATA_SOURCE', 'live')
+            # El espejo no agrega: ahí se recorre la descarga local
+            mode = self.kpi_mode if origin != 'mirror' and self._read_group_ok else 'python'
             
-            # Obtener facturas
-            fields = [
-                'id', 'name', 'partner_id', 'invoice_date', 'invoice_date_due',
-                'amount_total', 'amount_residual', 'payment_state', 'currency_id',
-                'team_id', 'invoice_user_id', 'country_code'
-            ]
+            grouped = None
+            if mode in ('read_group', 'parity'):
+                try:
+                    grouped = self._summaries.get_or_load(
+                        ('grupos', date_from, date_to, origin),
+                        lambda: self._grupos_internacional(connection, date_from, date_to)
+                    )
+                except Exception as e:
+                    if _read_group_unsupported(e):
+                        # p. ej. country_code no almacenado: no se vuelve a intentar en este proceso
+                        print(f"[WARN] read_group de cobranza internacional no soportado, se descargan facturas: {e}")
+                        self._read_group_ok = False
+                    else:
+                        # Error transitorio (timeout, red): solo esta consulta usa la descarga
+                        print(f"[WARN] read_group de cobranza internacional falló, se descargan facturas: {e}")
+                    mode = 'python'
+            if mode == 'read_group':
+                return self._summaries.get_or_load(
+                    ('resumen_grupos', date_from, date_to, payment_state, origin),
+                    lambda: self._calcular_resumen_grupos(grouped, date_from, date_to, payment_state)
+                )
             
-            invoices = self.connection.search_read('account.move', domain, fields, limit=10000)
-            
-            # Aplicar filtro internacional
-            invoices_data = []
-            for inv in invoices:
-                temp_line = {
-                    'country_code': inv.get('country_code'),
-                    'sales_channel_id': inv.get('team_id'),
-                }
-                if filter_internacional([temp_line]):
-                    invoices_data.append(inv)
-            
-            # Calcular KPIs
-            today = date.today()
-            total_facturas = len(invoices_data)
-            monto_vencido = 0.0
-            monto_vigente = 0.0
-            total_overdue_days = 0
-            overdue_count = 0
-            
-            # Aging buckets
-            aging_buckets = {
-                'vigente': 0.0,
-                '1-30': 0.0,
-                '31-60': 0.0,
-                '61-90': 0.0,
-                '+90': 0.0
+            invoices = self._summaries.get_or_load(
+                ('facturas', date_from, date_to, origin),
+                lambda: self._facturas_internacional(connection, date_from, date_to)
+            )
+            resumen = self._summaries.get_or_load(
+                ('resumen', date_from, date_to, payment_state, origin),
+                lambda: self._calcular_resumen(invoices, date_from, date_to, payment_state)
+            )
+            if mode == 'parity':
+                self._verificar_paridad(resumen, self._calcular_resumen_grupos(grouped, date_from, date_to, payment_state),
+                                        (date_from, date_to, payment_state))
+            return resumen
+        
+        except Exception as e:
+            print(f"[ERROR] Error calculando resumen de cobranza internacional: {e}")
+            import traceback
+            traceback.print_exc()
+            return self._resumen_vacio()
+    
+    def get_cobranza_kpis_internacional(self, date_from=None, date_to=None, payment_state=None, linea_id=None, source=None):
+        """
+        Obtener KPIs de cobranza internacional.
+        
+        Args:
+            source (str): 'live' o 'mirror' (por defecto ODOO_DATA_SOURCE)
+        
+        Returns:
+            dict: KPIs calculados
+        """
+        return self.get_resumen_internacional(date_from, date_to, payment_state, linea_id, source)['kpis']
+    
+    def _facturas_internacional(self, connection, date_from, date_to):
+        """Facturas y notas de crédito publicadas internacionales del rango."""
+        domain = [('move_type', 'in', ['out_invoice', 'out_refund']), ('state', '=', 'posted')]
+        
+        if date_from:
+            domain.append(('invoice_date', '>=', date_from))
+        if date_to:
+            domain.append(('invoice_date', '<=', date_to))
+        
+        fields = [
+            'id', 'name', 'partner_id', 'invoice_date', 'invoice_date_due',
+            'amount_total', 'amount_residual', 'payment_state', 'currency_id',
+            'team_id', 'invoice_user_id', 'country_code'
+        ]
+        
+        # Lectura que propaga errores: una falla de Odoo no queda en caché como lista vacía
+        invoices = list(connection.iter_search_read('account.move', domain, fields))
+        
+        # Aplicar filtro internacional
+        invoices_data = []
+        for inv in invoices:
+            temp_line = {
+                'country_code': inv.get('country_code'),
+                'sales_channel_id': inv.get('team_id'),
             }
+            if filter_internacional([temp_line]):
+                invoices_data.append(inv)
+        return invoices_data
+    
+    @staticmethod
+    def _acumulador():
+        """Totales que se van sumando factura a factura (o grupo a grupo)."""
+        return {
+            'total_facturas': 0,
+            'monto_vencido': 0.0,
+            'monto_vigente': 0.0,
+            'total_overdue_days': 0,
+            'overdue_count': 0,
+            'aging_buckets': {'vigente': 0.0, '1-30': 0.0, '31-60': 0.0, '61-90': 0.0, '+90': 0.0},
+            'country_data': {},
+            'by_partner': {},
+        }
+    
+    @staticmethod
+    def _acumular_pais(acc, country_code, residual, amount_total, count=1):
+        acc['total_facturas'] += count
+        if country_code not in acc['country_data']:
+            acc['country_data'][country_code] = {'cxc': 0.0, 'ventas': 0.0}
+        acc['country_data'][country_code]['cxc'] += residual
+        acc['country_data'][country_code]['ventas'] += amount_total
+    
+    @staticmethod
+    def _acumular_pendiente(acc, residual, dias_vencido, count=1):
+        """Saldo pendiente (residual > 0) de `count` facturas con los mismos días de vencimiento."""
+        if dias_vencido > 0:
+            acc['monto_vencido'] += residual
+            acc['total_overdue_days'] += dias_vencido * count
+            acc['overdue_count'] += count
+        else:
+            acc['monto_vigente'] += residual
+        acc['aging_buckets'][get_aging_bucket_key(dias_vencido)] += residual
+    
+    def _calcular_resumen(self, invoices, date_from, date_to, payment_state):
+        """Una pasada sobre las facturas: KPIs, aging, DSO por país y deuda por cliente."""
+        today = date.today()
+        acc = self._acumulador()
+        
+        for inv in invoices:
+            residual = float(inv.get('amount_residual') or 0.0)
             
-            # DSO por país
-            dso_by_country = {}
-            country_data = {}
-            
-            for inv in invoices_data:
-                residual = float(inv.get('amount_residual') or 0.0)
-                due_date = inv.get('invoice_date_due')
-                amount_total = float(inv.get('amount_total') or 0.0)
-                country_code = inv.get('country_code', 'N/A')
-                
-                # Acumular por país
-                if country_code not in country_data:
-                    country_data[country_code] = {'cxc': 0.0, 'ventas': 0.0}
-                country_data[country_code]['cxc'] += residual
-                country_data[country_code]['ventas'] += amount_total
-                
-                if residual <= 0:
-                    continue
-                
-                # Calcular días vencido
-                dias_vencido = calcular_dias_vencido(due_date, today) if due_date else 0
-                
-                if dias_vencido > 0:
-                    monto_vencido += residual
-                    total_overdue_days += dias_vencido
-                    overdue_count += 1
-                else:
-                    monto_vigente += residual
-                
-                # Aging bucket
-                bucket_key = get_aging_bucket_key(dias_vencido)
-                aging_buckets[bucket_key] += residual
-            
-            # Calcular DSO promedio y por país
-            dias_periodo = (datetime.strptime(date_to, '%Y-%m-%d') - datetime.strptime(date_from, '%Y-%m-%d')).days if date_from and date_to else 30
-            
-            total_cxc = sum(d['cxc'] for d in country_data.values())
-            total_ventas = sum(d['ventas'] for d in country_data.values())
-            dso_promedio = calcular_dso(total_cxc, total_ventas, dias_periodo)
-            
-            for country, data in country_data.items():
-                dso_by_country[country] = calcular_dso(data['cxc'], data['ventas'], dias_periodo)
-            
-            promedio_dias_morosidad = (total_overdue_days / overdue_count) if overdue_count > 0 else 0.0
+            # Deuda por cliente (top 15, sin filtro de estado de pago ni de
+            # equipo: solo clientes de otro país)
+            partner = inv.get('partner_id')
+            if partner and residual > 0 and inv.get('country_code') and inv.get('country_code') != 'PE':
+                partner_name = partner[1] if isinstance(partner, list) and len(partner) >= 2 else str(partner)
+                acc['by_partner'][partner_name] = acc['by_partner'].get(partner_name, 0.0) + residual
             
-            # CEI simplificado (necesitaría más datos para cálculo completo)
-            cei = 80.0  # Placeholder
+            if payment_state and inv.get('payment_state') != payment_state:
+                continue
             
-            porcentaje_vencido = (monto_vencido / (monto_vencido + monto_vigente) * 100) if (monto_vencido + monto_vigente) > 0 else 0.0
+            # Acumular por país
+            self._acumular_pais(acc, inv.get('country_code', 'N/A'), residual, float(inv.get('amount_total') or 0.0))
             
-            return {
-                'dso_promedio': dso_promedio,
-                'dso_by_country': dso_by_country,
-                'cei': cei,
-                'porcentaje_vencido': round(porcentaje_vencido, 1),
-                'monto_vencido': round(monto_vencido, 2),
-                'monto_vigente': round(monto_vigente, 2),
-                'total_facturas': total_facturas,
-                'promedio_dias_morosidad': round(promedio_dias_morosidad, 1),
-                'aging_buckets': aging_buckets,
-                'tasa_recuperacion': 75.0,  # Placeholder
-                'plazo_promedio_cobranza': 45.0,  # Placeholder
-            }
+            if residual <= 0:
+                continue
             
-        except Exception as e:
-            print(f"[ERROR] Error calculando KPIs internacionales: {e}")
-            import traceback
-            traceback.print_exc()
-            return self._get_empty_kpis()
+            # Calcular días vencido
+            due_date = inv.get('invoice_date_due')
+            dias_vencido = calcular_dias_vencido(due_date, today) if due_date else 0
+            self._acumular_pendiente(acc, residual, dias_vencido)
+        
+        return self._resumen_desde(acc, date_from, date_to)
+    
+    def _grupos_internacional(self, connection, date_from, date_to):
+        """
+        Agregados de read_group de las facturas internacionales del rango.
+        
+        Tres llamadas, con el filtro internacional dentro del dominio:
+        por (país, estado de pago) con residual y total, lo pendiente por
+        (día de vencimiento, estado de pago) para aging y días de mora, y
+        la deuda por cliente de otro país (se une por nombre y se corta en
+        15 localmente, igual que la descarga de facturas). Las filas dependen de los
+        países, días de vencimiento y clientes distintos, no de la cantidad
+        de facturas.
+        
+        Returns:
+            dict: {'paises', 'pendientes', 'clientes'}
+        
+        Raises:
+            Exception: Cualquier error de Odoo (no se guarda en caché)
+        """
+        domain = [('move_type', 'in', ['out_invoice', 'out_refund']), ('state', '=', 'posted')]
+        if date_from:
+            domain.append(('invoice_date', '>=', date_from))
+        if date_to:
+            domain.append(('invoice_date', '<=', date_to))
+        clientes = domain + PAIS_EXTRANJERO_DOMAIN + [('amount_residual', '>', 0), ('partner_id', '!=', False)]
+        domain += INTERNACIONAL_DOMAIN
+        pending = domain + [('amount_residual', '>', 0)]
+        
+        def read_group(domain, fields, groupby):
+            return connection._call('account.move', 'read_group', [domain, fields, groupby], {'lazy': False})
+        
+        return {
+            'paises': read_group(domain, ['amount_residual:sum', 'amount_total:sum'],
+                                 ['country_code', 'payment_state']),
+            'pendientes': read_group(pending, ['amount_residual:sum'],
+                                     ['invoice_date_due:day', 'payment_state']),
+            'clientes': read_group(clientes, ['amount_residual:sum'], ['partner_id']),
+        }
+    
+    def _calcular_resumen_grupos(self, grouped, date_from, date_to, payment_state):
+        """Mismo resumen que _calcular_resumen, armado desde las filas de read_group."""
+        today = date.today()
+        acc = self._acumulador()
+        
+        for group in grouped['clientes']:
+            partner = group.get('partner_id')
+            if partner:
+                partner_name = partner[1] if isinstance(partner, list) and len(partner) >= 2 else str(partner)
+                acc['by_partner'][partner_name] = acc['by_partner'].get(partner_name, 0.0) + (group.get('amount_residual') or 0.0)
+        
+        for group in grouped['paises']:
+            if payment_state and group.get('payment_state') != payment_state:
+                continue
+            self._acumular_pais(acc, group.get('country_code'), group.get('amount_residual') or 0.0,
+                                group.get('amount_total') or 0.0, group.get('__count', 0))
+        
+        for group in grouped['pendientes']:
+            if payment_state and group.get('payment_state') != payment_state:
+                continue
+            due_date = _group_start(group, 'invoice_date_due', 'day')
+            dias_vencido = calcular_dias_vencido(due_date, today) if due_date else 0
+            self._acumular_pendiente(acc, group.get('amount_residual') or 0.0, dias_vencido, group.get('__count', 0))
+        
+        return self._resumen_desde(acc, date_from, date_to)
+    
+    def _resumen_desde(self, acc, date_from, date_to):
+        """KPIs y top 15 a partir de los totales acumulados."""
+        country_data = acc['country_data']
+        monto_vencido = acc['monto_vencido']
+        monto_vigente = acc['monto_vigente']
+        
+        # Calcular DSO promedio y por país
+        dias_periodo = (datetime.strptime(date_to, '%Y-%m-%d') - datetime.strptime(date_from, '%Y-%m-%d')).days if date_from and date_to else 30
+        
+        total_cxc = sum(d['cxc'] for d in country_data.values())
+        total_ventas = sum(d['ventas'] for d in country_data.values())
+        dso_promedio = calcular_dso(total_cxc, total_ventas, dias_periodo)
+        
+        dso_by_country = {}
+        # Orden por código de país: no depende del orden de llegada de facturas o grupos
+        for country in sorted(country_data, key=lambda c: c or ''):
+            dso_by_country[country] = calcular_dso(country_data[country]['cxc'], country_data[country]['ventas'], dias_periodo)
+        
+        promedio_dias_morosidad = (acc['total_overdue_days'] / acc['overdue_count']) if acc['overdue_count'] > 0 else 0.0
+        
+        # CEI simplificado (necesitaría más datos para cálculo completo)
+        cei = 80.0  # Placeholder
+        
+        porcentaje_vencido = (monto_vencido / (monto_vencido + monto_vigente) * 100) if (monto_vencido + monto_vigente) > 0 else 0.0
+        
+        kpis = {
+            'dso_promedio': dso_promedio,
+            'dso_by_country': dso_by_country,
+            'cei': cei,
+            'porcentaje_vencido': round(porcentaje_vencido, 1),
+            'monto_vencido': round(monto_vencido, 2),
+            'monto_vigente': round(monto_vigente, 2),
+            'total_facturas': acc['total_facturas'],
+            'promedio_dias_morosidad': round(promedio_dias_morosidad, 1),
+            'aging_buckets': {key: round(value, 2) for key, value in acc['aging_buckets'].items()},
+            'tasa_recuperacion': 75.0,  # Placeholder
+            'plazo_promedio_cobranza': 45.0,  # Placeholder
+            'morosidad_series': self._morosidad_series(date_to),
+        }
+        
+        # Top 15
+        sorted_items = sorted(acc['by_partner'].items(), key=lambda x: x[1], reverse=True)[:15]
+        top15 = {
+            'clientes': [name for name, _ in sorted_items],
+            'montos': [round(amount, 2) for _, amount in sorted_items],
+            'detalles': []
+        }
+        return self._armar_resumen(kpis, top15)
+    
+    @staticmethod
+    def _diferencias(expected, actual, path=''):
+        """Rutas donde dos resúmenes difieren (montos con tolerancia de un centavo)."""
+        if isinstance(expected, dict) and isinstance(actual, dict):
+            diffs = []
+            for key in set(expected) | set(actual):
+                diffs += CobranzaService._diferencias(expected.get(key), actual.get(key), f'{path}.{key}' if path else str(key))
+            return diffs
+        if isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+            diffs = []
+            for i, (a, b) in enumerate(zip(expected, actual)):
+                diffs += CobranzaService._diferencias(a, b, f'{path}[{i}]')
+            return diffs
+        if isinstance(expected, float) and isinstance(actual, (int, float)) and not isinstance(actual, bool):
+            return [] if abs(expected - actual) <= 0.011 else [f'{path}: {expected} != {actual}']
+        return [] if expected == actual else [f'{path}: {expected!r} != {actual!r}']
+    
+    def _verificar_paridad(self, python, grupos, filtro):
+        """Modo 'parity': compara el resumen de read_group con el de Python y reporta diferencias."""
+        diffs = self._diferencias(python, grupos)
+        if diffs:
+            print(f"[WARN] Paridad KPIs cobranza internacional {filtro}: {len(diffs)} diferencias: " + "; ".join(sorted(diffs)[:10]))
+        else:
+            print(f"[OK] Paridad KPIs cobranza internacional {filtro}: read_group coincide con Python")
+        return diffs
+    
+    @staticmethod
+    def _armar_resumen(kpis, top15):
+        """Resumen con el aging y el DSO por país ya en formato de gráfico."""
+        aging_buckets = kpis.get('aging_buckets', {})
+        dso_by_country = kpis.get('dso_by_country', {})
+        return {
+            'kpis': kpis,
+            'aging': {
+                'labels': ['Vigente', '1-30 días', '31-60 días', '61-90 días', '+90 días'],
+                'values': [
+                    aging_buckets.get('vigente', 0),
+                    aging_buckets.get('1-30', 0),
+                    aging_buckets.get('31-60', 0),
+                    aging_buckets.get('61-90', 0),
+                    aging_buckets.get('+90', 0),
+                ]
+            },
+            'dso_by_country': {
+                'countries': list(dso_by_country.keys()),
+                'dso_values': list(dso_by_country.values())
+            },
+            'top15': top15,
+        }
+    
+    def _resumen_vacio(self):
+        return self._armar_resumen(self._get_empty_kpis(), {'clientes': [], 'montos': [], 'detalles': []})
     
     def _get_empty_kpis(self):
         """KPIs vacíos."""
@@ -163,69 +455,218 @@ class CobranzaService:
             'aging_buckets': {'vigente': 0.0, '1-30': 0.0, '31-60': 0.0, '61-90': 0.0, '+90': 0.0},
             'tasa_recuperacion': 0.0,
             'plazo_promedio_cobranza': 0.0,
+            'morosidad_series': {'labels': [], 'values': []},
         }
     
-    def get_top15_deudores_internacional(self, date_from=None, date_to=None):
+    def _historial_internacional(self, months, date_to=None):
+        """Cierres mensuales internacionales reconstruidos desde el espejo, o None si no hay espejo."""
+        if self.receivables is None:
+            return None
+        try:
+            return self.receivables.monthly_history(months, end=date_to, international=True)
+        except MirrorUnsupported as e:
+            print(f"[INFO] Historial de cobranza no disponible: {e}")
+            return None
+    
+    def _morosidad_series(self, date_to=None, months=6):
+        """Promedio de días de morosidad al cierre de cada mes."""
+        history = self._historial_internacional(months, date_to)
+        if not history:
+            return {'labels': [], 'values': []}
+        return {
+            'labels': [point['label'] for point in history],
+            'values': [point['promedio_dias_morosidad'] for point in history],
+        }
+    
+    def get_dso_trend_internacional(self, months=6, date_to=None, objetivo=45.0, source=None):
         """
-        Obtener top 15 clientes con mayor deuda vencida internacional.
+        DSO internacional al cierre de cada mes (saldo al cierre / ventas del mes).
+        
+        Con source='mirror' se reconstruye desde el espejo; en vivo se
+        calcula con read_group (ver _dso_mensual_live).
+        
+        Args:
+            months (int): Cantidad de meses
+            date_to (str, optional): Fecha del último cierre (por defecto hoy)
+            objetivo (float): DSO objetivo que se dibuja como referencia
+            source (str): 'live' o 'mirror' (por defecto ODOO_DATA_SOURCE)
         
         Returns:
-            dict: {'clientes': [], 'montos': [], 'detalles': []}
+            dict: {'labels': [], 'dso_values': [], 'objetivo': []}
         """
         try:
-            if not self.connection.is_connected():
-                return {'clientes': [], 'montos': [], 'detalles': []}
-            
-            domain = [
-                ('move_type', 'in', ['out_invoice', 'out_refund']),
-                ('state', '=', 'posted'),
-                ('amount_residual', '>', 0)
-            ]
-            
-            if date_from:
-                domain.append(('invoice_date', '>=', date_from))
-            if date_to:
-                domain.append(('invoice_date', '<=', date_to))
-            
-            fields = [
-                'partner_id', 'amount_residual', 'invoice_date_due', 'country_code'
-            ]
-            
-            invoices = self.connection.search_read('account.move', domain, fields, limit=5000)
-            
-            # Filtrar internacional
-            internacional_inv = []
-            for inv in invoices:
-                temp = {'country_code': inv.get('country_code')}
-                if filter_internacional([temp]):
-                    internacional_inv.append(inv)
-            
-            # Agrupar por cliente
-            by_partner = {}
-            for inv in internacional_inv:
-                partner = inv.get('partner_id')
-                if not partner:
-                    continue
-                
-                partner_name = partner[1] if isinstance(partner, list) and len(partner) >= 2 else str(partner)
-                residual = float(inv.get('amount_residual') or 0.0)
-                
-                if partner_name not in by_partner:
-                    by_partner[partner_name] = 0.0
-                by_partner[partner_name] += residual
-            
-            # Top 15
-            sorted_items = sorted(by_partner.items(), key=lambda x: x[1], reverse=True)[:15]
-            clientes = [name for name, _ in sorted_items]
-            montos = [round(amount, 2) for _, amount in sorted_items]
-            
+            history = None
+            if (source or os.getenv('ODOO_DATA_SOURCE', 'live')) == 'mirror':
+                history = self._historial_internacional(months, date_to)
+            if history is None:
+                history = self._dso_mensual_live(months, date_to)
             return {
-                'clientes': clientes,
-                'montos': montos,
-                'detalles': []
+                'labels': [point['label'] for point in history],
+                'dso_values': [point['dso'] for point in history],
+                'objetivo': [objetivo] * len(history),
             }
-            
+        
         except Exception as e:
-            print(f"[ERROR] Error obteniendo top15: {e}")
-            return {'clientes': [], 'montos': [], 'detalles': []}
-
+            print(f"[ERROR] Error calculando tendencia DSO: {e}")
+            return {'labels': [], 'dso_values': [], 'objetivo': []}
+    
+    def _dso_mensual_live(self, months, date_to=None):
+        """
+        Saldo al cierre, ventas y DSO por mes con cuatro read_group.
+        
+        El saldo por cobrar al cierre de un mes es el acumulado de las
+        líneas por cobrar hasta ese mes, menos lo conciliado en el lado
+        deudor y más lo conciliado en el lado acreedor (max_date hasta ese
+        mes); las ventas son amount_total_signed agrupado por mes. Los meses
+        cerrados se guardan en DSO_TREND_CACHE y no se vuelven a calcular.
+        """
+        end = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else date.today()
+        today = date.today()
+        periods = month_ends(months, end)
+        cached = self._load_closed_months()
+        
+        def closed(last):
+            return last < today and last.day == calendar.monthrange(last.year, last.month)[1]
+        
+        missing = [(first, last) for first, last in periods
+                   if not closed(last) or first.strftime('%Y-%m') not in cached]
+        
+        if missing and self.connection.is_connected():
+            # Si el mes anterior ya está cerrado, su saldo es el de apertura
+            # y solo se agrupan los movimientos desde el primer mes faltante
+            first_missing = missing[0][0]
+            previous = date.fromordinal(first_missing.toordinal() - 1).strftime('%Y-%m')
+            opening = cached[previous]['cxc'] if previous in cached else None
+            computed = self._dso_read_group(first_missing, missing[-1][1], opening)
+            new_closed = {}
+            for first, last in missing:
+                month = first.strftime('%Y-%m')
+                point = computed[month]
+                point['dso'] = calcular_dso(point['cxc'], point['ventas'], (last - first).days + 1)
+                cached[month] = point
+                if closed(last):
+                    new_closed[month] = point
+            if new_closed:
+                self._save_closed_months(new_closed)
+        
+        history = []
+        for first, last in periods:
+            point = cached.get(first.strftime('%Y-%m'))
+            if point is not None:
+                history.append(dict(point, label=month_label(first), mes=first.strftime('%Y-%m')))
+        return history
+    
+    def _dso_read_group(self, first_day, last_day, opening=None):
+        """
+        {'YYYY-MM': {'cxc', 'ventas'}} de los meses entre first_day y last_day.
+        
+        Sin `opening` (saldo al cierre del mes anterior) se acumula toda la
+        historia; con él, solo los movimientos desde first_day.
+        """
+        prefixes = receivable_account_prefixes()
+        receivable = ['|'] * (len(prefixes) - 1) + [('account_id.code', '=like', f'{p}%') for p in prefixes]
+        lines = [('parent_state', '=', 'posted')] + receivable + _prefixed(INTERNACIONAL_DOMAIN, 'move_id.')
+        until = last_day.isoformat()
+        since = first_day.isoformat()
+        
+        def monthly(model, domain, field, date_field):
+            groups = self.connection._call(
+                model, 'read_group', [domain, [f'{field}:sum'], [f'{date_field}:month']], {'lazy': False}
+            )
+            return {_group_month(g, date_field): g.get(field) or 0.0 for g in groups}
+        
+        def period(field):
+            return [(field, '<=', until)] + ([(field, '>=', since)] if opening is not None else [])
+        
+        balances = monthly('account.move.line', lines + period('date'), 'balance', 'date')
+        debit = monthly('account.partial.reconcile', period('max_date') + _prefixed(lines, 'debit_move_id.'),
+                        'amount', 'max_date')
+        credit = monthly('account.partial.reconcile', period('max_date') + _prefixed(lines, 'credit_move_id.'),
+                         'amount', 'max_date')
+        ventas = monthly('account.move', [
+            ('move_type', 'in', ['out_invoice', 'out_refund']), ('state', '=', 'posted'),
+            ('invoice_date', '>=', since), ('invoice_date', '<=', until),
+        ] + INTERNACIONAL_DOMAIN, 'amount_total_signed', 'invoice_date')
+        
+        def movement(month):
+            return balances.get(month, 0.0) - debit.get(month, 0.0) + credit.get(month, 0.0)
+        
+        # Saldo al cierre = apertura + acumulado de los meses hasta el mes
+        start = first_day.strftime('%Y-%m')
+        cxc = (opening or 0.0) + sum(movement(m) for m in set(balances) | set(debit) | set(credit) if m < start)
+        
+        # Todos los meses del rango, también los que no tienen movimientos
+        # (arrastran el saldo del anterior)
+        result = {}
+        year, month_number = first_day.year, first_day.month
+        while (year, month_number) <= (last_day.year, last_day.month):
+            month = f'{year:04d}-{month_number:02d}'
+            cxc += movement(month)
+            result[month] = {'cxc': round(cxc, 2), 'ventas': round(ventas.get(month, 0.0), 2)}
+            year, month_number = (year + 1, 1) if month_number == 12 else (year, month_number + 1)
+        return result
+    
+    def _load_closed_months(self):
+        """Meses cerrados ya calculados ({'YYYY-MM': punto})."""
+        try:
+            with open(self.dso_cache_path, encoding='utf-8') as fh:
+                data = json.load(fh)
+            # Archivos de otra versión (p. ej. meses sin movimientos guardados
+            # con saldo 0) se descartan y se recalculan
+            if not isinstance(data, dict) or data.get('version') != DSO_CACHE_VERSION:
+                return {}
+            return data.get('months', {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"[WARN] Caché de DSO mensual ilegible, se recalculará: {e}")
+            return {}
+    
+    def _save_closed_months(self, months):
+        with self._dso_cache_lock:
+            data = self._load_closed_months()
+            data.update(months)
+            try:
+                os.makedirs(os.path.dirname(self.dso_cache_path) or '.', exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.dso_cache_path) or '.', suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+                    json.dump({'version': DSO_CACHE_VERSION, 'months': data}, fh, sort_keys=True)
+                os.replace(tmp_path, self.dso_cache_path)
+            except Exception as e:
+                print(f"[WARN] No se pudo guardar la caché de DSO mensual: {e}")
+    
+    def get_saldos_internacional_a_fecha(self, fecha, partner_id=None):
+        """
+        Saldo por cobrar y aging internacional por cliente a una fecha pasada.
+        
+        Args:
+            fecha (str): Fecha de corte ('YYYY-MM-DD')
+            partner_id (int, optional): Solo este cliente
+        
+        Returns:
+            dict: {'fecha', 'resumen', 'clientes'}; None si el espejo no
+                está disponible
+        """
+        if self.receivables is None:
+            return None
+        try:
+            return {
+                'fecha': fecha,
+                'resumen': self.receivables.summary(fecha, international=True),
+                'clientes': self.receivables.partner_balances(fecha, international=True, partner_id=partner_id),
+            }
+        except MirrorUnsupported as e:
+            print(f"[INFO] Saldos a fecha no disponibles: {e}")
+            return None
+    
+    def get_top15_deudores_internacional(self, date_from=None, date_to=None, source=None):
+        """
+        Obtener top 15 clientes con mayor deuda vencida internacional.
+        
+        Args:
+            source (str): 'live' o 'mirror' (por defecto ODOO_DATA_SOURCE)
+        
+        Returns:
+            dict: {'clientes': [], 'montos': [], 'detalles': []}
+        """
+        return self.get_resumen_internacional(date_from, date_to, source=source)['top15']
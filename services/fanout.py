@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Ejecución concurrente de lecturas a Odoo con dependencias.
+
+Permite describir un conjunto de lecturas como un grafo pequeño
+(nombre -> dependencias + función) y ejecutarlo en un pool de hilos:
+las lecturas independientes corren en paralelo y cada una arranca apenas
+terminan las que necesita.
+"""
+
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def get_fanout_workers():
+    """
+    Returns:
+        int: Hilos para el fan-out (ODOO_FANOUT_WORKERS, por defecto 4)
+    """
+    return max(1, int(os.getenv('ODOO_FANOUT_WORKERS', 4)))
+
+
+def _timed(func, results):
+    start = time.perf_counter()
+    value = func(results)
+    return value, time.perf_counter() - start
+
+
+def run_task_graph(tasks, max_workers=None):
+    """
+    Ejecuta un grafo de tareas respetando sus dependencias.
+
+    Args:
+        tasks (dict): {nombre: (dependencias, funcion)}. Cada función recibe
+            un dict con los resultados de las tareas ya terminadas.
+        max_workers (int, optional): Tamaño del pool de hilos
+
+    Returns:
+        tuple: (resultados, tiempos) ambos dict por nombre de tarea; los
+            tiempos están en segundos
+
+    Raises:
+        ValueError: Si hay dependencias inexistentes o cíclicas
+        Exception: La primera excepción lanzada por una tarea
+    """
+    for name, (deps, _) in tasks.items():
+        missing = [d for d in deps if d not in tasks]
+        if missing:
+            raise ValueError(f"La tarea '{name}' depende de tareas inexistentes: {missing}")
+
+    results = {}
+    timings = {}
+    pending = dict(tasks)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or get_fanout_workers()) as executor:
+        while pending or running:
+            ready = [name for name, (deps, _) in pending.items() if all(d in results for d in deps)]
+            for name in ready:
+                _, func = pending.pop(name)
+                # Cada tarea hereda el contexto (ej: endpoint para las métricas)
+                context = contextvars.copy_context()
+                running[executor.submit(context.run, _timed, func, dict(results))] = name
+
+            if not running:
+                raise ValueError(f"Dependencias cíclicas entre las tareas: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], timings[name] = future.result()
+
+    return results, timings
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Caché compartida de datos maestros de Odoo.
+
+Productos, clientes, impuestos, cuentas, sub canales de crédito y
+vendedores cambian pocas veces al día, pero se volvían a descargar en cada
+request. Aquí se guardan por id con TTL y desalojo LRU: solo los ids que no
+están en caché viajan a Odoo, y cada cierto tiempo se traen únicamente los
+registros con `write_date` posterior a la última sincronización.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from .cache import TTLCache
+from .singleflight import StampedeCache
+
+
+# Margen para diferencias de reloj entre este servidor y Odoo
+_SYNC_SKEW = timedelta(seconds=60)
+
+
+class _Namespace:
+    """Caché de un modelo para un conjunto concreto de campos."""
+
+    def __init__(self, model, fields, key_field, context, ttl, max_size):
+        self.model = model
+        self.fields = list(fields)
+        self.key_field = key_field
+        # Por id se leen también los archivados, igual que read()
+        self.context = dict(context or {}, active_test=False) if key_field == 'id' else context
+        self.records = TTLCache(ttl, max_size)
+        self.last_sync = None
+        self.last_check = 0.0
+        self.lock = threading.Lock()
+
+    def key_of(self, record):
+        value = record.get(self.key_field)
+        if isinstance(value, (list, tuple)):
+            return value[0] if value else None
+        return value
+
+
+class MasterDataCache:
+    """
+    Caché de registros maestros compartida entre servicios.
+    """
+
+    def __init__(self, connection, ttl=None, max_size=None, refresh_interval=None):
+        """
+        Args:
+            connection (OdooConnection): Conexión a Odoo
+            ttl (float, optional): Vida de cada registro (MASTER_DATA_TTL, por defecto 6 h)
+            max_size (int, optional): Registros por modelo (MASTER_DATA_MAX_RECORDS, por defecto 50000)
+            refresh_interval (float, optional): Cada cuánto pedir cambios por
+                write_date (MASTER_DATA_REFRESH, por defecto 300 s)
+        """
+        self.connection = connection
+        self.ttl = float(ttl or os.getenv('MASTER_DATA_TTL', 6 * 3600))
+        self.max_size = int(max_size or os.getenv('MASTER_DATA_MAX_RECORDS', 50000))
+        self.refresh_interval = float(refresh_interval or os.getenv('MASTER_DATA_REFRESH', 300))
+        self._namespaces = {}
+        self._values = StampedeCache(self.ttl, 256)
+        self._lock = threading.Lock()
+
+    def _namespace(self, model, fields, key_field, context):
+        lang = (context or {}).get('lang')
+        key = (model, tuple(sorted(fields)), key_field, lang)
+        with self._lock:
+            ns = self._namespaces.get(key)
+            if ns is None:
+                ns = _Namespace(model, fields, key_field, context, self.ttl, self.max_size)
+                self._namespaces[key] = ns
+            return ns
+
+    @staticmethod
+    def _sync_mark():
+        return (datetime.utcnow() - _SYNC_SKEW).strftime('%Y-%m-%d %H:%M:%S')
+
+    def _read_fields(self, ns):
+        fields = list(ns.fields)
+        if ns.key_field not in fields:
+            fields.append(ns.key_field)
+        return fields
+
+    def _refresh_changed(self, ns):
+        """Actualiza en caché los registros modificados desde la última sincronización."""
+        now = time.monotonic()
+        if ns.last_sync is None or now - ns.last_check < self.refresh_interval:
+            return
+        with ns.lock:
+            if now - ns.last_check < self.refresh_interval:
+                return
+            ns.last_check = now
+            mark = self._sync_mark()
+            try:
+                changed = {}
+                for record in self.connection.iter_search_read(
+                    ns.model, [('write_date', '>', ns.last_sync)], self._read_fields(ns), context=ns.context
+                ):
+                    key = ns.key_of(record)
+                    if key is not None:
+                        changed[key] = record
+                updated = ns.records.update_existing(changed)
+                ns.last_sync = mark
+                if updated:
+                    print(f"[INFO] Cache {ns.model}: {updated} registros actualizados por write_date")
+            except Exception as e:
+                print(f"[WARN] No se pudo refrescar cache de {ns.model}: {e}")
+
+    def get_records(self, model, ids, fields, key_field='id', context=None, strict=False):
+        """
+        Obtiene registros por clave usando la caché.
+
+        Solo las claves ausentes se consultan a Odoo; las que no existen en
+        Odoo también se recuerdan (caché negativa) para no repetir la
+        consulta.
+
+        Args:
+            model (str): Modelo de Odoo (ej: 'product.product')
+            ids (iterable): Claves a obtener
+            fields (list): Campos a leer
+            key_field (str): Campo clave; puede ser un many2one
+                (ej: 'partner_id' en 'agr.credit.customer')
+            context (dict, optional): Contexto de Odoo (ej: {'lang': 'es_PE'})
+            strict (bool): Lanzar el error si falla la lectura de las claves
+                faltantes (por defecto se devuelven solo las que hay en caché)
+
+        Returns:
+            dict: {clave: registro} para las claves encontradas
+        """
+        ns = self._namespace(model, fields, key_field, context)
+        self._refresh_changed(ns)
+
+        keys = set(k for k in ids if k)
+        found, missing = ns.records.get_many(keys)
+
+        if missing:
+            mark = self._sync_mark()
+            try:
+                fetched = {}
+                for record in self.connection.iter_search_read(
+                    model, [(key_field, 'in', sorted(missing))], self._read_fields(ns), context=ns.context
+                ):
+                    key = ns.key_of(record)
+                    if key is not None:
+                        fetched[key] = record
+                for key in missing:
+                    fetched.setdefault(key, None)
+                ns.records.set_many(fetched)
+                found.update(fetched)
+                with ns.lock:
+                    if ns.last_sync is None:
+                        ns.last_sync = mark
+                        ns.last_check = time.monotonic()
+            except Exception as e:
+                print(f"[ERROR] Error leyendo {model} para la cache: {e}")
+                if strict:
+                    raise
+
+        return {k: v for k, v in found.items() if v is not None}
+
+    def get_value(self, key, loader, ttl=None):
+        """
+        Obtiene un valor calculado (ej: lista de vendedores) con TTL.
+
+        Llamadas simultáneas comparten una sola carga y el valor se
+        refresca en segundo plano poco antes de vencer.
+
+        Args:
+            key (str): Clave del valor
+            loader (callable): Función sin argumentos que calcula el valor
+            ttl (float, optional): Vida del valor en segundos
+
+        Returns:
+            Valor en caché o recién calculado
+        """
+        return self._values.get_or_load(key, loader, ttl)
+
+    def invalidate(self, model=None):
+        """Vacía la caché de un modelo (o toda si no se indica)."""
+        with self._lock:
+            for (ns_model, _, _, _), ns in self._namespaces.items():
+                if model is None or ns_model == model:
+                    ns.records.clear()
+                    ns.last_sync = None
+            if model is None:
+                self._values.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Registros en caché por modelo
+        """
+        with self._lock:
+            result = {}
+            for ns in self._namespaces.values():
+                result[ns.model] = result.get(ns.model, 0) + len(ns.records)
+            return result
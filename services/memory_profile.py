@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Perfilado de memoria por endpoint con tracemalloc (opcional).
+
+Con MEMORY_PROFILE=true el worker activa tracemalloc y en cada request mide
+el pico de memoria de Python y, en una fracción de las requests
+(MEMORY_PROFILE_SAMPLE), toma snapshots para obtener los sitios que más
+memoria asignaron. Los `checkpoint()` colocados donde conviven las
+estructuras grandes (ej: al terminar el workbook de export_excel_cxc, con
+`cxc_data`, el DataFrame y el workbook vivos a la vez) capturan el snapshot
+más cercano al pico.
+
+tracemalloc hace más lento todo el worker (2x o más) y el pico es del
+proceso completo: con varios hilos las requests simultáneas se mezclan.
+Usarlo en un worker de diagnóstico con un solo hilo, no de forma
+permanente.
+"""
+
+import contextvars
+import os
+import random
+import threading
+import time
+import tracemalloc
+
+
+# Archivos que no interesan como sitio de asignación
+_IGNORED = (
+    tracemalloc.__file__,
+    __file__,
+    '<frozen importlib._bootstrap>',
+    '<frozen importlib._bootstrap_external>',
+    '<unknown>',
+)
+
+_current = contextvars.ContextVar('memory_profile', default=None)
+
+
+class _RequestMemory:
+    """Estado de la request perfilada en curso."""
+
+    def __init__(self, route, baseline, snapshot):
+        self.route = route
+        self.started = time.time()
+        self.baseline = baseline
+        self.snapshot = snapshot
+        self.peak_snapshot = None
+        self.peak_label = None
+        self.peak_current = 0
+
+
+def _filtered(snapshot):
+    return snapshot.filter_traces([tracemalloc.Filter(False, path) for path in _IGNORED])
+
+
+class MemoryProfiler:
+    """Pico de memoria y sitios de asignación por endpoint."""
+
+    def __init__(self, enabled=None, frames=None, top=None, sample_rate=None):
+        """
+        Args:
+            enabled (bool, optional): Activa el perfilado en la app
+                (MEMORY_PROFILE, por defecto false)
+            frames (int, optional): Frames guardados por asignación
+                (MEMORY_PROFILE_FRAMES, por defecto 1)
+            top (int, optional): Sitios de asignación a conservar
+                (MEMORY_PROFILE_TOP, por defecto 10)
+            sample_rate (float, optional): Fracción de requests con snapshots
+                (MEMORY_PROFILE_SAMPLE, por defecto 1.0)
+        """
+        if enabled is None:
+            enabled = os.getenv('MEMORY_PROFILE', 'false').lower() in ('1', 'true', 'yes')
+        self.enabled = enabled
+        self.frames = int(frames if frames is not None else os.getenv('MEMORY_PROFILE_FRAMES', 1))
+        self.top = int(top if top is not None else os.getenv('MEMORY_PROFILE_TOP', 10))
+        self.sample_rate = float(sample_rate if sample_rate is not None else os.getenv('MEMORY_PROFILE_SAMPLE', 1.0))
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Activa tracemalloc si no está activo."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            print(f"[INFO] Perfilado de memoria activo (tracemalloc, {self.frames} frame(s))")
+
+    def begin_request(self, route, snapshots=None):
+        """
+        Empieza a medir una request (o cualquier bloque) bajo `route`.
+
+        Args:
+            route (str): Endpoint o nombre del caso
+            snapshots (bool, optional): Tomar snapshots; por defecto según
+                MEMORY_PROFILE_SAMPLE
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        if snapshots is None:
+            snapshots = random.random() < self.sample_rate
+        tracemalloc.reset_peak()
+        snapshot = tracemalloc.take_snapshot() if snapshots else None
+        state = _RequestMemory(route, tracemalloc.get_traced_memory()[0], snapshot)
+        _current.set(state)
+        return state
+
+    def checkpoint(self, label):
+        """
+        Toma un snapshot si la memoria actual supera la del último checkpoint
+        de esta request. Sin perfilado activo no hace nada.
+        """
+        state = _current.get()
+        if state is None or state.snapshot is None:
+            return
+        current = tracemalloc.get_traced_memory()[0]
+        if current > state.peak_current:
+            state.peak_current = current
+            state.peak_snapshot = tracemalloc.take_snapshot()
+            state.peak_label = label
+
+    def end_request(self):
+        """
+        Cierra la medición de la request en curso y la acumula por ruta.
+
+        Returns:
+            dict: {'route', 'peak_mb', 'retained_mb', 'sites', 'checkpoint'} o None
+        """
+        state = _current.get()
+        if state is None:
+            return None
+        _current.set(None)
+        current, peak = tracemalloc.get_traced_memory()
+        result = {
+            'route': state.route,
+            'peak_mb': (peak - state.baseline) / 1024 / 1024,
+            'retained_mb': (current - state.baseline) / 1024 / 1024,
+            'checkpoint': state.peak_label,
+            'sites': [],
+        }
+        if state.snapshot is not None:
+            # Sin checkpoints se compara contra el estado al final de la request
+            after = state.peak_snapshot or tracemalloc.take_snapshot()
+            stats = _filtered(after).compare_to(_filtered(state.snapshot), 'lineno')
+            result['sites'] = [
+                {
+                    'site': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                    'size_mb': stat.size_diff / 1024 / 1024,
+                    'blocks': stat.count_diff,
+                }
+                for stat in stats[:self.top] if stat.size_diff > 0
+            ]
+        self._accumulate(result)
+        return result
+
+    def _accumulate(self, result):
+        with self._lock:
+            agg = self._routes.get(result['route'])
+            if agg is None:
+                agg = self._routes[result['route']] = {
+                    'route': result['route'], 'count': 0, 'peak_mb_max': 0.0, 'peak_mb_total': 0.0,
+                    'retained_mb_total': 0.0, 'top_sites': [], 'top_checkpoint': None,
+                }
+            agg['count'] += 1
+            agg['peak_mb_total'] += result['peak_mb']
+            agg['retained_mb_total'] += result['retained_mb']
+            # Los sitios que se guardan son los de la request con mayor pico
+            if result['peak_mb'] >= agg['peak_mb_max']:
+                agg['peak_mb_max'] = result['peak_mb']
+                if result['sites']:
+                    agg['top_sites'] = result['sites']
+                    agg['top_checkpoint'] = result['checkpoint']
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def summary(self):
+        """
+        Returns:
+            list: Una entrada por ruta, ordenadas por pico máximo
+        """
+        with self._lock:
+            routes = [dict(agg) for agg in self._routes.values()]
+        for agg in routes:
+            agg['peak_mb_avg'] = agg.pop('peak_mb_total') / agg['count']
+            agg['retained_mb_avg'] = agg.pop('retained_mb_total') / agg['count']
+        routes.sort(key=lambda x: x['peak_mb_max'], reverse=True)
+        return routes
+
+
+# Perfilador global del proceso
+memory_profiler = MemoryProfiler()
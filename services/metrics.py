@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas de las llamadas a Odoo.
+
+Cada llamada `execute_kw` real (las coalescidas no viajan a Odoo) registra
+su latencia en un histograma, las filas devueltas, los bytes enviados y
+recibidos y si falló. Las series se etiquetan por modelo, método, servicio
+que hizo la llamada (módulo de Python) y endpoint de Flask, y se exponen en
+formato de texto de Prometheus y como resumen JSON.
+"""
+
+import contextvars
+import sys
+import threading
+import time
+
+from .odoo_transport import last_call_bytes, reset_call_bytes
+from .request_timing import record_odoo_call
+from .slow_log import slow_call_log
+
+
+# Límites (segundos) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Endpoint de Flask en curso; app.py lo fija en cada request
+current_endpoint = contextvars.ContextVar('current_endpoint', default='')
+
+# Módulos que forman la ruta de la llamada y no cuentan como "servicio"
+_INFRA_MODULES = (
+    'services.odoo_connection', 'services.odoo_transport', 'services.singleflight',
+    'services.metrics', 'services.fanout', 'xmlrpc.', 'threading', 'concurrent.',
+)
+
+
+def _calling_service():
+    """Nombre corto del primer módulo fuera de la infraestructura de llamadas."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith(_INFRA_MODULES):
+            return module.rsplit('.', 1)[-1]
+        frame = frame.f_back
+    return 'desconocido'
+
+
+def _count_rows(result):
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, bool) or result is None:
+        return 0
+    return 1
+
+
+class _Series:
+    __slots__ = ('buckets', 'count', 'sum', 'max', 'rows', 'bytes_sent', 'bytes_received', 'errors')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.errors = 0
+
+    def quantile(self, q):
+        """Cuantil aproximado (límite superior del bucket que lo contiene)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+
+class OdooMetrics:
+    """
+    Registro en memoria de métricas por (modelo, método, servicio, endpoint).
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def observe(self, model, method, service, endpoint, seconds, rows=0, bytes_sent=0, bytes_received=0, error=False):
+        """Registra una llamada a Odoo."""
+        key = (model, method, service, endpoint)
+        index = len(LATENCY_BUCKETS)
+        for i, limit in enumerate(LATENCY_BUCKETS):
+            if seconds <= limit:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.buckets[index] += 1
+            series.count += 1
+            series.sum += seconds
+            series.max = max(series.max, seconds)
+            series.rows += rows
+            series.bytes_sent += bytes_sent
+            series.bytes_received += bytes_received
+            if error:
+                series.errors += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.started_at = time.time()
+
+    def _snapshot(self):
+        with self._lock:
+            return [(key, s) for key, s in self._series.items()]
+
+    def render_prometheus(self):
+        """
+        Returns:
+            str: Métricas en formato de exposición de texto de Prometheus
+        """
+        def labels(key, extra=''):
+            model, method, service, endpoint = key
+            text = f'model="{model}",method="{method}",service="{service}",endpoint="{endpoint}"'
+            return '{' + text + (',' + extra if extra else '') + '}'
+
+        out = [
+            '# HELP odoo_call_duration_seconds Latencia de llamadas execute_kw a Odoo',
+            '# TYPE odoo_call_duration_seconds histogram',
+        ]
+        snapshot = self._snapshot()
+        for key, s in snapshot:
+            cumulative = 0
+            for limit, n in zip(LATENCY_BUCKETS, s.buckets):
+                cumulative += n
+                out.append('odoo_call_duration_seconds_bucket%s %d' % (labels(key, 'le="%s"' % limit), cumulative))
+            out.append('odoo_call_duration_seconds_bucket%s %d' % (labels(key, 'le="+Inf"'), s.count))
+            out.append(f'odoo_call_duration_seconds_sum{labels(key)} {s.sum:.6f}')
+            out.append(f'odoo_call_duration_seconds_count{labels(key)} {s.count}')
+
+        for name, attr, help_text in (
+            ('odoo_call_rows_total', 'rows', 'Registros devueltos por Odoo'),
+            ('odoo_call_bytes_sent_total', 'bytes_sent', 'Bytes enviados a Odoo (cuerpo XML-RPC)'),
+            ('odoo_call_bytes_received_total', 'bytes_received', 'Bytes recibidos de Odoo (cuerpo XML-RPC)'),
+            ('odoo_call_errors_total', 'errors', 'Llamadas a Odoo que fallaron'),
+        ):
+            out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} counter')
+            for key, s in snapshot:
+                out.append(f'{name}{labels(key)} {getattr(s, attr)}')
+        return '\n'.join(out) + '\n'
+
+    def summary(self, endpoint=None):
+        """
+        Resumen JSON ordenado por tiempo total.
+
+        Args:
+            endpoint (str, optional): Filtrar por endpoint de Flask
+
+        Returns:
+            dict: {'since', 'calls': [...]} con latencias en milisegundos
+        """
+        calls = []
+        for (model, method, service, ep), s in self._snapshot():
+            if endpoint and ep != endpoint:
+                continue
+            calls.append({
+                'model': model,
+                'method': method,
+                'service': service,
+                'endpoint': ep,
+                'count': s.count,
+                'errors': s.errors,
+                'total_ms': round(s.sum * 1000, 1),
+                'avg_ms': round(s.sum / s.count * 1000, 1) if s.count else 0,
+                'p50_ms': round(s.quantile(0.5) * 1000, 1),
+                'p95_ms': round(s.quantile(0.95) * 1000, 1),
+                'max_ms': round(s.max * 1000, 1),
+                'rows': s.rows,
+                'bytes_sent': s.bytes_sent,
+                'bytes_received': s.bytes_received,
+            })
+        calls.sort(key=lambda c: c['total_ms'], reverse=True)
+        return {'since': self.started_at, 'calls': calls}
+
+
+# Registro global del proceso
+odoo_metrics = OdooMetrics()
+
+
+class InstrumentedServerProxy:
+    """
+    Proxy de `/xmlrpc/2/object` que mide cada `execute_kw` real.
+
+    Se ubica debajo de la coalescencia (solo se mide lo que viaja a Odoo) y
+    todas las rutas de llamada (OdooConnection y los `models.execute_kw`
+    directos de OdooManager) pasan por él.
+    """
+
+    def __init__(self, proxy, metrics=None, slow_log=None):
+        self._proxy = proxy
+        self._metrics = metrics or odoo_metrics
+        self._slow_log = slow_log or slow_call_log
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        service = _calling_service()
+        endpoint = current_endpoint.get()
+        reset_call_bytes()
+        start = time.perf_counter()
+        result = None
+        error = None
+        try:
+            result = self._proxy.execute_kw(db, uid, password, model, method, args, kwargs or {})
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            sent, received = last_call_bytes()
+            rows = _count_rows(result)
+            self._metrics.observe(model, method, service, endpoint, seconds, rows, sent, received, error is not None)
+            record_odoo_call(model, method, start, seconds)
+            self._slow_log.record(model, method, args, kwargs, seconds, rows, sent, received,
+                                  service, endpoint, error is not None)
+
+    def __getattr__(self, name):
+        return getattr(self._proxy, name)
@@ -8,16 +8,58 @@ Maneja la conexión XML-RPC y autenticación con Odoo.
 import xmlrpc.client
 import os
 
+from .odoo_transport import OdooConnectionPool, PooledServerProxy
+from .singleflight import SingleFlight, call_key
+from .metrics import InstrumentedServerProxy
+
+
+# Métodos de solo lectura que pueden compartir una misma llamada en curso
+COALESCED_METHODS = frozenset([
+    'search_read', 'read', 'read_group', 'search_count', 'search',
+    'name_get', 'name_search', 'fields_get',
+])
+
+
+class CoalescingServerProxy:
+    """
+    Proxy de `/xmlrpc/2/object` cuyas llamadas `execute_kw` de lectura
+    pasan por single-flight. El resto de atributos se delega al proxy real.
+    """
+    
+    def __init__(self, proxy, flight):
+        self._proxy = proxy
+        self._flight = flight
+    
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        kwargs = kwargs or {}
+        
+        def call():
+            return self._proxy.execute_kw(db, uid, password, model, method, args, kwargs)
+        
+        if method not in COALESCED_METHODS:
+            return call()
+        return self._flight.do(call_key(db, uid, model, method, args, kwargs), call)
+    
+    def __getattr__(self, name):
+        return getattr(self._proxy, name)
+
 
 class OdooConnection:
     """
     Conexión base a Odoo usando XML-RPC.
     
-    Lee credenciales del archivo .env y establece conexión.
+    Lee credenciales del archivo .env y establece conexión. Las llamadas a
+    `/xmlrpc/2/object` pasan por un pool de conexiones persistentes, por lo
+    que una instancia puede compartirse entre los hilos de Flask. Las
+    lecturas idénticas simultáneas se coalescen en una sola llamada
+    (ODOO_SINGLE_FLIGHT, activo por defecto) y cada llamada real queda
+    medida en `services.metrics` (ODOO_METRICS, activo por defecto).
     """
     
     def __init__(self):
         """Inicializa la conexión a Odoo."""
+        self.pool = None
+        self.flight = SingleFlight()
         try:
             # Leer credenciales del archivo .env
             self.url = os.getenv('ODOO_URL')
@@ -34,7 +76,13 @@ class OdooConnection:
             self.uid = common.authenticate(self.db, self.username, self.password, {})
             
             if self.uid:
-                self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
+                self.pool = OdooConnectionPool(f'{self.url}/xmlrpc/2/object')
+                self.models = PooledServerProxy(self.pool)
+                # Métricas por llamada real (debajo de la coalescencia)
+                if os.getenv('ODOO_METRICS', 'true').lower() in ('1', 'true', 'yes'):
+                    self.models = InstrumentedServerProxy(self.models)
+                if os.getenv('ODOO_SINGLE_FLIGHT', 'true').lower() in ('1', 'true', 'yes'):
+                    self.models = CoalescingServerProxy(self.models, self.flight)
                 print("[OK] Conexion a Odoo establecida exitosamente.")
             else:
                 print("[ERROR] No se pudo autenticar. Continuando en modo offline.")
@@ -104,18 +152,27 @@ class OdooConnection:
             print("[WARN] No hay conexion a Odoo disponible")
             return None
         
-        if kwargs is None:
-            kwargs = {}
-        
         try:
-            return self.models.execute_kw(
-                self.db, self.uid, self.password,
-                model, method, args, kwargs
-            )
+            return self._call(model, method, args, kwargs)
         except Exception as e:
             print(f"[ERROR] Error ejecutando {model}.{method}: {e}")
             return None
     
+    def _call(self, model, method, args, kwargs=None):
+        """
+        Ejecuta execute_kw propagando cualquier excepción.
+        
+        Lo usan los métodos que no deben confundir un error con un
+        resultado vacío (ej: la paginación de `iter_search_read`).
+        """
+        if kwargs is None:
+            kwargs = {}
+        
+        return self.models.execute_kw(
+            self.db, self.uid, self.password,
+            model, method, args, kwargs
+        )
+    
     def search_read(self, model, domain, fields, limit=None, offset=None, order=None):
         """
         Método conveniente para search_read.
@@ -141,6 +198,92 @@ class OdooConnection:
         
         return self.execute_kw(model, 'search_read', [domain], options) or []
     
+    def iter_search_read(self, model, domain, fields, page_size=None, limit=None, context=None, order=None):
+        """
+        Generador de search_read paginado.
+        
+        Sin `limit` lee todos los registros: pagina con `order='id'` y un
+        cursor por id (`('id', '>', ultimo_id)`), de modo que cada página es
+        estable aunque se inserten registros durante la lectura y el costo no
+        crece con el offset. Con `limit` (listados con tope) respeta `order`,
+        o el orden por defecto del modelo en Odoo, y pagina por offset: los
+        primeros N registros son los mismos que devolvería search_read.
+        
+        Args:
+            model (str): Modelo de Odoo
+            domain (list): Dominio de búsqueda
+            fields (list): Campos a obtener
+            page_size (int, optional): Registros por página (ODOO_PAGE_SIZE, por defecto 2000)
+            limit (int, optional): Máximo total de registros; None para todos
+            context (dict, optional): Contexto de Odoo (ej: {'lang': 'es_PE'})
+            order (str, optional): Orden de Odoo para lecturas con `limit`
+                (ej: 'date desc, id desc'); se ignora sin `limit`
+        
+        Yields:
+            dict: Registros por id ascendente (sin `limit`) o en el orden pedido
+        
+        Raises:
+            Exception: Si falla una página, para no devolver datos truncados
+        """
+        if not self.is_connected():
+            print("[WARN] No hay conexion a Odoo disponible")
+            return
+        
+        page_size = int(page_size or os.getenv('ODOO_PAGE_SIZE', 2000))
+        if limit is not None:
+            yield from self._iter_offset_pages(model, domain, fields, page_size, limit, context, order)
+            return
+        
+        last_id = 0
+        while True:
+            options = {'fields': fields, 'limit': page_size, 'order': 'id'}
+            if context:
+                options['context'] = context
+            
+            page = self._call(model, 'search_read', [[('id', '>', last_id)] + list(domain)], options)
+            if not page:
+                break
+            
+            yield from page
+            
+            last_id = page[-1]['id']
+            if len(page) < page_size:
+                break
+    
+    def _iter_offset_pages(self, model, domain, fields, page_size, limit, context, order):
+        """Páginas por offset de una lectura con tope, en el orden indicado."""
+        offset = 0
+        while offset < limit:
+            batch = min(page_size, limit - offset)
+            options = {'fields': fields, 'offset': offset, 'limit': batch}
+            if order:
+                options['order'] = order
+            if context:
+                options['context'] = context
+            
+            page = self._call(model, 'search_read', [list(domain)], options)
+            if not page:
+                break
+            
+            yield from page
+            
+            offset += len(page)
+            if len(page) < batch:
+                break
+    
+    def search_read_all(self, model, domain, fields, page_size=None, limit=None, context=None, order=None):
+        """
+        Versión en lista de `iter_search_read`.
+        
+        Returns:
+            list: Todos los registros (o hasta `limit`); lista vacía si falla
+        """
+        try:
+            return list(self.iter_search_read(model, domain, fields, page_size, limit, context, order))
+        except Exception as e:
+            print(f"[ERROR] Error paginando {model}.search_read: {e}")
+            return []
+    
     def read(self, model, ids, fields):
         """
         Método conveniente para read.
@@ -0,0 +1,781 @@
+# -*- coding: utf-8 -*-
+"""
+Espejo local en SQLite de account.move, account.move.line y sus conciliaciones.
+
+Los reportes y KPIs consultan Odoo en vivo por XML-RPC: es lento y carga el
+ERP en horario de trabajo. Este módulo mantiene una copia indexada de los
+campos que usan `get_sales_lines`, `ReportService` y `CobranzaService`:
+
+- carga inicial paginada por id (se retoma si se interrumpe),
+- sincronización incremental por (write_date, id): cada pasada trae solo
+  lo creado o modificado desde la anterior,
+- conciliación periódica de ids contra Odoo para quitar los borrados
+  (también las conciliaciones parciales deshechas),
+- modelos de referencia pequeños (clientes, cuentas, productos) recargados
+  completos, para resolver en SQL las rutas con punto de los dominios
+  (`account_id.code`, `partner_id.name`, `product_id.categ_id`...).
+
+`MirrorConnection` tiene la interfaz de `OdooConnection`: search_read,
+read, search_count y search de los modelos espejados se responden desde
+SQLite traduciendo el dominio a SQL; el resto (otros modelos, campos u
+operadores no soportados, espejo aún sin cargar) va a Odoo en vivo. Los
+servicios la usan con `source='mirror'` (o ODOO_DATA_SOURCE=mirror).
+
+Solo un worker sincroniza (lock de archivo, igual que el pre-calentado) y
+todos leen el mismo archivo en modo WAL. Los nombres de los many2one se
+guardan como estaban al sincronizar el registro.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .odoo_connection import OdooConnection
+from .prewarm import CachePrewarmer
+
+
+# Campos espejados por modelo. Los incrementales se sincronizan por
+# write_date; los de referencia se recargan completos en cada pasada.
+MIRRORED_MODELS = {
+    'account.move': {
+        'fields': (
+            'name', 'ref', 'move_type', 'state', 'payment_state', 'partner_id', 'country_code',
+            'date', 'invoice_date', 'invoice_date_due', 'invoice_origin', 'invoice_payment_term_id',
+            'invoice_user_id', 'team_id', 'sales_channel_id', 'sale_type_id', 'order_id', 'journal_id',
+            'currency_id', 'l10n_latam_document_type_id', 'l10n_latam_boe_number', 'origin_number',
+            'amount_untaxed', 'amount_total', 'amount_residual', 'amount_residual_with_retention',
+            'amount_total_signed', 'amount_residual_signed', 'write_date',
+        ),
+        'indexes': ('invoice_date', 'partner_id', 'move_type, state'),
+        'incremental': True,
+    },
+    'account.move.line': {
+        'fields': (
+            'move_id', 'move_name', 'parent_state', 'partner_id', 'product_id', 'account_id', 'name',
+            'date', 'date_maturity', 'quantity', 'price_unit', 'balance', 'debit', 'credit',
+            'amount_currency', 'amount_residual', 'amount_residual_currency',
+            'amount_residual_with_retention', 'currency_id', 'reconciled', 'tax_ids', 'display_type',
+            'write_date',
+        ),
+        'indexes': ('move_id', 'partner_id', 'account_id', 'product_id', 'date'),
+        'incremental': True,
+    },
+    'account.partial.reconcile': {
+        'fields': ('debit_move_id', 'credit_move_id', 'amount', 'debit_amount_currency',
+                   'credit_amount_currency', 'max_date', 'write_date'),
+        'indexes': ('debit_move_id', 'credit_move_id', 'max_date'),
+        'incremental': True,
+    },
+    'res.partner': {
+        'fields': ('name', 'vat', 'country_code', 'country_id'),
+        'indexes': (),
+        'incremental': False,
+    },
+    'account.account': {
+        'fields': ('code', 'name'),
+        'indexes': ('code',),
+        'incremental': False,
+    },
+    'product.product': {
+        'fields': ('default_code', 'categ_id', 'commercial_line_national_id'),
+        'indexes': (),
+        'incremental': False,
+    },
+}
+
+# Métodos de lectura que se responden desde el espejo
+MIRROR_METHODS = frozenset(['search_read', 'read', 'search_count', 'search'])
+
+_SQL_TYPES = {
+    'many2one': 'INTEGER', 'integer': 'INTEGER', 'boolean': 'INTEGER',
+    'float': 'REAL', 'monetary': 'REAL',
+}
+_X2MANY = ('one2many', 'many2many')
+_NEGATIONS = {
+    '!=': '=', '<>': '=', 'not in': 'in', 'not like': 'like',
+    'not ilike': 'ilike', 'not =like': '=like', 'not =ilike': '=ilike',
+}
+_LIKE = ('like', 'ilike', '=like', '=ilike')
+_COMPARISONS = {'=': '=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+# Primer write_date posible (modelo vacío al hacer la carga inicial)
+_EPOCH = '1970-01-01 00:00:00'
+
+
+class MirrorUnsupported(Exception):
+    """La consulta no puede responderse desde el espejo (se usa Odoo en vivo)."""
+
+
+def mirror_enabled():
+    """ODOO_MIRROR (por defecto false)."""
+    return os.getenv('ODOO_MIRROR', 'false').lower() in ('1', 'true', 'yes')
+
+
+def connection_for(source, live, mirror_connection):
+    """
+    Conexión a usar según el origen de datos pedido.
+
+    Args:
+        source (str): 'live' o 'mirror'; None toma ODOO_DATA_SOURCE (por
+            defecto 'live')
+        live (OdooConnection): Conexión en vivo
+        mirror_connection (MirrorConnection): Conexión al espejo, o None si
+            el espejo no está activo
+
+    Returns:
+        OdooConnection
+    """
+    source = source or os.getenv('ODOO_DATA_SOURCE', 'live')
+    if source == 'mirror':
+        if mirror_connection is not None:
+            return mirror_connection
+        print("[WARN] Espejo de Odoo no activo (ODOO_MIRROR); se consulta en vivo")
+    return live
+
+
+def _table(model):
+    return '"' + model.replace('.', '_') + '"'
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def _is_null(value):
+    return value is False or value is None
+
+
+class OdooMirror:
+    """Copia local de los modelos de MIRRORED_MODELS y su sincronización."""
+
+    def __init__(self, connection, path=None, page_size=None, interval=None, reconcile_interval=None,
+                 lang=None, lock_path=None):
+        """
+        Args:
+            connection (OdooConnection): Conexión en vivo (para sincronizar)
+            path (str, optional): Archivo SQLite (ODOO_MIRROR_PATH, por
+                defecto 'instance/odoo_mirror.sqlite3')
+            page_size (int, optional): Registros por página al sincronizar
+                (ODOO_MIRROR_PAGE_SIZE, por defecto 5000)
+            interval (float, optional): Minutos entre sincronizaciones
+                (ODOO_MIRROR_INTERVAL, por defecto 2)
+            reconcile_interval (float, optional): Minutos entre
+                conciliaciones de ids borrados (ODOO_MIRROR_RECONCILE, por
+                defecto 60)
+            lang (str, optional): Idioma de los nombres many2one
+                (ODOO_MIRROR_LANG, por defecto 'es_PE')
+            lock_path (str, optional): Lock del worker que sincroniza
+                (ODOO_MIRROR_LOCK, por defecto 'instance/odoo_mirror.lock')
+        """
+        self.connection = connection
+        self.path = path or os.getenv('ODOO_MIRROR_PATH', os.path.join('instance', 'odoo_mirror.sqlite3'))
+        self.page_size = int(page_size or os.getenv('ODOO_MIRROR_PAGE_SIZE', 5000))
+        self.interval = float(interval if interval is not None else os.getenv('ODOO_MIRROR_INTERVAL', 2)) * 60
+        self.reconcile_interval = float(reconcile_interval if reconcile_interval is not None
+                                        else os.getenv('ODOO_MIRROR_RECONCILE', 60)) * 60
+        self.lang = lang or os.getenv('ODOO_MIRROR_LANG', 'es_PE')
+        self.lock_path = lock_path or os.getenv('ODOO_MIRROR_LOCK', os.path.join('instance', 'odoo_mirror.lock'))
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._scheduler = None
+        self._db()  # crea el archivo y la tabla de metadatos
+
+    # -- base local ------------------------------------------------------------
+
+    def _db(self):
+        """Conexión SQLite del hilo actual."""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            # LIKE distingue mayúsculas como en PostgreSQL; ilike usa odoo_lower()
+            db.execute('PRAGMA case_sensitive_like=ON')
+            db.create_function('odoo_lower', 1, _lower, deterministic=True)
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS mirror_meta ('
+                ' model TEXT PRIMARY KEY, fields TEXT, loaded INTEGER DEFAULT 0,'
+                ' cursor_write_date TEXT, cursor_id INTEGER DEFAULT 0, rows INTEGER DEFAULT 0,'
+                ' synced_at REAL, sync_seconds REAL, reconciled_at REAL, error TEXT)'
+            )
+            db.commit()
+            self._local.db = db
+        return db
+
+    def _meta(self, model):
+        row = self._db().execute(
+            'SELECT fields, loaded, cursor_write_date, cursor_id, rows, synced_at, sync_seconds,'
+            ' reconciled_at, error FROM mirror_meta WHERE model = ?', (model,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ('fields', 'loaded', 'cursor_write_date', 'cursor_id', 'rows', 'synced_at',
+                'sync_seconds', 'reconciled_at', 'error')
+        meta = dict(zip(keys, row))
+        meta['fields'] = json.loads(meta['fields'] or '{}')
+        return meta
+
+    def _set_meta(self, model, **values):
+        db = self._db()
+        db.execute('INSERT OR IGNORE INTO mirror_meta (model) VALUES (?)', (model,))
+        if 'fields' in values:
+            values['fields'] = json.dumps(values['fields'], sort_keys=True)
+        assignments = ', '.join(f'{key} = ?' for key in values)
+        db.execute(f'UPDATE mirror_meta SET {assignments} WHERE model = ?', (*values.values(), model))
+
+    def is_loaded(self, model=None):
+        """True si el modelo (o todos, sin `model`) ya tiene su carga inicial completa."""
+        models = [model] if model else list(MIRRORED_MODELS)
+        for name in models:
+            meta = self._meta(name)
+            if meta is None or not meta['loaded']:
+                return False
+        return True
+
+    def _fields(self, model):
+        """{campo: [tipo, relación]} del modelo espejado; MirrorUnsupported si no está cargado."""
+        meta = self._meta(model)
+        if meta is None or not meta['loaded']:
+            raise MirrorUnsupported(f'{model} no está cargado en el espejo')
+        return meta['fields']
+
+    # -- sincronización --------------------------------------------------------
+
+    def start(self):
+        """Sincroniza en segundo plano cada ODOO_MIRROR_INTERVAL minutos (un solo worker)."""
+        if self._scheduler is None:
+            self._scheduler = CachePrewarmer({'espejo_odoo': self.sync}, interval=self.interval,
+                                             enabled=['espejo_odoo'], lock_path=self.lock_path)
+            self._scheduler.start()
+
+    def sync(self, reconcile=None):
+        """
+        Una pasada de sincronización de todos los modelos.
+
+        Args:
+            reconcile (bool, optional): Forzar (o evitar) la conciliación de
+                ids; por defecto cada ODOO_MIRROR_RECONCILE minutos
+
+        Returns:
+            dict: {modelo: registros traídos de Odoo en esta pasada}
+        """
+        if not self.connection.is_connected():
+            print("[WARN] Espejo de Odoo: sin conexión, no se sincroniza")
+            return {}
+        pulled = {}
+        with self._sync_lock:
+            for model, spec in MIRRORED_MODELS.items():
+                start = time.perf_counter()
+                try:
+                    pulled[model] = self._sync_model(model, spec, reconcile)
+                    self._set_meta(model, synced_at=time.time(), sync_seconds=time.perf_counter() - start,
+                                   error=None, rows=self._count(model))
+                except Exception as e:
+                    print(f"[ERROR] Espejo de Odoo: sincronización de {model} falló: {e}")
+                    self._set_meta(model, error=str(e))
+                self._db().commit()
+        changed = {m: n for m, n in pulled.items() if n}
+        if changed:
+            print("[OK] Espejo de Odoo sincronizado: " + ", ".join(f"{m} {n}" for m, n in changed.items()))
+        return pulled
+
+    def _count(self, model):
+        return self._db().execute(f'SELECT COUNT(*) FROM {_table(model)}').fetchone()[0]
+
+    def _remote_fields(self, model, spec):
+        """Tipos de los campos del spec según fields_get (los que no existen se omiten)."""
+        described = self.connection._call(model, 'fields_get', [], {'attributes': ['type', 'relation']})
+        fields = {}
+        for name in spec['fields']:
+            info = described.get(name)
+            if info is None:
+                print(f"[WARN] Espejo de Odoo: {model}.{name} no existe en Odoo, se omite")
+                continue
+            fields[name] = [info.get('type', 'char'), info.get('relation')]
+        return fields
+
+    def _create_table(self, model, fields, spec):
+        db = self._db()
+        table = _table(model)
+        columns = ['id INTEGER PRIMARY KEY']
+        for name, (ftype, _) in fields.items():
+            columns.append(f'"{name}" {_SQL_TYPES.get(ftype, "TEXT")}')
+            if ftype == 'many2one':
+                columns.append(f'"{name}__name" TEXT')
+        db.execute(f'DROP TABLE IF EXISTS {table}')
+        db.execute(f'CREATE TABLE {table} ({", ".join(columns)})')
+        for index in spec['indexes']:
+            names = [c.strip() for c in index.split(',')]
+            if all(name in fields for name in names):
+                index_name = f'"ix_{model.replace(".", "_")}_{"_".join(names)}"'
+                db.execute(f'CREATE INDEX {index_name} ON {table} ({", ".join(chr(34) + n + chr(34) for n in names)})')
+        self._set_meta(model, fields=fields, loaded=0, cursor_write_date=None, cursor_id=0,
+                       rows=0, reconciled_at=None)
+        db.commit()
+
+    def _sync_model(self, model, spec, reconcile):
+        fields = self._remote_fields(model, spec)
+        meta = self._meta(model)
+        if meta is None or meta['fields'] != fields:
+            if meta is not None:
+                print(f"[INFO] Espejo de Odoo: cambiaron los campos de {model}, se recarga")
+            self._create_table(model, fields, spec)
+            meta = self._meta(model)
+
+        if not spec['incremental']:
+            return self._full_reload(model, fields)
+        if not meta['loaded']:
+            pulled = self._initial_load(model, fields, meta)
+        else:
+            pulled = self._pull_changes(model, fields, meta)
+        if reconcile or (reconcile is None and time.time() - (meta['reconciled_at'] or 0) >= self.reconcile_interval):
+            pulled += self._reconcile(model, fields)
+        return pulled
+
+    def _context(self):
+        return {'lang': self.lang} if self.lang else None
+
+    def _full_reload(self, model, fields):
+        records = list(self.connection.iter_search_read(model, [], list(fields), self.page_size,
+                                                        context=self._context()))
+        db = self._db()
+        db.execute(f'DELETE FROM {_table(model)}')
+        self._upsert(model, fields, records)
+        self._set_meta(model, loaded=1)
+        return len(records)
+
+    def _initial_load(self, model, fields, meta):
+        """Carga completa por id; se retoma desde cursor_id si se interrumpió."""
+        db = self._db()
+        if meta['cursor_write_date'] is None:
+            # Todo lo modificado desde este write_date se vuelve a traer al terminar
+            last = self.connection._call(model, 'search_read', [[]],
+                                         {'fields': ['write_date'], 'order': 'write_date desc', 'limit': 1})
+            start_write_date = (last[0]['write_date'] if last else None) or _EPOCH
+            self._set_meta(model, cursor_write_date=start_write_date, cursor_id=0)
+            db.commit()
+            meta = self._meta(model)
+        print(f"[INFO] Espejo de Odoo: carga inicial de {model} desde id {meta['cursor_id']}")
+
+        pulled = 0
+        last_id = meta['cursor_id'] or 0
+        while True:
+            options = {'fields': list(fields), 'limit': self.page_size, 'order': 'id'}
+            if self._context():
+                options['context'] = self._context()
+            page = self.connection._call(model, 'search_read', [[('id', '>', last_id)]], options)
+            if not page:
+                break
+            self._upsert(model, fields, page)
+            last_id = page[-1]['id']
+            pulled += len(page)
+            self._set_meta(model, cursor_id=last_id)
+            db.commit()
+            if len(page) < self.page_size:
+                break
+        self._set_meta(model, loaded=1, cursor_id=0, reconciled_at=time.time())
+        db.commit()
+        print(f"[OK] Espejo de Odoo: {model} cargado ({pulled} registros)")
+        return pulled
+
+    def _pull_changes(self, model, fields, meta):
+        """Registros con (write_date, id) posterior al cursor, en orden."""
+        db = self._db()
+        write_date, last_id = meta['cursor_write_date'] or _EPOCH, meta['cursor_id'] or 0
+        pulled = 0
+        while True:
+            domain = ['|', ('write_date', '>', write_date), '&', ('write_date', '=', write_date), ('id', '>', last_id)]
+            options = {'fields': list(fields), 'limit': self.page_size, 'order': 'write_date, id'}
+            if self._context():
+                options['context'] = self._context()
+            page = self.connection._call(model, 'search_read', [domain], options)
+            if not page:
+                break
+            self._upsert(model, fields, page)
+            write_date, last_id = page[-1]['write_date'], page[-1]['id']
+            pulled += len(page)
+            self._set_meta(model, cursor_write_date=write_date, cursor_id=last_id)
+            db.commit()
+            if len(page) < self.page_size:
+                break
+        return pulled
+
+    def _reconcile(self, model, fields, chunk=100000):
+        """
+        Compara los ids locales con los de Odoo por tramos: borra los que ya
+        no existen y trae los que faltan.
+
+        Returns:
+            int: Registros traídos
+        """
+        db = self._db()
+        table = _table(model)
+        last_id = 0
+        deleted = fetched = 0
+        while True:
+            remote = self.connection._call(model, 'search', [[('id', '>', last_id)]], {'order': 'id', 'limit': chunk})
+            upper = remote[-1] if len(remote) == chunk else None
+            if upper is None:
+                local = db.execute(f'SELECT id FROM {table} WHERE id > ?', (last_id,)).fetchall()
+            else:
+                local = db.execute(f'SELECT id FROM {table} WHERE id > ? AND id <= ?', (last_id, upper)).fetchall()
+            local = {row[0] for row in local}
+            remote_set = set(remote)
+            gone = local - remote_set
+            if gone:
+                db.executemany(f'DELETE FROM {table} WHERE id = ?', [(i,) for i in gone])
+                deleted += len(gone)
+            missing = sorted(remote_set - local)
+            for start in range(0, len(missing), self.page_size):
+                options = {'fields': list(fields)}
+                if self._context():
+                    options['context'] = self._context()
+                records = self.connection._call(model, 'read', [missing[start:start + self.page_size]], options)
+                self._upsert(model, fields, records)
+                fetched += len(records)
+            db.commit()
+            if upper is None:
+                break
+            last_id = upper
+        self._set_meta(model, reconciled_at=time.time())
+        db.commit()
+        if deleted or fetched:
+            print(f"[INFO] Espejo de Odoo: conciliación de {model}: {deleted} borrados, {fetched} recuperados")
+        return fetched
+
+    def _upsert(self, model, fields, records):
+        if not records:
+            return
+        columns = ['id']
+        for name, (ftype, _) in fields.items():
+            columns.append(f'"{name}"')
+            if ftype == 'many2one':
+                columns.append(f'"{name}__name"')
+        rows = []
+        items = list(fields.items())
+        for record in records:
+            row = [record['id']]
+            for name, (ftype, _) in items:
+                value = record.get(name)
+                if ftype == 'many2one':
+                    row.extend(value[:2] if value else (None, None))
+                elif ftype in _X2MANY:
+                    row.append(json.dumps(value or []))
+                elif ftype == 'boolean':
+                    row.append(1 if value else 0)
+                else:
+                    row.append(None if _is_null(value) else value)
+            rows.append(row)
+        placeholders = ', '.join('?' * len(columns))
+        self._db().executemany(
+            f'INSERT OR REPLACE INTO {_table(model)} ({", ".join(columns)}) VALUES ({placeholders})', rows
+        )
+
+    # -- consultas -------------------------------------------------------------
+
+    def execute(self, model, method, args, kwargs):
+        """
+        Equivalente local de execute_kw para MIRROR_METHODS.
+
+        Raises:
+            MirrorUnsupported: Si el dominio, el orden o los campos no se
+                pueden resolver con el espejo
+        """
+        def arg(index, name, default=None):
+            if name in kwargs:
+                return kwargs[name]
+            return args[index] if len(args) > index else default
+
+        if method == 'read':
+            ids = arg(0, 'ids', [])
+            return self.read(model, [ids] if isinstance(ids, int) else list(ids), arg(1, 'fields'))
+        if method == 'search_count':
+            return self.search_count(model, arg(0, 'domain', []))
+        if method == 'search':
+            return self.search(model, arg(0, 'domain', []), arg(1, 'offset', 0), arg(2, 'limit'), arg(3, 'order'))
+        if method == 'search_read':
+            return self.search_read(model, arg(0, 'domain', []), arg(1, 'fields'), arg(2, 'offset', 0),
+                                    arg(3, 'limit'), arg(4, 'order'))
+        raise MirrorUnsupported(f'método {method}')
+
+    def search_read(self, model, domain, fields=None, offset=0, limit=None, order=None):
+        types = self._fields(model)
+        names, columns, converters = self._select(model, types, fields)
+        where, params = self._where(model, domain)
+        sql = f'SELECT {", ".join(columns)} FROM {_table(model)} WHERE {where}' \
+              f' ORDER BY {self._order(types, order)}{self._limit(offset, limit)}'
+        return [self._record(names, converters, row) for row in self._db().execute(sql, params)]
+
+    def search(self, model, domain, offset=0, limit=None, order=None):
+        types = self._fields(model)
+        where, params = self._where(model, domain)
+        sql = f'SELECT id FROM {_table(model)} WHERE {where} ORDER BY {self._order(types, order)}{self._limit(offset, limit)}'
+        return [row[0] for row in self._db().execute(sql, params)]
+
+    def search_count(self, model, domain):
+        self._fields(model)
+        where, params = self._where(model, domain)
+        return self._db().execute(f'SELECT COUNT(*) FROM {_table(model)} WHERE {where}', params).fetchone()[0]
+
+    def read(self, model, ids, fields=None):
+        """Registros de `ids` en el orden pedido (los inexistentes se omiten)."""
+        types = self._fields(model)
+        names, columns, converters = self._select(model, types, fields)
+        found = {}
+        db = self._db()
+        ids = [i for i in ids if isinstance(i, int)]
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            sql = f'SELECT {", ".join(columns)} FROM {_table(model)} WHERE id IN ({", ".join("?" * len(chunk))})'
+            for row in db.execute(sql, chunk):
+                record = self._record(names, converters, row)
+                found[record['id']] = record
+        return [found[i] for i in dict.fromkeys(ids) if i in found]
+
+    @staticmethod
+    def _limit(offset, limit):
+        if limit:
+            return f' LIMIT {int(limit)} OFFSET {int(offset or 0)}'
+        if offset:
+            return f' LIMIT -1 OFFSET {int(offset)}'
+        return ''
+
+    @staticmethod
+    def _select(model, types, fields):
+        names = ['id'] + [f for f in (fields or list(types)) if f != 'id']
+        names = list(dict.fromkeys(names))
+        columns, converters = [], []
+        for name in names:
+            if name == 'id':
+                columns.append('id')
+                converters.append(None)
+                continue
+            if name not in types:
+                raise MirrorUnsupported(f'{model}.{name} no está espejado')
+            ftype = types[name][0]
+            columns.append(f'"{name}"')
+            if ftype == 'many2one':
+                columns.append(f'"{name}__name"')
+            converters.append(ftype)
+        return names, columns, converters
+
+    @staticmethod
+    def _record(names, converters, row):
+        record = {}
+        i = 0
+        for name, ftype in zip(names, converters):
+            value = row[i]
+            i += 1
+            if ftype == 'many2one':
+                record[name] = [value, row[i]] if value else False
+                i += 1
+            elif ftype in _X2MANY:
+                record[name] = json.loads(value) if value else []
+            elif ftype == 'boolean':
+                record[name] = bool(value)
+            elif value is None and ftype not in ('integer', 'float', 'monetary'):
+                record[name] = False
+            else:
+                record[name] = value
+        return record
+
+    @staticmethod
+    def _order(types, order):
+        terms = []
+        for term in (order or 'id').split(','):
+            parts = term.split()
+            if not parts:
+                continue
+            name = parts[0]
+            direction = parts[1].upper() if len(parts) > 1 else 'ASC'
+            if direction not in ('ASC', 'DESC') or (name != 'id' and name not in types):
+                raise MirrorUnsupported(f'orden {order!r}')
+            ftype = 'integer' if name == 'id' else types[name][0]
+            if ftype in _X2MANY:
+                raise MirrorUnsupported(f'orden por {name}')
+            column = f'"{name}__name"' if ftype == 'many2one' else f'"{name}"'
+            # Como PostgreSQL: NULL al final en ascendente, al principio en descendente
+            nulls = 'NULLS LAST' if direction == 'ASC' else 'NULLS FIRST'
+            terms.append(f'{column} {direction} {nulls}')
+        if not any(t.startswith('"id"') for t in terms):
+            terms.append('"id" ASC')
+        return ', '.join(terms)
+
+    def _where(self, model, domain):
+        """Dominio de Odoo (prefijo con '&', '|', '!') a (SQL, parámetros)."""
+        stack = []
+        for item in reversed(list(domain or [])):
+            if item == '!':
+                sql, params = stack.pop()
+                stack.append((f'(NOT {sql})', params))
+            elif item in ('&', '|'):
+                (a, pa), (b, pb) = stack.pop(), stack.pop()
+                stack.append((f'({a} {"AND" if item == "&" else "OR"} {b})', pa + pb))
+            elif isinstance(item, (list, tuple)) and len(item) == 3:
+                path, op, value = item
+                if not isinstance(path, str):
+                    # TRUE_LEAF / FALSE_LEAF
+                    stack.append(('1' if path == value else '0', []))
+                else:
+                    stack.append(self._leaf(model, path, str(op).lower(), value))
+            else:
+                raise MirrorUnsupported(f'término de dominio {item!r}')
+        if not stack:
+            return '1', []
+        parts = list(reversed(stack))
+        return ' AND '.join(sql for sql, _ in parts), [p for _, params in parts for p in params]
+
+    def _leaf(self, model, path, op, value):
+        head, _, rest = path.partition('.')
+        if head == 'id':
+            ftype, relation = 'integer', None
+        else:
+            types = self._fields(model)
+            if head not in types:
+                raise MirrorUnsupported(f'{model}.{head} no está espejado')
+            ftype, relation = types[head]
+
+        if rest:
+            if ftype != 'many2one' or relation not in MIRRORED_MODELS:
+                raise MirrorUnsupported(f'ruta {model}.{path}')
+            # Igual que Odoo con many2one: el operador se aplica en el comodelo
+            sql, params = self._leaf(relation, rest, op, value)
+            return f'"{head}" IN (SELECT id FROM {_table(relation)} WHERE {sql})', params
+        if ftype in _X2MANY:
+            raise MirrorUnsupported(f'dominio sobre {model}.{head} ({ftype})')
+        if ftype == 'many2one' and isinstance(value, str) and op not in ('in', 'not in'):
+            # Búsqueda por nombre del registro relacionado
+            return self._compare(f'"{head}__name"', 'char', op, value)
+        return self._compare(f'"{head}"', ftype, op, value)
+
+    @staticmethod
+    def _compare(column, ftype, op, value):
+        if ftype == 'boolean':
+            if op in ('in', 'not in'):
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                value = [1 if v else 0 for v in values]
+            elif op in _COMPARISONS or op in ('!=', '<>'):
+                value = 1 if value else 0
+
+        if op in ('=', '!=', '<>') and _is_null(value):
+            return (f'{column} IS NULL' if op == '=' else f'{column} IS NOT NULL'), []
+
+        if op in ('in', 'not in'):
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            has_null = any(_is_null(v) for v in values)
+            values = [v for v in values if not _is_null(v)]
+            parts = []
+            if values:
+                parts.append(f'{column} IN ({", ".join("?" * len(values))})')
+            if has_null:
+                parts.append(f'{column} IS NULL')
+            positive = f'({" OR ".join(parts)})' if parts else '0'
+            if op == 'in':
+                return positive, values
+            # not in: los NULL quedan incluidos salvo que la lista tenga False
+            return (f'(NOT {positive})' if has_null else f'({column} IS NULL OR NOT {positive})'), values
+
+        positive_op = _NEGATIONS.get(op, op)
+        if positive_op in _LIKE:
+            pattern = str(value)
+            if positive_op in ('like', 'ilike'):
+                pattern = f'%{pattern}%'
+            if positive_op in ('ilike', '=ilike'):
+                sql = f"odoo_lower({column}) LIKE odoo_lower(?) ESCAPE '\\'"
+            else:
+                sql = f"{column} LIKE ? ESCAPE '\\'"
+            if positive_op != op:
+                return f'({column} IS NULL OR NOT ({sql}))', [pattern]
+            return sql, [pattern]
+
+        if op in ('!=', '<>'):
+            return f'({column} IS NULL OR {column} != ?)', [value]
+        if op in _COMPARISONS:
+            return f'{column} {_COMPARISONS[op]} ?', [value]
+        raise MirrorUnsupported(f'operador {op!r}')
+
+    # -- estado ------------------------------------------------------------------
+
+    def status(self):
+        """
+        Returns:
+            dict: Por modelo: registros, carga completa, cursor y última sincronización
+        """
+        models = {}
+        for model in MIRRORED_MODELS:
+            meta = self._meta(model)
+            if meta is None:
+                models[model] = {'loaded': False}
+                continue
+            models[model] = {
+                'loaded': bool(meta['loaded']),
+                'rows': meta['rows'],
+                'cursor': [meta['cursor_write_date'], meta['cursor_id']],
+                'synced_at': meta['synced_at'],
+                'age_seconds': round(time.time() - meta['synced_at'], 1) if meta['synced_at'] else None,
+                'sync_seconds': round(meta['sync_seconds'], 3) if meta['sync_seconds'] else None,
+                'reconciled_at': meta['reconciled_at'],
+                'error': meta['error'],
+            }
+        return {
+            'path': self.path,
+            'interval_seconds': self.interval,
+            'syncing_here': bool(self._scheduler and self._scheduler.is_leader),
+            'models': models,
+        }
+
+
+class MirrorServerProxy:
+    """
+    Envoltorio de `models` que responde las lecturas de los modelos
+    espejados desde SQLite y deja pasar el resto a Odoo.
+    """
+
+    def __init__(self, mirror, live_proxy):
+        self._mirror = mirror
+        self._live = live_proxy
+        self._reported = set()
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        if model in MIRRORED_MODELS and method in MIRROR_METHODS:
+            try:
+                return self._mirror.execute(model, method, list(args or []), dict(kwargs or {}))
+            except MirrorUnsupported as e:
+                reason = (model, method, str(e))
+                if reason not in self._reported:
+                    self._reported.add(reason)
+                    print(f"[INFO] Espejo de Odoo: {model}.{method} va en vivo ({e})")
+        if self._live is None:
+            raise ConnectionError(f"Sin conexión a Odoo para {model}.{method}")
+        return self._live.execute_kw(db, uid, password, model, method, args, kwargs or {})
+
+    def __getattr__(self, name):
+        return getattr(self._live, name)
+
+
+class MirrorConnection(OdooConnection):
+    """
+    OdooConnection que lee los modelos espejados desde SQLite.
+
+    No abre una sesión nueva: comparte credenciales, pool y coalescencia de
+    la conexión en vivo, así que todos sus métodos (paginación incluida)
+    funcionan igual.
+    """
+
+    def __init__(self, live, mirror):
+        self.live = live
+        self.mirror = mirror
+        self.pool = live.pool
+        self.flight = live.flight
+        self.url = live.url
+        self.db = live.db
+        self.username = live.username
+        self.password = live.password
+        self.uid = live.uid
+        self.models = MirrorServerProxy(mirror, live.models)
+
+    def is_connected(self):
+        return self.live.is_connected() or self.mirror.is_loaded()
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Transporte XML-RPC persistente y pool de conexiones a Odoo.
+
+`xmlrpc.client.ServerProxy` no es thread-safe: compartir una sola instancia
+entre los hilos de Flask/gunicorn corrompe respuestas. Este módulo mantiene
+un pool de proxies, cada uno con su propio transporte HTTP/1.1 keep-alive,
+que se prestan (checkout) y devuelven por llamada.
+"""
+
+import os
+import queue
+import select
+import threading
+import time
+import xmlrpc.client
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from . import xmlrpc_fast
+
+
+# Bytes enviados/recibidos por la última llamada de cada hilo (para métricas)
+_io_stats = threading.local()
+
+
+def last_call_bytes():
+    """
+    Returns:
+        tuple: (bytes_enviados, bytes_recibidos) de la última llamada XML-RPC
+            hecha por el hilo actual
+    """
+    return getattr(_io_stats, 'sent', 0), getattr(_io_stats, 'received', 0)
+
+
+def reset_call_bytes():
+    """Pone en cero los contadores de bytes del hilo actual."""
+    _io_stats.sent = 0
+    _io_stats.received = 0
+
+
+class _CountingResponse:
+    """Envoltorio de la respuesta HTTP que cuenta los bytes leídos."""
+
+    def __init__(self, response):
+        self._response = response
+        self.bytes_read = 0
+
+    def read(self, *args):
+        data = self._response.read(*args)
+        self.bytes_read += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class _KeepAliveMixin:
+    """
+    Agrega timeout de socket y chequeo de salud al transporte estándar.
+
+    El transporte de la librería estándar ya reutiliza la conexión HTTP/1.1
+    mientras el servidor no la cierre; aquí solo se controla cuándo
+    descartarla.
+    """
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timeout = timeout
+        self.last_used = time.monotonic()
+        self.fast_decoding = xmlrpc_fast.fast_decoding_enabled()
+
+    def make_connection(self, host):
+        conn = super().make_connection(host)
+        if self.timeout is not None:
+            conn.timeout = self.timeout
+        return conn
+
+    def request(self, host, handler, request_body, verbose=False):
+        _io_stats.sent = len(request_body or b'')
+        try:
+            return super().request(host, handler, request_body, verbose)
+        finally:
+            self.last_used = time.monotonic()
+
+    def parse_response(self, response):
+        counting = _CountingResponse(response)
+        try:
+            if not self.fast_decoding or self.verbose:
+                return super().parse_response(counting)
+            # Cuerpo completo de una vez (el estándar lee de a 1 KB) y decodificación rápida
+            if counting.getheader('Content-Encoding', '') == 'gzip':
+                stream = xmlrpc.client.GzipDecodedResponse(counting)
+                try:
+                    body = stream.read()
+                finally:
+                    stream.close()
+            else:
+                body = counting.read()
+            return xmlrpc_fast.loads(body, self._use_datetime, self._use_builtin_types)
+        finally:
+            _io_stats.received = counting.bytes_read
+
+    def is_healthy(self, max_idle):
+        """
+        Verifica si la conexión persistente puede reutilizarse.
+
+        Una conexión ociosa por más de `max_idle` segundos, o cuyo socket
+        quedó legible (el servidor envió EOF), se cierra para que la próxima
+        llamada abra una nueva.
+
+        Args:
+            max_idle (float): Segundos máximos de inactividad
+
+        Returns:
+            bool: True si la conexión existente sigue siendo usable
+        """
+        conn = self._connection[1] if self._connection else None
+        sock = getattr(conn, 'sock', None)
+        if sock is None:
+            return True
+
+        if time.monotonic() - self.last_used > max_idle:
+            self.close()
+            return False
+
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            readable = True
+        if readable:
+            self.close()
+            return False
+        return True
+
+
+class KeepAliveTransport(_KeepAliveMixin, xmlrpc.client.Transport):
+    """Transporte HTTP persistente."""
+
+
+class KeepAliveSafeTransport(_KeepAliveMixin, xmlrpc.client.SafeTransport):
+    """Transporte HTTPS persistente."""
+
+
+class _PoolSlot:
+    """Un proxy del pool junto con su transporte."""
+
+    def __init__(self, endpoint, timeout):
+        transport_cls = KeepAliveSafeTransport if urlparse(endpoint).scheme == 'https' else KeepAliveTransport
+        self.transport = transport_cls(timeout=timeout)
+        self.proxy = xmlrpc.client.ServerProxy(endpoint, transport=self.transport)
+
+
+class OdooConnectionPool:
+    """
+    Pool de conexiones XML-RPC persistentes hacia un endpoint de Odoo.
+
+    Los slots se crean de forma perezosa hasta `size`; si todos están en uso
+    el hilo espera hasta `wait_timeout` segundos a que se libere uno.
+    """
+
+    def __init__(self, endpoint, size=None, timeout=None, max_idle=None, wait_timeout=None):
+        """
+        Args:
+            endpoint (str): URL completa (ej: 'https://odoo/xmlrpc/2/object')
+            size (int, optional): Conexiones máximas (ODOO_POOL_SIZE, por defecto 4)
+            timeout (float, optional): Timeout de socket en segundos (ODOO_TIMEOUT)
+            max_idle (float, optional): Inactividad máxima antes de reconectar (ODOO_POOL_MAX_IDLE)
+            wait_timeout (float, optional): Espera máxima por un slot libre (ODOO_POOL_WAIT)
+        """
+        self.endpoint = endpoint
+        self.size = max(1, int(size or os.getenv('ODOO_POOL_SIZE', 4)))
+        env_timeout = os.getenv('ODOO_TIMEOUT')
+        self.timeout = timeout if timeout is not None else (float(env_timeout) if env_timeout else None)
+        self.max_idle = float(max_idle if max_idle is not None else os.getenv('ODOO_POOL_MAX_IDLE', 30))
+        self.wait_timeout = float(wait_timeout if wait_timeout is not None else os.getenv('ODOO_POOL_WAIT', 60))
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+
+    def _acquire(self):
+        try:
+            slot = self._idle.get_nowait()
+        except queue.Empty:
+            slot = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    try:
+                        slot = _PoolSlot(self.endpoint, self.timeout)
+                    except Exception:
+                        # El slot no llegó a crearse: su lugar vuelve a quedar libre
+                        self._created -= 1
+                        raise
+            if slot is None:
+                try:
+                    slot = self._idle.get(timeout=self.wait_timeout)
+                except queue.Empty:
+                    raise TimeoutError(
+                        f"Pool de conexiones Odoo agotado ({self.size} en uso por más de {self.wait_timeout}s)"
+                    )
+
+        slot.transport.is_healthy(self.max_idle)
+        with self._lock:
+            self._in_use += 1
+        return slot
+
+    def _release(self, slot):
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(slot)
+
+    @contextmanager
+    def connection(self):
+        """
+        Presta un `ServerProxy` exclusivo del pool.
+
+        Si la llamada falla por un error de transporte la conexión se cierra
+        antes de devolverla; un `xmlrpc.client.Fault` (error de negocio de
+        Odoo) no invalida la conexión.
+
+        Yields:
+            xmlrpc.client.ServerProxy: Proxy para uso exclusivo del hilo actual
+        """
+        slot = self._acquire()
+        try:
+            yield slot.proxy
+        except xmlrpc.client.Fault:
+            raise
+        except Exception:
+            slot.transport.close()
+            raise
+        finally:
+            self._release(slot)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Tamaño, conexiones creadas, en uso y ociosas
+        """
+        with self._lock:
+            return {
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+            }
+
+    def close(self):
+        """Cierra todas las conexiones ociosas del pool."""
+        while True:
+            try:
+                slot = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            slot.transport.close()
+            with self._lock:
+                self._created -= 1
+
+
+class PooledServerProxy:
+    """
+    Sustituto thread-safe de `ServerProxy` respaldado por un pool.
+
+    Cada llamada (ej: `execute_kw(...)`) toma un proxy del pool, lo usa y lo
+    devuelve, por lo que una misma instancia puede compartirse entre hilos.
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def _call(*args):
+            with self._pool.connection() as proxy:
+                return getattr(proxy, name)(*args)
+
+        _call.__name__ = name
+        return _call
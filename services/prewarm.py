@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-calentado de cachés en segundo plano.
+
+Un hilo del proceso refresca cada cierto tiempo los datos más pedidos
+(ventas del mes en curso, KPIs de cobranza, reporte CxC) antes de que
+lleguen los usuarios. Con varios workers de gunicorn solo uno hace el
+trabajo: el que consigue el lock de archivo (líder). Los resultados se
+guardan en disco (SharedResultStore) para que todos los workers los lean.
+"""
+
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _try_lock(fh):
+    """Intenta tomar un lock exclusivo sin bloquear. Returns: bool"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class SharedResultStore:
+    """
+    Resultados compartidos entre workers mediante archivos pickle.
+
+    Cada worker recuerda en memoria el último archivo leído y solo lo
+    vuelve a deserializar si cambió su fecha de modificación.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Args:
+            directory (str, optional): Carpeta de resultados (PREWARM_DIR,
+                por defecto 'instance/warm')
+        """
+        self.directory = directory or os.getenv('PREWARM_DIR', os.path.join('instance', 'warm'))
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, key):
+        safe = ''.join(c if c.isalnum() or c in '-_' else '_' for c in key)
+        return os.path.join(self.directory, f'{safe}.pkl')
+
+    def put(self, key, value):
+        """Guarda un resultado de forma atómica."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path_for(key))
+        except Exception as e:
+            print(f"[WARN] No se pudo guardar el resultado pre-calentado {key}: {e}")
+
+    def get(self, key, max_age):
+        """
+        Devuelve un resultado si existe y tiene menos de `max_age` segundos.
+
+        Returns:
+            Valor guardado, o None si no hay uno vigente
+        """
+        path = self.path_for(key)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        if time.time() - mtime > max_age:
+            return None
+
+        with self._lock:
+            cached = self._memory.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(path, 'rb') as fh:
+                value = pickle.load(fh)
+        except Exception as e:
+            print(f"[WARN] Resultado pre-calentado {key} ilegible: {e}")
+            return None
+        with self._lock:
+            self._memory[key] = (mtime, value)
+        return value
+
+
+class CachePrewarmer:
+    """
+    Planificador que ejecuta periódicamente las tareas de pre-calentado.
+
+    Solo el worker que tiene el lock de archivo ejecuta las tareas; los
+    demás reintentan tomarlo en cada ciclo, así otro worker asume si el
+    líder se detiene.
+    """
+
+    def __init__(self, datasets, interval=None, enabled=None, lock_path=None):
+        """
+        Args:
+            datasets (dict): {nombre: función sin argumentos que refresca el dato}
+            interval (float, optional): Segundos entre refrescos
+                (PREWARM_INTERVAL en minutos, por defecto 10)
+            enabled (list, optional): Nombres de datasets a refrescar
+                (PREWARM_DATASETS separado por comas, por defecto todos)
+            lock_path (str, optional): Archivo de lock (PREWARM_LOCK, por
+                defecto 'instance/prewarm.lock')
+        """
+        self.datasets = datasets
+        self.interval = float(interval if interval is not None else float(os.getenv('PREWARM_INTERVAL', 10)) * 60)
+        if enabled is None:
+            names = os.getenv('PREWARM_DATASETS', '').strip()
+            enabled = [n.strip() for n in names.split(',') if n.strip()] if names else list(datasets)
+        unknown = [n for n in enabled if n not in datasets]
+        if unknown:
+            print(f"[WARN] Datasets de pre-calentado desconocidos: {unknown}")
+        self.enabled = [n for n in enabled if n in datasets]
+        self.lock_path = lock_path or os.getenv('PREWARM_LOCK', os.path.join('instance', 'prewarm.lock'))
+        self.is_leader = False
+        self.last_run = {}
+        self._lock_file = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _acquire_leadership(self):
+        if self.is_leader:
+            return True
+        try:
+            os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+            fh = open(self.lock_path, 'a+')
+        except OSError as e:
+            print(f"[WARN] No se pudo abrir el lock de pre-calentado: {e}")
+            return False
+        if _try_lock(fh):
+            self._lock_file = fh
+            self.is_leader = True
+            print(f"[INFO] Pre-calentado: este proceso (pid {os.getpid()}) es el líder")
+            return True
+        fh.close()
+        return False
+
+    def run_once(self):
+        """Refresca todos los datasets habilitados (sin verificar liderazgo)."""
+        for name in self.enabled:
+            if self._stop.is_set():
+                break
+            start = time.perf_counter()
+            try:
+                self.datasets[name]()
+                elapsed = time.perf_counter() - start
+                self.last_run[name] = {'at': time.time(), 'seconds': elapsed, 'error': None}
+                print(f"[OK] Pre-calentado '{name}' en {elapsed:.2f}s")
+            except Exception as e:
+                self.last_run[name] = {'at': time.time(), 'seconds': time.perf_counter() - start, 'error': str(e)}
+                print(f"[ERROR] Pre-calentado '{name}' falló: {e}")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if self._acquire_leadership():
+                self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Inicia el hilo de pre-calentado (una sola vez por proceso)."""
+        if self._thread is not None or not self.enabled:
+            return
+        self._thread = threading.Thread(target=self._loop, name='cache-prewarmer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            self.is_leader = False
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+Cuentas por cobrar a una fecha pasada (as-of) desde el espejo local.
+
+Odoo solo guarda el residual actual de cada línea; el residual a una fecha
+D se reconstruye como
+
+    residual(D) = balance - Σ conciliaciones parciales con max_date <= D
+
+sobre las líneas por cobrar publicadas con fecha <= D (cuentas 12x/13x).
+Cada conciliación descuenta su `amount` del lado deudor y lo suma al lado
+acreedor, así que facturas, notas de crédito y pagos sin aplicar salen con
+el signo correcto.
+
+Las líneas por cobrar y las conciliaciones se cargan una vez del espejo a
+arreglos numpy, con las conciliaciones ordenadas por max_date: cada fecha
+es una búsqueda binaria más un bincount del prefijo (milisegundos), así que
+una serie de 24 meses cuesta lo mismo que una sola fecha. Los arreglos se
+recargan cuando el espejo trae cambios.
+"""
+
+import os
+import threading
+from datetime import date, datetime
+
+import numpy as np
+
+from utils.calculators import calcular_dso
+from .odoo_mirror import MirrorUnsupported
+
+
+MONTH_LABELS = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+AGING_KEYS = ('vigente', '1-30', '31-60', '61-90', '+90')
+# Límites superiores de días vencidos de cada bucket (ver get_aging_bucket_key)
+_AGING_EDGES = np.array([0, 30, 60, 90])
+_MODELS = ('account.move', 'account.move.line', 'account.partial.reconcile', 'account.account')
+
+
+def _to_days(values):
+    """Fechas 'YYYY-MM-DD' (o None) a días desde 1970; NaT queda como el mínimo int64."""
+    return np.array([v or 'NaT' for v in values], dtype='datetime64[D]').astype(np.int64)
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def month_ends(months, end):
+    """
+    Meses que terminan en el mes de `end`.
+
+    Args:
+        months (int): Cantidad de meses
+        end (date): Último día (el mes en curso cierra en esa fecha)
+
+    Returns:
+        list: [(primer día, último día)] del más antiguo al más reciente
+    """
+    ends = []
+    year, month = end.year, end.month
+    for _ in range(months):
+        ends.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    out = []
+    for first in reversed(ends):
+        following = date(first.year + (first.month == 12), first.month % 12 + 1, 1)
+        out.append((first, min(end, date.fromordinal(following.toordinal() - 1))))
+    return out
+
+
+def receivable_account_prefixes():
+    """Prefijos de las cuentas por cobrar (ASOF_ACCOUNT_PREFIXES, por defecto '12,13')."""
+    return tuple(p.strip() for p in os.getenv('ASOF_ACCOUNT_PREFIXES', '12,13').split(',') if p.strip())
+
+
+def month_label(first):
+    """Etiqueta corta de un mes ('Ene 26')."""
+    return f"{MONTH_LABELS[first.month - 1]} {first.year % 100:02d}"
+
+
+class ReceivablesAsOf:
+    """Residual y aging por cliente a cualquier fecha, sin consultar Odoo."""
+
+    def __init__(self, mirror, account_prefixes=None):
+        """
+        Args:
+            mirror (OdooMirror): Espejo con account.move.line y
+                account.partial.reconcile cargados
+            account_prefixes (list, optional): Prefijos de las cuentas por
+                cobrar (ASOF_ACCOUNT_PREFIXES, por defecto '12,13')
+        """
+        self.mirror = mirror
+        self.account_prefixes = tuple(account_prefixes or receivable_account_prefixes())
+        self._lock = threading.Lock()
+        self._version = None
+        self._data = None
+
+    def is_available(self):
+        """True si el espejo tiene cargados los modelos que necesita la reconstrucción."""
+        return all(self.mirror.is_loaded(model) for model in _MODELS)
+
+    # -- carga ------------------------------------------------------------------
+
+    def _current_version(self):
+        """Huella del estado del espejo: cambia cuando una sincronización trae o borra registros."""
+        version = []
+        for model in _MODELS:
+            meta = self.mirror._meta(model) or {}
+            version.append((meta.get('rows'), meta.get('cursor_write_date'), meta.get('cursor_id'),
+                            meta.get('reconciled_at')))
+        return tuple(version)
+
+    def _arrays(self):
+        """Arreglos de líneas y conciliaciones, recargados si el espejo cambió."""
+        if not self.is_available():
+            raise MirrorUnsupported('el espejo no tiene cargadas las líneas y conciliaciones')
+        version = self._current_version()
+        with self._lock:
+            if self._data is None or version != self._version:
+                self._data = self._load()
+                self._version = version
+            return self._data
+
+    def _load(self):
+        db = self.mirror._db()
+        accounts = ' OR '.join('a.code LIKE ?' for _ in self.account_prefixes)
+        rows = db.execute(
+            'SELECT l.id, l.partner_id, l.partner_id__name, l.date, COALESCE(l.date_maturity, l.date),'
+            ' l.balance, m.move_type, m.country_code, m.team_id__name'
+            ' FROM account_move_line l'
+            ' JOIN account_account a ON a.id = l.account_id'
+            ' LEFT JOIN account_move m ON m.id = l.move_id'
+            f" WHERE l.parent_state = 'posted' AND ({accounts})"
+            ' ORDER BY l.id',
+            [prefix + '%' for prefix in self.account_prefixes]
+        ).fetchall()
+        (ids, partners, partner_names, dates, maturities, balances,
+         move_types, countries, teams) = zip(*rows) if rows else ((),) * 9
+
+        ids = np.array(ids, dtype=np.int64)
+        partner = np.array([p or 0 for p in partners], dtype=np.int64)
+        countries = np.array([c or '' for c in countries], dtype=object)
+        teams = np.array([(t or '').upper() for t in teams], dtype=object)
+        international = ((countries != '') & (countries != 'PE')) | \
+            np.array(['INTERNACIONAL' in t for t in teams], dtype=bool)
+
+        # Conciliaciones: cada registro descuenta en el deudor y suma en el acreedor
+        partials = db.execute(
+            'SELECT debit_move_id, credit_move_id, amount, max_date FROM account_partial_reconcile'
+        ).fetchall()
+        debit_ids, credit_ids, amounts, max_dates = zip(*partials) if partials else ((),) * 4
+        line_ids = np.concatenate([np.array([i or 0 for i in debit_ids], dtype=np.int64),
+                                   np.array([i or 0 for i in credit_ids], dtype=np.int64)])
+        amounts = np.array(amounts, dtype=np.float64)
+        signed = np.concatenate([amounts, -amounts])
+        max_days = np.tile(_to_days(max_dates), 2)
+        # Solo cuentan los lados que son líneas por cobrar espejadas
+        position = np.minimum(np.searchsorted(ids, line_ids), max(len(ids) - 1, 0))
+        known = ids[position] == line_ids if len(ids) else np.zeros(len(line_ids), dtype=bool)
+        order = np.argsort(max_days[known], kind='stable')
+
+        partner_ids, first = np.unique(partner, return_index=True)
+        return {
+            'partner': partner,
+            'partner_ids': partner_ids,
+            'partner_names': [partner_names[i] or 'Sin cliente' for i in first],
+            'partner_countries': countries[first],
+            'date': _to_days(dates),
+            'maturity': _to_days(maturities),
+            'balance': np.array(balances, dtype=np.float64),
+            'is_sale': np.isin(np.array(move_types, dtype=object), ['out_invoice', 'out_refund']),
+            'international': international,
+            'partial_line': position[known][order],
+            'partial_amount': signed[known][order],
+            'partial_day': max_days[known][order],
+        }
+
+    # -- reconstrucción -----------------------------------------------------------
+
+    def _residuals(self, data, day):
+        """Residual de cada línea al cierre del día `day` (días desde 1970)."""
+        count = int(np.searchsorted(data['partial_day'], day, side='right'))
+        applied = np.bincount(data['partial_line'][:count], weights=data['partial_amount'][:count],
+                              minlength=len(data['balance']))
+        return np.where(data['date'] <= day, data['balance'] - applied, 0.0)
+
+    @staticmethod
+    def _scope(data, international):
+        if international is None:
+            return np.ones(len(data['balance']), dtype=bool)
+        return data['international'] if international else ~data['international']
+
+    @staticmethod
+    def _aging(residual, overdue):
+        """Saldos por bucket de aging ({clave: monto}) de las líneas con residual positivo."""
+        bucket = np.searchsorted(_AGING_EDGES, overdue, side='left')
+        sums = np.bincount(bucket, weights=residual, minlength=len(AGING_KEYS))
+        return {key: round(float(value), 2) for key, value in zip(AGING_KEYS, sums)}
+
+    def _summary(self, data, day, scope):
+        residual = self._residuals(data, day)[scope]
+        overdue = day - data['maturity'][scope]
+        open_ = residual > 0.005
+        late = open_ & (overdue > 0)
+        vencido = float(residual[late].sum())
+        vigente = float(residual[open_ & ~late].sum())
+        return {
+            'cxc': round(float(residual.sum()), 2),
+            'monto_vencido': round(vencido, 2),
+            'monto_vigente': round(vigente, 2),
+            'porcentaje_vencido': round(vencido / (vencido + vigente) * 100, 1) if vencido + vigente > 0 else 0.0,
+            'promedio_dias_morosidad': round(float(overdue[late].mean()), 1) if late.any() else 0.0,
+            'aging_buckets': self._aging(residual[open_], overdue[open_]),
+        }
+
+    def summary(self, as_of, international=None):
+        """
+        Totales de cuentas por cobrar al cierre de una fecha.
+
+        Args:
+            as_of (str | date): Fecha de corte ('YYYY-MM-DD')
+            international (bool, optional): True solo internacional, False
+                solo nacional, None todo
+
+        Returns:
+            dict: cxc, monto_vencido, monto_vigente, porcentaje_vencido,
+                promedio_dias_morosidad y aging_buckets a esa fecha
+        """
+        data = self._arrays()
+        as_of = _as_date(as_of)
+        result = self._summary(data, as_of.toordinal() - date(1970, 1, 1).toordinal(),
+                               self._scope(data, international))
+        result['fecha'] = as_of.isoformat()
+        return result
+
+    def partner_balances(self, as_of, international=None, partner_id=None):
+        """
+        Residual y aging por cliente al cierre de una fecha.
+
+        Args:
+            as_of (str | date): Fecha de corte ('YYYY-MM-DD')
+            international (bool, optional): True solo internacional, False
+                solo nacional, None todo
+            partner_id (int, optional): Solo este cliente
+
+        Returns:
+            list: [{'partner_id', 'partner', 'country_code', 'residual',
+                'monto_vencido', 'aging_buckets'}] de mayor a menor residual,
+                solo clientes con saldo
+        """
+        data = self._arrays()
+        day = _as_date(as_of).toordinal() - date(1970, 1, 1).toordinal()
+        scope = self._scope(data, international)
+        if partner_id:
+            scope = scope & (data['partner'] == int(partner_id))
+        residual = self._residuals(data, day)
+        overdue = day - data['maturity']
+        slot = np.searchsorted(data['partner_ids'], data['partner'])
+        n = len(data['partner_ids'])
+
+        totals = np.bincount(slot[scope], weights=residual[scope], minlength=n)
+        open_ = scope & (residual > 0.005)
+        bucket = np.searchsorted(_AGING_EDGES, overdue[open_], side='left')
+        aging = np.zeros((n, len(AGING_KEYS)))
+        np.add.at(aging, (slot[open_], bucket), residual[open_])
+
+        result = []
+        for i in np.flatnonzero(np.abs(totals) > 0.005):
+            result.append({
+                'partner_id': int(data['partner_ids'][i]) or False,
+                'partner': data['partner_names'][i],
+                'country_code': data['partner_countries'][i] or False,
+                'residual': round(float(totals[i]), 2),
+                'monto_vencido': round(float(aging[i, 1:].sum()), 2),
+                'aging_buckets': {key: round(float(v), 2) for key, v in zip(AGING_KEYS, aging[i])},
+            })
+        result.sort(key=lambda item: item['residual'], reverse=True)
+        return result
+
+    def monthly_history(self, months=12, end=None, international=None):
+        """
+        Serie mensual de cierres: saldo, morosidad, ventas del mes y DSO.
+
+        Args:
+            months (int): Cantidad de meses (el último es el de `end`)
+            end (str | date, optional): Fecha del último cierre (por
+                defecto hoy; el mes en curso cierra en esa fecha)
+            international (bool, optional): True solo internacional, False
+                solo nacional, None todo
+
+        Returns:
+            list: Un dict por mes con 'mes' (YYYY-MM), 'label', 'fecha',
+                'ventas', 'dso' y los campos de `summary`
+        """
+        data = self._arrays()
+        scope = self._scope(data, international)
+        epoch = date(1970, 1, 1).toordinal()
+        sales = scope & data['is_sale']
+        history = []
+        for first, last in month_ends(months, _as_date(end) if end else date.today()):
+            day = last.toordinal() - epoch
+            point = self._summary(data, day, scope)
+            in_month = sales & (data['date'] >= first.toordinal() - epoch) & (data['date'] <= day)
+            ventas = float(data['balance'][in_month].sum())
+            point.update({
+                'mes': first.strftime('%Y-%m'),
+                'label': month_label(first),
+                'fecha': last.isoformat(),
+                'ventas': round(ventas, 2),
+                'dso': calcular_dso(point['cxc'], ventas, (last - first).days + 1),
+            })
+            history.append(point)
+        return history
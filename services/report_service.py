@@ -8,6 +8,9 @@ Genera reportes de cuentas por cobrar nacional e internacional.
 from datetime import datetime
 from utils.calculators import calcular_mora, calcular_dias_vencido, clasificar_antiguedad
 from utils.filters import filter_internacional
+from .master_data import MasterDataCache
+from .memory_profile import memory_profiler
+from .odoo_mirror import connection_for
 
 
 class ReportService:
@@ -15,16 +18,20 @@ class ReportService:
     Servicio para generar reportes de cuentas por cobrar.
     """
     
-    def __init__(self, connection):
+    def __init__(self, connection, master_data=None, mirror_connection=None):
         """
         Inicializa el servicio de reportes.
         
         Args:
             connection (OdooConnection): Instancia de conexión a Odoo
+            master_data (MasterDataCache, optional): Caché de datos maestros compartida
+            mirror_connection (MirrorConnection, optional): Conexión al espejo local (source='mirror')
         """
         self.connection = connection
+        self.master_data = master_data or MasterDataCache(connection)
+        self.mirror_connection = mirror_connection
     
-    def get_report_lines(self, start_date=None, end_date=None, customer=None, limit=0, account_codes=None, search_term=None):
+    def get_report_lines(self, start_date=None, end_date=None, customer=None, limit=0, account_codes=None, search_term=None, source=None):
         """
         Obtener líneas de reporte de CxC siguiendo la cadena de relaciones.
         
@@ -32,17 +39,19 @@ class ReportService:
             start_date (str): Fecha inicial
             end_date (str): Fecha final
             customer (str): Nombre de cliente a filtrar
-            limit (int): Límite de registros
+            limit (int): Límite de registros (0 = todos, paginados)
             account_codes (str): Códigos de cuenta separados por coma
             search_term (str): Término de búsqueda general
+            source (str): 'live' o 'mirror' (por defecto ODOO_DATA_SOURCE)
         
         Returns:
             list: Líneas de reporte CxC
         """
         try:
             print("[INFO] Obteniendo lineas de reporte CxC...")
+            connection = connection_for(source, self.connection, self.mirror_connection)
             
-            if not self.connection.is_connected():
+            if not connection.is_connected():
                 print("[ERROR] No hay conexion a Odoo disponible")
                 return []
             
@@ -94,9 +103,10 @@ class ReportService:
                 'date_maturity', 'amount_currency', 'amount_residual', 'currency_id',
             ]
             
-            lines = self.connection.search_read(
+            # Con tope, las más recientes primero (como el listado de Odoo)
+            lines = connection.search_read_all(
                 'account.move.line', line_domain, line_fields,
-                limit=limit if limit > 0 else 10000
+                limit=limit if limit > 0 else None, order='date desc, id desc'
             )
             
             print(f"[OK] Obtenidas {len(lines)} lineas de asiento contable")
@@ -120,37 +130,23 @@ class ReportService:
                     'ref', 'invoice_payment_term_id', 'invoice_user_id',
                     'sales_channel_id', 'sale_type_id',
                 ]
-                moves = self.connection.read('account.move', move_ids, move_fields)
+                moves = connection.read('account.move', move_ids, move_fields)
                 move_map = {m['id']: m for m in moves}
             
-            # Obtener datos de clientes
-            partner_map = {}
-            if partner_ids:
-                partner_fields = [
-                    'id', 'name', 'vat', 'state_id', 'l10n_pe_district',
-                    'country_code', 'country_id',
-                ]
-                partners = self.connection.read('res.partner', partner_ids, partner_fields)
-                partner_map = {p['id']: p for p in partners}
+            # Obtener datos de clientes (caché de datos maestros)
+            partner_fields = [
+                'id', 'name', 'vat', 'state_id', 'l10n_pe_district',
+                'country_code', 'country_id',
+            ]
+            partner_map = self.master_data.get_records('res.partner', partner_ids, partner_fields)
             
             # Obtener datos de cuentas
-            account_map = {}
-            if account_ids:
-                accounts = self.connection.read('account.account', account_ids, ['id', 'code', 'name'])
-                account_map = {a['id']: a for a in accounts}
-            
-            # Obtener información de crédito
-            credit_map = {}
-            if partner_ids:
-                try:
-                    credit_customers = self.connection.search_read(
-                        'agr.credit.customer',
-                        [('partner_id', 'in', partner_ids)],
-                        ['partner_id', 'sub_channel_id']
-                    )
-                    credit_map = {cc['partner_id'][0]: cc for cc in credit_customers}
-                except Exception as e:
-                    print(f"[WARN] No se pudo obtener agr.credit.customer: {e}")
+            account_map = self.master_data.get_records('account.account', account_ids, ['id', 'code', 'name'])
+            
+            # Obtener información de crédito (sub canal por cliente)
+            credit_map = self.master_data.get_records(
+                'agr.credit.customer', partner_ids, ['partner_id', 'sub_channel_id'], key_field='partner_id'
+            )
             
             # Combinar datos
             rows = []
@@ -219,6 +215,8 @@ class ReportService:
                 rows.append(row)
             
             print(f"[OK] Procesadas {len(rows)} lineas de CxC con TODOS los campos")
+            # Líneas crudas, asientos y filas conviven aquí (pico de memoria)
+            memory_profiler.checkpoint('report_lines')
             return rows
             
         except Exception as e:
@@ -227,7 +225,7 @@ class ReportService:
             traceback.print_exc()
             return []
     
-    def get_report_internacional(self, start_date=None, end_date=None, customer=None, payment_state=None, limit=0):
+    def get_report_internacional(self, start_date=None, end_date=None, customer=None, payment_state=None, limit=0, source=None):
         """
         Obtener reporte de facturas internacionales no pagadas con campos calculados.
         
@@ -236,15 +234,17 @@ class ReportService:
             end_date (str): Fecha final
             customer (str): Nombre de cliente
             payment_state (str): Estado de pago
-            limit (int): Límite de registros
+            limit (int): Límite de registros (0 = todos, paginados)
+            source (str): 'live' o 'mirror' (por defecto ODOO_DATA_SOURCE)
         
         Returns:
             list: Líneas de reporte internacional con campos calculados
         """
         try:
             print("[INFO] Obteniendo reporte internacional...")
+            connection = connection_for(source, self.connection, self.mirror_connection)
             
-            if not self.connection.is_connected():
+            if not connection.is_connected():
                 print("[ERROR] No hay conexion a Odoo disponible")
                 return []
             
@@ -268,9 +268,10 @@ class ReportService:
                 'date_maturity', 'amount_currency', 'amount_residual', 'currency_id','amount_residual_with_retention',
             ]
             
-            lines = self.connection.search_read(
+            # Con tope, las más recientes primero (como el listado de Odoo)
+            lines = connection.search_read_all(
                 'account.move.line', line_domain, line_fields,
-                limit=limit if limit > 0 else 10000
+                limit=limit if limit > 0 else None, order='date desc, id desc'
             )
             
             if not lines:
@@ -289,19 +290,16 @@ class ReportService:
                     'amount_residual', 'currency_id', 'invoice_payment_term_id',
                     'invoice_user_id', 'amount_total_signed','amount_residual_with_retention',
                 ]
-                moves = self.connection.read('account.move', move_ids, move_fields)
+                moves = connection.read('account.move', move_ids, move_fields)
                 move_map = {m['id']: m for m in moves}
                 
                 # Filtrar por payment_state si se especificó
                 if payment_state:
                     move_map = {k: v for k, v in move_map.items() if v.get('payment_state') == payment_state}
             
-            # Obtener clientes
-            partner_map = {}
-            if partner_ids:
-                partner_fields = ['id', 'name', 'vat', 'country_code', 'country_id']
-                partners = self.connection.read('res.partner', partner_ids, partner_fields)
-                partner_map = {p['id']: p for p in partners}
+            # Obtener clientes (caché de datos maestros)
+            partner_fields = ['id', 'name', 'vat', 'country_code', 'country_id']
+            partner_map = self.master_data.get_records('res.partner', partner_ids, partner_fields)
             
             # Procesar y calcular campos
             rows = []
@@ -371,6 +369,7 @@ class ReportService:
                 rows.append(row)
             
             print(f"[OK] Procesadas {len(rows)} lineas internacionales")
+            memory_profiler.checkpoint('report_internacional')
             return rows
             
         except Exception as e:
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Perfilado bajo demanda de una request con cProfile.
+
+Un administrador agrega `?__profile=1` (o la cabecera `X-Profile: 1`) a
+cualquier ruta y la request corre bajo cProfile. Mientras tanto un hilo
+muestrea la pila del hilo de la request para armar las pilas colapsadas
+(formato de flamegraph.pl / speedscope), que cProfile no guarda. Se
+escriben en PROFILE_DIR:
+
+- <id>.pstats: abrir con `python -m pstats` o snakeviz
+- <id>.collapsed: una pila por línea con su número de muestras
+
+Con `__profile=text` la respuesta se reemplaza por el resumen de pstats
+ordenado por tiempo acumulado. Solo se perfila una request a la vez por
+worker; las llamadas del fan-out corren en otros hilos y aparecen como
+espera en el hilo de la request.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+
+# Una sola request perfilada a la vez por proceso (cProfile no admite anidar)
+_active = threading.Lock()
+
+
+def frame_label(code):
+    """'función (archivo.py:línea)' para una entrada de pila."""
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse_stack(frame):
+    """Pila de `frame` en formato colapsado: raíz primero, separada por ';'."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class RequestProfile:
+    """cProfile + muestreo de pilas del hilo actual durante una request."""
+
+    def __init__(self, label, sample_interval):
+        self.label = label
+        self.interval = sample_interval
+        self.thread_id = threading.get_ident()
+        self.profiler = cProfile.Profile()
+        self.stacks = Counter()
+        self.started = time.perf_counter()
+        self.seconds = None
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True, name='request-profile-sampler')
+
+    def start(self):
+        self._sampler.start()
+        self.profiler.enable()
+
+    def stop(self):
+        """Detiene el perfilado (idempotente) y libera el candado del proceso."""
+        if self.seconds is not None:
+            return
+        self.profiler.disable()
+        self.seconds = time.perf_counter() - self.started
+        self._stop.set()
+        self._sampler.join()
+        _active.release()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def text_report(self, lines=60):
+        """Resumen de pstats ordenado por tiempo acumulado."""
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(lines)
+        return stream.getvalue()
+
+
+class ProfileStore:
+    """Archivos .pstats / .collapsed de las requests perfiladas."""
+
+    def __init__(self, directory=None, keep=None, sample_interval_ms=None):
+        """
+        Args:
+            directory (str, optional): Carpeta de salida (PROFILE_DIR, por
+                defecto 'instance/profiles')
+            keep (int, optional): Perfiles a conservar (PROFILE_KEEP, por defecto 50)
+            sample_interval_ms (float, optional): Intervalo de muestreo de pilas
+                (PROFILE_SAMPLE_INTERVAL_MS, por defecto 2)
+        """
+        self.directory = directory or os.getenv('PROFILE_DIR', os.path.join('instance', 'profiles'))
+        self.keep = int(keep if keep is not None else os.getenv('PROFILE_KEEP', 50))
+        self.sample_interval = float(sample_interval_ms if sample_interval_ms is not None
+                                     else os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 2)) / 1000
+
+    def begin(self, label):
+        """
+        Empieza a perfilar la request actual.
+
+        Returns:
+            RequestProfile: o None si ya hay otra request perfilándose
+        """
+        if not _active.acquire(blocking=False):
+            return None
+        try:
+            profile = RequestProfile(label, self.sample_interval)
+            profile.start()
+        except Exception:
+            _active.release()
+            raise
+        return profile
+
+    def save(self, profile):
+        """
+        Escribe el .pstats y el .collapsed de un perfil ya detenido.
+
+        Returns:
+            str: Identificador (nombre base de los archivos)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        safe_label = re.sub(r'[^A-Za-z0-9_.-]+', '_', profile.label or 'request')
+        profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{safe_label}"
+        base = os.path.join(self.directory, profile_id)
+        profile.profiler.dump_stats(base + '.pstats')
+        with open(base + '.collapsed', 'w', encoding='utf-8') as fh:
+            for stack, count in profile.stacks.most_common():
+                fh.write(f'{stack} {count}\n')
+        self._prune()
+        print(f"[INFO] Perfil {profile_id} guardado ({profile.seconds * 1000:.0f} ms, "
+              f"{sum(profile.stacks.values())} muestras)")
+        return profile_id
+
+    def _prune(self):
+        ids = sorted({os.path.splitext(f)[0] for f in os.listdir(self.directory)
+                      if f.endswith(('.pstats', '.collapsed'))})
+        for old in ids[:-self.keep] if self.keep > 0 else []:
+            for ext in ('.pstats', '.collapsed'):
+                try:
+                    os.remove(os.path.join(self.directory, old + ext))
+                except OSError:
+                    pass
+
+    def list(self):
+        """
+        Returns:
+            list: [{'id', 'files', 'modified'}] del más reciente al más antiguo
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = {}
+        for name in os.listdir(self.directory):
+            profile_id, ext = os.path.splitext(name)
+            if ext not in ('.pstats', '.collapsed'):
+                continue
+            entry = profiles.setdefault(profile_id, {'id': profile_id, 'files': [], 'modified': 0.0})
+            entry['files'].append(name)
+            entry['modified'] = max(entry['modified'], os.path.getmtime(os.path.join(self.directory, name)))
+        for entry in profiles.values():
+            entry['files'].sort()
+            entry['modified'] = datetime.fromtimestamp(entry['modified']).isoformat(timespec='seconds')
+        return sorted(profiles.values(), key=lambda x: x['id'], reverse=True)
+
+
+# Almacén global del proceso
+profile_store = ProfileStore()
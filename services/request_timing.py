@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Desglose de tiempos por request para la cabecera `Server-Timing`.
+
+Durante una request se acumulan los tiempos de cada llamada a Odoo (por
+modelo y método), de la agregación en Python, del render de plantillas y de
+la serialización a Excel. Al final se arma la cabecera `Server-Timing`, que
+las devtools del navegador muestran en la pestaña de red. El registro usa
+una variable de contexto, por lo que funciona también en los hilos del
+fan-out, y su costo es de unos pocos microsegundos por llamada.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Máximo de entradas de Odoo (modelo.método) en la cabecera
+MAX_ODOO_ENTRIES = 12
+
+_current = contextvars.ContextVar('request_timer', default=None)
+
+
+class RequestTimer:
+    """Tiempos acumulados de una request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.odoo_calls = {}
+        self.odoo_intervals = []
+        self.sections = {}
+        self._lock = threading.Lock()
+
+    def add_odoo_call(self, model, method, started, seconds):
+        with self._lock:
+            entry = self.odoo_calls.setdefault(f'{model}.{method}', [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            self.odoo_intervals.append((started, started + seconds))
+
+    def add_section(self, name, seconds):
+        with self._lock:
+            self.sections[name] = self.sections.get(name, 0.0) + seconds
+
+    def odoo_wall_time(self):
+        """Tiempo de reloj con al menos una llamada a Odoo en curso (las del fan-out se solapan)."""
+        total = 0.0
+        end = None
+        for start, stop in sorted(self.odoo_intervals):
+            if end is None or start > end:
+                total += stop - start
+                end = stop
+            elif stop > end:
+                total += stop - end
+                end = stop
+        return total
+
+    def breakdown(self):
+        """
+        Returns:
+            list: [(nombre, descripción, milisegundos)] en orden de la cabecera
+        """
+        total = time.perf_counter() - self.started
+        with self._lock:
+            calls = sorted(self.odoo_calls.items(), key=lambda x: x[1][1], reverse=True)
+            sections = dict(self.sections)
+            odoo = self.odoo_wall_time()
+
+        entries = [('total', 'Total', total)]
+        if calls:
+            entries.append(('odoo', f'Odoo ({sum(c[0] for _, c in calls)} llamadas)', odoo))
+            for name, (count, seconds) in calls[:MAX_ODOO_ENTRIES]:
+                entries.append((f'odoo.{name}', f'{name} x{count}', seconds))
+        for name, desc in (('aggregation', 'Agregacion'), ('render', 'render_template'), ('excel', 'Excel')):
+            if name in sections:
+                entries.append((name, desc, sections[name]))
+        python = total - odoo - sum(sections.values())
+        entries.append(('python', 'Python (resto)', max(0.0, python)))
+        return [(name, desc, seconds * 1000) for name, desc, seconds in entries]
+
+
+def start_request():
+    """
+    Crea el registro de la request actual.
+
+    Returns:
+        contextvars.Token: Token para end_request(); el hilo del worker se
+            reutiliza, así que el registro debe retirarse al terminar
+    """
+    return _current.set(RequestTimer())
+
+
+def end_request(token=None):
+    """Retira el registro de la request actual (llamar en teardown_request)."""
+    if token is not None:
+        try:
+            _current.reset(token)
+            return
+        except ValueError:
+            # Token de otro contexto: basta con vaciar el actual
+            pass
+    _current.set(None)
+
+
+def current():
+    """
+    Returns:
+        RequestTimer: Registro de la request en curso, o None fuera de una request
+    """
+    return _current.get()
+
+
+def record_odoo_call(model, method, started, seconds):
+    """Registra una llamada a Odoo en la request en curso (si hay una)."""
+    timer = _current.get()
+    if timer is not None:
+        timer.add_odoo_call(model, method, started, seconds)
+
+
+@contextmanager
+def measure(section):
+    """
+    Mide un bloque y lo suma a la sección indicada de la request en curso.
+
+    Ejemplo:
+        with measure('excel'):
+            df.to_excel(writer)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer = _current.get()
+        if timer is not None:
+            timer.add_section(section, time.perf_counter() - start)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshots en disco de las líneas de venta de meses cerrados.
+
+Las ventas de un mes ya cerrado no cambian, pero el dashboard las volvía a
+construir desde Odoo en cada visita. Aquí se guardan una vez (ya
+enriquecidas) junto con una "versión" barata del mes (cantidad de líneas y
+último write_date) y se reutilizan mientras esa versión no cambie.
+"""
+
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+# Cambiar si cambia la estructura de las líneas que devuelve get_sales_lines
+# (2: los snapshots anteriores podían guardar líneas sin enriquecer)
+SNAPSHOT_FORMAT = 2
+
+
+class SalesSnapshotStore:
+    """
+    Almacén de snapshots mensuales de líneas de venta.
+
+    Las líneas devueltas se comparten entre requests: los llamadores no
+    deben modificarlas.
+    """
+
+    def __init__(self, directory=None, check_interval=None, memory_months=None):
+        """
+        Args:
+            directory (str, optional): Carpeta de snapshots (SALES_SNAPSHOT_DIR,
+                por defecto 'instance/snapshots')
+            check_interval (float, optional): Segundos entre verificaciones de
+                versión de un mes (SALES_SNAPSHOT_CHECK, por defecto 600)
+            memory_months (int, optional): Meses mantenidos en memoria
+                (SALES_SNAPSHOT_MEMORY, por defecto 4)
+        """
+        self.directory = directory or os.getenv('SALES_SNAPSHOT_DIR', os.path.join('instance', 'snapshots'))
+        self.check_interval = float(check_interval if check_interval is not None else os.getenv('SALES_SNAPSHOT_CHECK', 600))
+        self.memory_months = int(memory_months or os.getenv('SALES_SNAPSHOT_MEMORY', 4))
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, month):
+        return os.path.join(self.directory, f'sales_lines_{month}.pkl')
+
+    def _load(self, month):
+        try:
+            with open(self.path_for(month), 'rb') as fh:
+                payload = pickle.load(fh)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[WARN] Snapshot de ventas {month} ilegible, se reconstruirá: {e}")
+            return None
+        if payload.get('format') != SNAPSHOT_FORMAT:
+            return None
+        return payload
+
+    def _save(self, month, version, lines):
+        payload = {
+            'format': SNAPSHOT_FORMAT,
+            'month': month,
+            'version': version,
+            'created_at': time.time(),
+            'lines': lines,
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path_for(month))
+            print(f"[OK] Snapshot de ventas {month} guardado ({len(lines)} lineas)")
+        except Exception as e:
+            print(f"[WARN] No se pudo guardar snapshot de ventas {month}: {e}")
+        return payload
+
+    def _remember(self, month, payload):
+        with self._lock:
+            self._memory[month] = (payload, time.monotonic())
+            self._memory.move_to_end(month)
+            while len(self._memory) > self.memory_months:
+                self._memory.popitem(last=False)
+
+    def get(self, month, version_loader, loader):
+        """
+        Devuelve las líneas de un mes cerrado desde el snapshot si sigue vigente.
+
+        Args:
+            month (str): Mes 'YYYY-MM'
+            version_loader (callable): Devuelve la versión actual del mes en
+                Odoo, o None si no se pudo consultar
+            loader (callable): Construye las líneas desde Odoo; debe lanzar
+                una excepción si alguna lectura falla (no se guarda nada)
+
+        Returns:
+            list: Líneas de venta del mes
+        """
+        with self._lock:
+            cached = self._memory.get(month)
+        if cached and time.monotonic() - cached[1] < self.check_interval:
+            return cached[0]['lines']
+
+        version = version_loader()
+        payload = cached[0] if cached else self._load(month)
+
+        # Sin Odoo disponible (version None) se sirve el último snapshot
+        if payload and (version is None or payload['version'] == version):
+            self._remember(month, payload)
+            return payload['lines']
+
+        lines = loader()
+        if lines and version is not None:
+            self._remember(month, self._save(month, version, lines))
+        return lines
+
+    def invalidate(self, month=None):
+        """Elimina el snapshot de un mes (o todos) de memoria y disco."""
+        with self._lock:
+            months = [month] if month else list(self._memory.keys())
+            for m in months:
+                self._memory.pop(m, None)
+        if month:
+            paths = [self.path_for(month)]
+        elif os.path.isdir(self.directory):
+            paths = [os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.startswith('sales_lines_')]
+        else:
+            paths = []
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Profiler de muestreo continuo para los workers.
+
+Un hilo en segundo plano toma `sys._current_frames()` a baja frecuencia
+(SAMPLING_PROFILER_HZ, por defecto 10 Hz) y acumula las pilas en una
+ventana móvil de buckets por minuto. Cada muestra se clasifica además en una
+categoría (red, parseo XML-RPC, Python de la app, Jinja, Excel, pandas,
+espera), para ver en horario real de trabajo si el tiempo se va en
+deserializar XML-RPC, en armar diccionarios o en renderizar `sales.html`.
+
+Los hilos ociosos (bloqueados en un lock o un socket sin una request, una
+tarea del fan-out o un pre-calentado en curso en la pila) no se cuentan. El
+costo de muestrear se mide y se reporta como `overhead_pct`; a 10 Hz queda
+muy por debajo del 1%.
+
+Se inspecciona en /debug/profile (JSON o pilas colapsadas para flamegraph).
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from .request_profile import frame_label
+
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SEP = os.sep
+
+# Funciones de bloqueo: una pila que termina aquí sin trabajo en curso está ociosa
+_BLOCKING = {'wait', 'select', 'poll', 'accept', 'get', 'sleep', '_wait_for_tstate_lock', 'readinto', 'recv_into',
+             '_worker'}
+
+# Frames que indican trabajo en curso: request de Flask, pre-calentado, tarea del fan-out
+_ACTIVE = {'wsgi_app', 'run_once', '_timed'}
+
+# (categoría, fragmentos de ruta); se asigna la del frame más cercano a la hoja
+_CATEGORIES = (
+    ('red', (f'{_SEP}socket.py', f'{_SEP}ssl.py', f'{_SEP}http{_SEP}client.py', f'{_SEP}selectors.py')),
+    ('xmlrpc', (f'{_SEP}xmlrpc{_SEP}client.py', f'{_SEP}services{_SEP}odoo_transport.py')),
+    ('jinja', (f'{_SEP}jinja2{_SEP}', f'{_SEP}templates{_SEP}')),
+    ('excel', (f'{_SEP}openpyxl{_SEP}', f'{_SEP}xlsxwriter{_SEP}', f'{_SEP}et_xmlfile{_SEP}')),
+    ('pandas', (f'{_SEP}pandas{_SEP}', f'{_SEP}numpy{_SEP}')),
+    ('espera', (f'{_SEP}threading.py', f'{_SEP}concurrent{_SEP}futures{_SEP}', f'{_SEP}queue.py')),
+)
+
+
+def _classify(filename):
+    for category, fragments in _CATEGORIES:
+        if any(fragment in filename for fragment in fragments):
+            return category
+    if filename.startswith(_PROJECT_ROOT) and f'{_SEP}site-packages{_SEP}' not in filename:
+        return 'app'
+    return None
+
+
+def _walk(frame):
+    """
+    Returns:
+        tuple: (pila colapsada, categoría, hay trabajo en curso, nombre de la hoja)
+    """
+    labels = []
+    category = None
+    active = False
+    leaf = frame.f_code.co_name
+    while frame is not None:
+        code = frame.f_code
+        labels.append(frame_label(code))
+        if category is None:
+            category = _classify(code.co_filename)
+        if code.co_name in _ACTIVE:
+            active = True
+        frame = frame.f_back
+    return ';'.join(reversed(labels)), category or 'otros', active, leaf
+
+
+class _Bucket:
+    def __init__(self, start):
+        self.start = start
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.samples = 0
+
+
+class SamplingProfiler:
+    """Muestreo periódico de las pilas de todos los hilos del proceso."""
+
+    def __init__(self, enabled=None, hz=None, window_minutes=None, bucket_seconds=60, max_stacks=None):
+        """
+        Args:
+            enabled (bool, optional): SAMPLING_PROFILER (por defecto true)
+            hz (float, optional): Muestras por segundo (SAMPLING_PROFILER_HZ, por defecto 10)
+            window_minutes (int, optional): Ventana conservada
+                (SAMPLING_PROFILER_WINDOW, por defecto 15 minutos)
+            bucket_seconds (int): Duración de cada bucket de la ventana
+            max_stacks (int, optional): Pilas distintas por bucket
+                (SAMPLING_PROFILER_MAX_STACKS, por defecto 5000); el resto se
+                cuenta como '(otras pilas)'
+        """
+        if enabled is None:
+            enabled = os.getenv('SAMPLING_PROFILER', 'true').lower() in ('1', 'true', 'yes')
+        self.enabled = enabled
+        self.hz = float(hz if hz is not None else os.getenv('SAMPLING_PROFILER_HZ', 10))
+        self.window_minutes = int(window_minutes if window_minutes is not None else os.getenv('SAMPLING_PROFILER_WINDOW', 15))
+        self.bucket_seconds = bucket_seconds
+        self.max_stacks = int(max_stacks if max_stacks is not None else os.getenv('SAMPLING_PROFILER_MAX_STACKS', 5000))
+        self._buckets = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_at = None
+        self._sampling_seconds = 0.0
+
+    def start(self):
+        """Inicia el hilo de muestreo (una sola vez por proceso)."""
+        if self._thread is not None or not self.enabled or self.hz <= 0:
+            return
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._loop, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        interval = 1.0 / self.hz
+        while not self._stop.wait(interval):
+            start = time.perf_counter()
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"[WARN] Profiler de muestreo: {e}")
+            self._sampling_seconds += time.perf_counter() - start
+
+    def sample(self):
+        """Toma una muestra de todos los hilos (salvo los del propio profiler)."""
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        taken = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or names.get(thread_id, '').endswith('profile-sampler'):
+                continue
+            stack, category, active, leaf = _walk(frame)
+            if not active and leaf in _BLOCKING:
+                continue  # hilo ocioso
+            taken.append((stack, category))
+        if not taken:
+            return
+
+        now = time.time()
+        bucket_start = now - now % self.bucket_seconds
+        with self._lock:
+            if not self._buckets or self._buckets[-1].start != bucket_start:
+                self._buckets.append(_Bucket(bucket_start))
+                limit = now - self.window_minutes * 60
+                while self._buckets and self._buckets[0].start + self.bucket_seconds < limit:
+                    self._buckets.popleft()
+            bucket = self._buckets[-1]
+            for stack, category in taken:
+                if stack not in bucket.stacks and len(bucket.stacks) >= self.max_stacks:
+                    stack = '(otras pilas)'
+                bucket.stacks[stack] += 1
+                bucket.categories[category] += 1
+                bucket.samples += 1
+
+    def _merged(self, minutes=None):
+        since = time.time() - minutes * 60 if minutes else 0
+        stacks, categories, samples = Counter(), Counter(), 0
+        with self._lock:
+            for bucket in self._buckets:
+                if bucket.start + self.bucket_seconds >= since:
+                    stacks.update(bucket.stacks)
+                    categories.update(bucket.categories)
+                    samples += bucket.samples
+        return stacks, categories, samples
+
+    def collapsed(self, minutes=None):
+        """Pilas colapsadas ('a;b;c N' por línea) de la ventana."""
+        stacks, _, _ = self._merged(minutes)
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+    def summary(self, minutes=None, top=30):
+        """
+        Resumen de la ventana (o de los últimos `minutes`).
+
+        Returns:
+            dict: muestras, % por categoría, funciones con más tiempo propio e
+                inclusivo, pilas más frecuentes y overhead medido
+        """
+        stacks, categories, samples = self._merged(minutes)
+        self_time, inclusive = Counter(), Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')
+            self_time[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+
+        def pct(count):
+            return round(count * 100 / samples, 2) if samples else 0.0
+
+        elapsed = time.time() - self._started_at if self._started_at else 0
+        return {
+            'enabled': self.enabled,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'hz': self.hz,
+            'window_minutes': minutes or self.window_minutes,
+            'samples': samples,
+            'overhead_pct': round(self._sampling_seconds * 100 / elapsed, 3) if elapsed else 0.0,
+            'categories': {name: pct(count) for name, count in categories.most_common()},
+            'top_self': [{'function': f, 'pct': pct(c)} for f, c in self_time.most_common(top)],
+            'top_inclusive': [{'function': f, 'pct': pct(c)} for f, c in inclusive.most_common(top)],
+            'top_stacks': [{'stack': s, 'samples': c} for s, c in stacks.most_common(min(top, 20))],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# Profiler global del proceso
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Coalescencia de llamadas idénticas ("single-flight") y protección contra
+estampidas de caché.
+
+Cuando varios usuarios abren el mismo dashboard a la vez, cada hilo hacía
+las mismas llamadas a Odoo en paralelo. Con SingleFlight solo la primera
+llamada de una clave viaja a Odoo; las demás esperan y comparten su
+resultado. StampedeCache usa la misma clave para que una entrada vencida
+se recalcule una sola vez, y refresca en segundo plano las entradas que
+están por vencer mientras sigue sirviendo el valor anterior.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+from .cache import TTLCache
+
+
+def _canonical(value):
+    """Convierte tuplas, sets y dicts a una forma JSON estable."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(v) for v in value), key=repr)
+    return value
+
+
+def call_key(*parts):
+    """
+    Hash canónico de una llamada (ej: modelo, método, args, kwargs).
+
+    Dominios con tuplas o listas y kwargs en distinto orden producen la
+    misma clave.
+
+    Returns:
+        str: Hash sha1 en hexadecimal
+    """
+    payload = json.dumps(_canonical(parts), sort_keys=True, default=repr, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class _Flight:
+    __slots__ = ('event', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Ejecuta una sola vez las llamadas concurrentes con la misma clave.
+
+    Quien llega primero ejecuta la función; los que llegan mientras está en
+    curso reciben una copia del mismo resultado (o la misma excepción). Las
+    copias evitan que un llamador modifique los datos de otro.
+    """
+
+    def __init__(self, copy_results=True):
+        """
+        Args:
+            copy_results (bool): Entregar copias a los llamadores que esperaron
+                (False si el resultado se comparte de todos modos, ej: cachés)
+        """
+        self.copy_results = copy_results
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, func):
+        """
+        Args:
+            key (hashable): Clave de la llamada
+            func (callable): Función sin argumentos a ejecutar
+
+        Returns:
+            Resultado de func (copia para los llamadores que esperaron)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return pickle.loads(flight.result) if self.copy_results else flight.result
+
+        try:
+            result = func()
+            with self._lock:
+                del self._flights[key]
+                followers = flight.followers
+            # Se serializa antes de devolver: el llamador puede modificar el resultado
+            if followers and self.copy_results:
+                flight.result = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                flight.result = result
+            return result
+        except BaseException as e:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.error = e
+            raise
+        finally:
+            flight.event.set()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._flights
+
+
+class StampedeCache:
+    """
+    Caché TTL cuya carga pasa por SingleFlight.
+
+    - Entrada ausente o vencida: una sola carga por clave; el resto espera.
+    - Entrada vigente pero en su último tramo de vida (`early_refresh`,
+      fracción del TTL): se devuelve el valor actual y un hilo lo recalcula
+      en segundo plano, así la entrada no llega a vencer con tráfico.
+    """
+
+    def __init__(self, ttl, max_size=10000, early_refresh=None):
+        """
+        Args:
+            ttl (float): Vida por defecto de cada entrada
+            max_size (int): Entradas máximas
+            early_refresh (float, optional): Fracción final del TTL en la que
+                se refresca anticipadamente (CACHE_EARLY_REFRESH, por defecto 0.2)
+        """
+        self.cache = TTLCache(ttl, max_size)
+        self.ttl = self.cache.ttl
+        self.early_refresh = float(early_refresh if early_refresh is not None else os.getenv('CACHE_EARLY_REFRESH', 0.2))
+        self.flight = SingleFlight(copy_results=False)
+
+    def _store(self, key, value, ttl):
+        # La vida de la entrada viaja con el valor: se descarta junto con él
+        entry_ttl = self.ttl if ttl is None else ttl
+        self.cache.set(key, (value, entry_ttl), entry_ttl)
+
+    def _load(self, key, loader, ttl):
+        def run():
+            value = loader()
+            self._store(key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+        return self.flight.do(key, run)
+
+    def _refresh_in_background(self, key, loader, ttl):
+        if self.flight.in_flight(key):
+            return
+
+        def run():
+            try:
+                self._load(key, loader, ttl)
+            except Exception as e:
+                print(f"[WARN] Refresco anticipado de {key} falló: {e}")
+
+        threading.Thread(target=run, name='cache-early-refresh', daemon=True).start()
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        Args:
+            key (hashable): Clave
+            loader (callable): Función sin argumentos que calcula el valor
+            ttl (float | callable, optional): Vida de la entrada, o función
+                que la calcula a partir del valor cargado
+
+        Returns:
+            Valor en caché o recién calculado
+        """
+        entry = self.cache.get_entry(key)
+        if entry is None:
+            return self._load(key, loader, ttl)
+
+        (value, entry_ttl), remaining = entry
+        if entry_ttl > 0 and remaining < entry_ttl * self.early_refresh:
+            self._refresh_in_background(key, loader, ttl)
+        return value
+
+    def get(self, key, default=None):
+        entry = self.cache.get(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl=None):
+        self._store(key, value, ttl)
+
+    def clear(self):
+        self.cache.clear()
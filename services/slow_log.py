@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Log de llamadas lentas a Odoo con huella del dominio.
+
+Cada `execute_kw` que supera el umbral se escribe como una línea JSON en un
+archivo rotativo por proceso (`slow_odoo_calls.<pid>.jsonl`: cada worker de
+gunicorn rota solo su archivo): modelo, método, huella del dominio (sin valores
+literales), campos, limit, filas, bytes y duración. Las huellas se agregan
+para ver qué formas de dominio son lentas (ej: las cadenas
+`account_id.code =like` y `partner_id.name ilike` de
+ReportService.get_report_lines) y llevar esa evidencia a los DBAs de Odoo
+para crear índices.
+
+Resumen de todos los workers desde la consola:
+    python -m services.slow_log instance/slow_odoo_calls.jsonl
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+
+# Métodos cuyo primer argumento posicional es un dominio
+_DOMAIN_METHODS = ('search', 'search_read', 'search_count', 'read_group')
+
+# Operadores lógicos de dominio
+_LOGICAL = ('&', '|', '!')
+
+
+def _leaf_shape(leaf):
+    """'campo operador ?' conservando False/None (se traducen a IS NULL)."""
+    try:
+        field, operator, value = leaf
+    except (TypeError, ValueError):
+        return '?'
+    if value is False or value is None:
+        literal = str(value)
+    elif isinstance(value, (list, tuple, set)):
+        literal = '[?]'
+    else:
+        literal = '?'
+    return f'{field} {operator} {literal}'
+
+
+def domain_shape(domain):
+    """
+    Forma normalizada de un dominio: sin literales y con las repeticiones
+    consecutivas colapsadas (`'|', '|', A, A, A` -> `|*, A*`), así el mismo
+    filtro con 2 o 5 códigos de cuenta produce la misma forma.
+
+    Args:
+        domain (list): Dominio de Odoo
+
+    Returns:
+        str: Forma legible del dominio
+    """
+    if not domain:
+        return '[]'
+    tokens = [item if item in _LOGICAL else _leaf_shape(item) for item in domain]
+    compact = []
+    for token in tokens:
+        if compact and compact[-1].rstrip('*') == token:
+            if not compact[-1].endswith('*'):
+                compact[-1] += '*'
+        else:
+            # Los operadores lógicos siempre como serie: '|' y '|, |' son la misma forma
+            compact.append(token + '*' if token in _LOGICAL else token)
+    return ', '.join(compact)
+
+
+def fingerprint(model, method, shape):
+    """Huella corta (12 hex) de modelo, método y forma del dominio."""
+    return hashlib.sha1(f'{model}|{method}|{shape}'.encode('utf-8')).hexdigest()[:12]
+
+
+def _call_details(method, args, kwargs):
+    """Extrae (forma del dominio, campos, limit) de los argumentos de execute_kw."""
+    args = list(args or [])
+    kwargs = kwargs or {}
+    if method in _DOMAIN_METHODS:
+        shape = domain_shape(kwargs.get('domain', args[0] if args else []))
+    elif method == 'read':
+        shape = 'ids'
+    else:
+        shape = '-'
+    fields = kwargs.get('fields')
+    if fields is None and method in ('read', 'search_read', 'read_group') and len(args) > 1:
+        fields = args[1]
+    return shape, list(fields) if fields else [], kwargs.get('limit')
+
+
+class SlowCallLog:
+    """
+    Registro de llamadas a Odoo por encima de un umbral.
+
+    Escribe en un archivo JSON-lines por proceso con rotación por tamaño
+    (varios RotatingFileHandler sobre el mismo archivo se pisan al rotar) y
+    mantiene en memoria el agregado por huella de los registros de este
+    proceso.
+    """
+
+    def __init__(self, path=None, threshold_ms=None, max_bytes=None, backups=None):
+        """
+        Args:
+            path (str, optional): Archivo de log (SLOW_CALL_LOG, por defecto
+                'instance/slow_odoo_calls.jsonl'; vacío lo desactiva)
+            threshold_ms (float, optional): Umbral en milisegundos
+                (SLOW_CALL_THRESHOLD_MS, por defecto 1000)
+            max_bytes (int, optional): Tamaño máximo antes de rotar
+                (SLOW_CALL_LOG_MAX_BYTES, por defecto 10 MB)
+            backups (int, optional): Archivos rotados a conservar
+                (SLOW_CALL_LOG_BACKUPS, por defecto 5)
+        """
+        self.path = path if path is not None else os.getenv('SLOW_CALL_LOG', os.path.join('instance', 'slow_odoo_calls.jsonl'))
+        self.threshold_ms = float(threshold_ms if threshold_ms is not None else os.getenv('SLOW_CALL_THRESHOLD_MS', 1000))
+        self.max_bytes = int(max_bytes if max_bytes is not None else os.getenv('SLOW_CALL_LOG_MAX_BYTES', 10 * 1024 * 1024))
+        self.backups = int(backups if backups is not None else os.getenv('SLOW_CALL_LOG_BACKUPS', 5))
+        self._logger = None
+        self._logger_pid = None
+        self._aggregates = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def process_path(self, pid=None):
+        """Archivo de este proceso: 'slow_odoo_calls.jsonl' -> 'slow_odoo_calls.<pid>.jsonl'."""
+        root, ext = os.path.splitext(self.path)
+        return f'{root}.{pid or os.getpid()}{ext}'
+
+    def _get_logger(self):
+        pid = os.getpid()
+        # Un proceso hijo (fork de gunicorn) abre su propio archivo
+        if self._logger is None or self._logger_pid != pid:
+            logger = logging.getLogger(f'slow_odoo_calls.{id(self)}.{pid}')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            path = self.process_path(pid)
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                handler = RotatingFileHandler(path, maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger.addHandler(handler)
+            except OSError as e:
+                print(f"[WARN] No se pudo abrir el log de llamadas lentas {path}: {e}")
+                logger.addHandler(logging.NullHandler())
+            self._logger = logger
+            self._logger_pid = pid
+        return self._logger
+
+    def record(self, model, method, args, kwargs, seconds, rows=0, bytes_sent=0, bytes_received=0,
+               service='', endpoint='', error=False):
+        """Registra la llamada si supera el umbral. Returns: dict | None (entrada escrita)"""
+        duration_ms = seconds * 1000
+        if not self.enabled or duration_ms < self.threshold_ms:
+            return None
+
+        shape, fields, limit = _call_details(method, args, kwargs)
+        key = fingerprint(model, method, shape)
+        entry = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'fingerprint': key,
+            'model': model,
+            'method': method,
+            'domain': shape,
+            'fields': fields,
+            'limit': limit,
+            'rows': rows,
+            'bytes_sent': bytes_sent,
+            'bytes_received': bytes_received,
+            'duration_ms': round(duration_ms, 1),
+            'service': service,
+            'endpoint': endpoint,
+            'error': bool(error),
+        }
+        with self._lock:
+            _accumulate(self._aggregates, entry)
+        self._get_logger().info(json.dumps(entry, ensure_ascii=False))
+        return entry
+
+    def summary(self):
+        """Agregado por huella de las llamadas lentas de este proceso."""
+        with self._lock:
+            return _summarize(self._aggregates)
+
+
+def _accumulate(aggregates, entry):
+    agg = aggregates.get(entry['fingerprint'])
+    if agg is None:
+        agg = aggregates[entry['fingerprint']] = {
+            'fingerprint': entry['fingerprint'], 'model': entry['model'], 'method': entry['method'],
+            'domain': entry['domain'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'rows': 0, 'bytes_received': 0, 'endpoints': set(),
+        }
+    agg['count'] += 1
+    agg['total_ms'] += entry['duration_ms']
+    agg['max_ms'] = max(agg['max_ms'], entry['duration_ms'])
+    agg['rows'] += entry.get('rows') or 0
+    agg['bytes_received'] += entry.get('bytes_received') or 0
+    if entry.get('endpoint'):
+        agg['endpoints'].add(entry['endpoint'])
+
+
+def _summarize(aggregates):
+    result = []
+    for agg in aggregates.values():
+        item = dict(agg, endpoints=sorted(agg['endpoints']))
+        item['total_ms'] = round(item['total_ms'], 1)
+        item['avg_ms'] = round(agg['total_ms'] / agg['count'], 1)
+        result.append(item)
+    result.sort(key=lambda x: x['total_ms'], reverse=True)
+    return result
+
+
+def aggregate_file(path):
+    """
+    Agrega por huella el log de todos los procesos: `path`, los archivos
+    por proceso (`<nombre>.<pid><ext>`) y sus rotaciones .1, .2, ...
+
+    Returns:
+        list: Huellas ordenadas por tiempo total
+    """
+    aggregates = {}
+    root, ext = os.path.splitext(path)
+    bases = [path] + sorted(glob.glob(f'{glob.escape(root)}.*{glob.escape(ext)}'))
+    paths = [f'{base}.{i}' if i else base for base in bases for i in range(0, 100)]
+    for p in paths:
+        if not os.path.exists(p):
+            continue
+        with open(p, encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    _accumulate(aggregates, json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+    return _summarize(aggregates)
+
+
+# Registro global del proceso
+slow_call_log = SlowCallLog()
+
+
+if __name__ == '__main__':
+    archivo = sys.argv[1] if len(sys.argv) > 1 else slow_call_log.path
+    for item in aggregate_file(archivo):
+        print(f"{item['total_ms']:>12,.0f} ms  {item['count']:>6}x  avg {item['avg_ms']:>9,.0f} ms  "
+              f"{item['model']}.{item['method']}  [{item['fingerprint']}]")
+        print(f"{'':>14}{item['domain']}")
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures compartidas: servidor Odoo falso (benchmarks/fake_odoo.py) en local.
+"""
+
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks.fake_odoo import FAKE_DB, FAKE_LOGIN, FAKE_PASSWORD, start_fake_odoo
+from services.odoo_connection import OdooConnection
+
+# Un mes cerrado dentro de los datos falsos (terminan a fin del mes actual)
+MES = (date.today().replace(day=1) - timedelta(days=40)).strftime('%Y-%m')
+
+
+@pytest.fixture(scope='session')
+def fake_odoo(tmp_path_factory):
+    """
+    Servidor falso con 5000 líneas y las variables de entorno de la app
+    apuntando a él (snapshots, warm store y locks en un directorio temporal).
+
+    Returns:
+        tuple: (FakeOdoo, OdooConnection)
+    """
+    server, fake, url = start_fake_odoo(lines=5000)
+    work = tmp_path_factory.mktemp('odoo')
+    env = {
+        'ODOO_URL': url, 'ODOO_DB': FAKE_DB, 'ODOO_USER': FAKE_LOGIN, 'ODOO_PASSWORD': FAKE_PASSWORD,
+        'SECRET_KEY': 'test', 'PREWARM_ENABLED': 'false', 'SAMPLING_PROFILER': 'false', 'SLOW_CALL_LOG': '',
+        'SALES_SNAPSHOT_DIR': str(work / 'snapshots'), 'PREWARM_DIR': str(work / 'warm'),
+        'PREWARM_LOCK': str(work / 'prewarm.lock'), 'DSO_TREND_CACHE': str(work / 'dso.json'),
+    }
+    previous = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        yield fake, OdooConnection()
+    finally:
+        server.shutdown()
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@pytest.fixture
+def manager(fake_odoo, tmp_path, monkeypatch):
+    """OdooManager sobre el servidor falso, con snapshots en un directorio propio."""
+    from odoo_manager import OdooManager
+    monkeypatch.setenv('SALES_SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    return OdooManager()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de los hooks de la app Flask (Server-Timing, token de métricas).
+"""
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def client(fake_odoo):
+    import app as app_module
+    app_module.PROFILE_ADMINS = {'admin'}
+    return app_module.app.test_client()
+
+
+def _como(client, username):
+    with client.session_transaction() as session:
+        session.clear()
+        if username:
+            session['username'] = username
+
+
+def test_server_timing_does_not_leak_to_the_next_request(client, monkeypatch):
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+    _como(client, 'admin')
+    assert 'Server-Timing' in client.get('/login').headers
+
+    # El mismo hilo atiende luego a un usuario normal y a uno anónimo
+    _como(client, 'bob')
+    assert 'Server-Timing' not in client.get('/login').headers
+    _como(client, None)
+    assert 'Server-Timing' not in client.get('/login').headers
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 's3creto')
+    _como(client, 'bob')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer otro'}).status_code == 401
+    assert client.get('/metrics?token=s3cret').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer s3creto'}).status_code == 200
+    assert client.get('/metrics?token=s3creto').status_code == 200
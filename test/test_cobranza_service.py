@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de CobranzaService.
+"""
+
+import xmlrpc.client
+
+import numpy as np
+import pytest
+
+from services.cobranza_service import CobranzaService
+
+
+class _SoloJulio:
+    """Conexión mínima: una sola línea por cobrar de 1000 en julio de 2026."""
+
+    def is_connected(self):
+        return True
+
+    def _call(self, model, method, args, kwargs):
+        field = args[2][0]
+        if model == 'account.move.line':
+            return [{'balance': 1000.0, '__range': {field: {'from': '2026-07-01', 'to': '2026-08-01'}}}]
+        return []
+
+
+def test_dso_trend_carries_balance_through_months_without_movements(tmp_path):
+    service = CobranzaService(_SoloJulio(), dso_cache_path=str(tmp_path / 'dso.json'))
+
+    trend = service._dso_mensual_live(4, '2026-09-30')
+
+    assert [point['mes'] for point in trend] == ['2026-06', '2026-07', '2026-08', '2026-09']
+    assert [point['cxc'] for point in trend] == [0.0, 1000.0, 1000.0, 1000.0]
+    # Los meses cerrados se leen del archivo con el mismo saldo
+    assert [point['cxc'] for point in service._dso_mensual_live(4, '2026-09-30')] == [0.0, 1000.0, 1000.0, 1000.0]
+
+
+FILTROS = [
+    (None, None, None),
+    ('2025-03-01', '2025-12-31', None),
+    ('2025-03-01', '2025-12-31', 'not_paid'),
+    (None, None, 'partial'),
+    ('2026-01-01', None, 'paid'),
+]
+
+
+def _paridad(connection):
+    python = CobranzaService(connection, kpi_mode='python')
+    grupos = CobranzaService(connection, kpi_mode='read_group')
+    for filtro in FILTROS:
+        assert CobranzaService._diferencias(python.get_resumen_internacional(*filtro),
+                                            grupos.get_resumen_internacional(*filtro)) == [], filtro
+        assert python._verificar_paridad(python.get_resumen_internacional(*filtro),
+                                         grupos.get_resumen_internacional(*filtro), filtro) == []
+
+
+def test_read_group_summary_matches_python(fake_odoo):
+    _paridad(fake_odoo[1])
+
+
+def test_read_group_top15_merges_partners_sharing_a_name(fake_odoo):
+    fake, connection = fake_odoo
+    partners = fake.db['res.partner']
+    names = partners.fields['name'].data
+    move_partners = fake.db['account.move'].fields['partner_id'].data
+    original_names, original_partners = names.copy(), move_partners.copy()
+    try:
+        # Facturas repartidas entre todos los clientes (más de 15 con deuda)
+        # y dos clientes por nombre: el top 15 se une por nombre antes de cortar
+        move_partners[:] = np.arange(len(move_partners)) % partners.size + 1
+        names[:] = [f'Cliente {i % (partners.size // 2)}' for i in range(len(names))]
+        partners._display = None
+        _paridad(connection)
+    finally:
+        names[:] = original_names
+        move_partners[:] = original_partners
+        partners._display = None
+
+
+def test_top15_only_counts_customers_from_other_countries(fake_odoo):
+    fake, connection = fake_odoo
+    moves = fake.db['account.move']
+    country = moves.fields['country_code'].data
+    team = moves.fields['team_id'].data
+    residual = moves.fields['amount_residual'].data
+    original_team, original_residual = team.copy(), residual.copy()
+    # Facturas peruanas de un cliente con deuda, en el equipo VENTA INTERNACIONAL
+    pe = np.flatnonzero((country == 'PE') & (moves.fields['state'].data == 'posted') & (residual > 0))
+    partner_id = moves.fields['partner_id'].data[pe[0]]
+    mias = pe[moves.fields['partner_id'].data[pe] == partner_id]
+    partner_name = fake.db['res.partner'].fields['name'].data[partner_id - 1]
+    antes = CobranzaService(connection, kpi_mode='python').get_resumen_internacional()
+    try:
+        team[mias] = 2
+        residual[mias] = 10 ** 9
+        for mode in ('python', 'read_group'):
+            resumen = CobranzaService(connection, kpi_mode=mode).get_resumen_internacional()
+            # Cuentan en los KPIs (país o equipo) pero no en el top 15 (solo país)
+            assert resumen['kpis']['monto_vencido'] + resumen['kpis']['monto_vigente'] > 10 ** 9, mode
+            assert partner_name not in resumen['top15']['clientes'], mode
+            assert resumen['top15'] == antes['top15'], mode
+    finally:
+        team[:] = original_team
+        residual[:] = original_residual
+
+
+def test_transient_read_group_error_keeps_read_group_enabled(fake_odoo, monkeypatch):
+    connection = fake_odoo[1]
+    service = CobranzaService(connection, kpi_mode='read_group')
+    expected = CobranzaService(connection, kpi_mode='python').get_resumen_internacional()
+    original = connection._call
+
+    def failing(model, method, *args, **kwargs):
+        if method == 'read_group':
+            raise TimeoutError('timed out')
+        return original(model, method, *args, **kwargs)
+
+    monkeypatch.setattr(connection, '_call', failing)
+    assert CobranzaService._diferencias(expected, service.get_resumen_internacional()) == []
+    assert service._read_group_ok
+
+    def unsupported(model, method, *args, **kwargs):
+        if method == 'read_group':
+            raise xmlrpc.client.Fault(1, "ValueError: Invalid field 'country_code' on model 'account.move'")
+        return original(model, method, *args, **kwargs)
+
+    monkeypatch.setattr(connection, '_call', unsupported)
+    service._summaries.clear()
+    assert CobranzaService._diferencias(expected, service.get_resumen_internacional()) == []
+    assert not service._read_group_ok
+
+
+def test_failed_invoice_download_is_not_cached(fake_odoo, monkeypatch):
+    connection = fake_odoo[1]
+    service = CobranzaService(connection, kpi_mode='python')
+    expected = CobranzaService(connection, kpi_mode='python').get_resumen_internacional()
+    original = connection._call
+
+    def failing(model, method, *args, **kwargs):
+        raise TimeoutError('timed out')
+
+    monkeypatch.setattr(connection, '_call', failing)
+    assert service.get_resumen_internacional()['kpis']['total_facturas'] == 0
+
+    monkeypatch.setattr(connection, '_call', original)
+    assert CobranzaService._diferencias(expected, service.get_resumen_internacional()) == []
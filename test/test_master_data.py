@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de MasterDataCache contra el servidor Odoo falso.
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+
+from services.master_data import MasterDataCache
+
+FIELDS = ['name', 'default_code']
+
+
+def _contar_llamadas(connection, monkeypatch):
+    calls = []
+    original = connection._call
+
+    def spy(model, method, *args, **kwargs):
+        calls.append((model, method))
+        return original(model, method, *args, **kwargs)
+
+    monkeypatch.setattr(connection, '_call', spy)
+    return calls
+
+
+def test_delta_refresh_picks_up_an_edit(fake_odoo, monkeypatch):
+    fake, connection = fake_odoo
+    products = fake.db['product.product']
+    names = products.fields['name'].data
+    write_dates = products.fields['write_date'].data
+    original_name, original_date = names[0], write_dates[0]
+    cache = MasterDataCache(connection, refresh_interval=0.05)
+    assert cache.get_records('product.product', [1, 2], FIELDS)[1]['name'] == original_name
+    try:
+        names[0] = 'PRODUCTO EDITADO'
+        write_dates[0] = np.datetime64(datetime.utcnow().replace(microsecond=0), 's')
+
+        calls = _contar_llamadas(connection, monkeypatch)
+        # Dentro del intervalo se sirve la caché sin consultar a Odoo
+        assert cache.get_records('product.product', [1, 2], FIELDS)[1]['name'] == original_name
+        assert calls == []
+
+        time.sleep(0.06)
+        records = cache.get_records('product.product', [1, 2], FIELDS)
+        assert records[1]['name'] == 'PRODUCTO EDITADO'
+        assert records[2]['name'] == names[1]
+        # Solo la consulta por write_date, no una relectura de los ids
+        assert calls == [('product.product', 'search_read')]
+    finally:
+        names[0], write_dates[0] = original_name, original_date
+
+
+def test_missing_ids_are_cached_as_absent(fake_odoo, monkeypatch):
+    connection = fake_odoo[1]
+    cache = MasterDataCache(connection)
+    calls = _contar_llamadas(connection, monkeypatch)
+    assert cache.get_records('res.partner', [1, 10 ** 7], ['name']).keys() == {1}
+    assert cache.get_records('res.partner', [1, 10 ** 7], ['name']).keys() == {1}
+    assert calls == [('res.partner', 'search_read')]
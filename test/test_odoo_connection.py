@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la paginación de OdooConnection contra el servidor falso.
+"""
+
+DOMAIN = [('parent_state', '=', 'posted')]
+
+
+def test_unlimited_read_returns_every_record_by_id(fake_odoo):
+    connection = fake_odoo[1]
+    ids = [r['id'] for r in connection.iter_search_read('account.move.line', DOMAIN, ['id'], page_size=700)]
+    expected = connection._call('account.move.line', 'search', [DOMAIN], {})
+    assert ids == sorted(expected)
+
+
+def test_capped_read_keeps_the_requested_order(fake_odoo):
+    connection = fake_odoo[1]
+    order = 'date desc, id desc'
+    expected = connection._call('account.move.line', 'search_read', [DOMAIN],
+                                {'fields': ['date'], 'limit': 1500, 'order': order})
+    capped = connection.search_read_all('account.move.line', DOMAIN, ['date'], page_size=400,
+                                        limit=1500, order=order)
+    assert [r['id'] for r in capped] == [r['id'] for r in expected]
+    # Las más recientes, no las primeras por id
+    assert capped[0]['date'] == max(r['date'] for r in connection.search_read_all(
+        'account.move.line', DOMAIN, ['date']))
@@ -1 +1,101 @@
- 
\ No newline at end of file
+# -*- coding: utf-8 -*-
+"""
+Pruebas de OdooManager contra el servidor Odoo falso.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from conftest import MES
+from utils.sales_aggregation import aggregate_sales
+
+
+@pytest.fixture
+def rutas_por_orden_y_producto(fake_odoo):
+    """
+    Misma ruta para todas las líneas de orden de un mismo pedido y producto.
+
+    get_sales_lines asigna la ruta por (pedido, producto) y read_group por
+    la línea de orden de cada línea de factura (sale_line_ids): solo
+    coinciden si una factura no repite un producto con rutas distintas.
+    """
+    sale_lines = fake_odoo[0].db['sale.order.line']
+    route = sale_lines.fields['route_id'].data
+    original = route.copy()
+    key = sale_lines.fields['order_id'].data + sale_lines.fields['product_id'].data
+    route[:] = np.where(key % 3 == 0, 18, 5)
+    try:
+        yield
+    finally:
+        route[:] = original
+
+
+def _sin_ruido(value):
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {k: _sin_ruido(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_sin_ruido(v) for v in value]
+    return value
+
+
+def test_dashboard_read_group_cube_matches_full_cube(manager, rutas_por_orden_y_producto):
+    calls = []
+    original = manager.connection._call
+
+    def spy(model, method, *args, **kwargs):
+        calls.append((model, method))
+        return original(model, method, *args, **kwargs)
+
+    manager.connection._call = spy
+    grupos = aggregate_sales(manager.get_dashboard_sales_cube(MES))
+    assert ('account.move.line', 'read_group') in calls
+    assert ('account.move.line', 'search_read') not in calls
+
+    completo = aggregate_sales(manager.get_sales_cube(MES))
+    assert completo['ventas_por_linea'] and completo['ventas_ruta_por_linea']
+    # El cubo por producto no tiene vendedor
+    for key in ('ventas_por_linea', 'ventas_ruta_por_linea', 'ventas_ipn_por_linea',
+                'top_productos', 'ciclo_vida', 'forma_farmaceutica'):
+        assert _sin_ruido(grupos[key]) == _sin_ruido(completo[key]), key
+
+    # Con el cubo completo en memoria /dashboard lo reutiliza
+    assert manager.get_dashboard_sales_cube(MES) is manager.get_sales_cube(MES)
+
+
+def test_dashboard_falls_back_to_full_cube_without_read_group(manager, monkeypatch):
+    original = manager.connection._call
+
+    def without_read_group(model, method, *args, **kwargs):
+        if method == 'read_group':
+            raise RuntimeError('read_group no disponible')
+        return original(model, method, *args, **kwargs)
+
+    monkeypatch.setattr(manager.connection, '_call', without_read_group)
+    assert len(manager.get_dashboard_sales_cube(MES))
+    assert manager.sales_cubes.get(MES) is not None
+
+
+def test_sales_dashboard_data_is_the_same_from_cube_and_from_lines(manager, monkeypatch):
+    inicio, _ = manager._month_range(MES)
+    siguiente = (date.fromisoformat(inicio) + timedelta(days=31)).strftime('%Y-%m')
+    fin = manager._month_range(siguiente)[1]
+
+    desde_cubo = manager.get_sales_dashboard_data(inicio, fin)
+    assert [m['month'] for m in desde_cubo['sales_by_month']] == [MES, siguiente]
+
+    # Mismo rango por el camino de líneas (el de rangos parciales y filtros)
+    monkeypatch.setattr(manager, '_whole_months', lambda date_from, date_to: None)
+    desde_lineas = manager.get_sales_dashboard_data(inicio, fin)
+
+    assert _sin_ruido(desde_lineas) == _sin_ruido(desde_cubo)
+    # Saldos netos: las notas de crédito restan
+    nacionales = [
+        l for l in manager.get_sales_lines(date_from=inicio, date_to=fin, limit=None)
+        if 'INTERNACIONAL' not in ((l['sales_channel_id'] or [0, ''])[1] + (l['commercial_line_national_id'] or [0, ''])[1]).upper()
+    ]
+    assert any(l['balance'] < 0 for l in nacionales)
+    assert desde_cubo['total_sales'] == pytest.approx(sum(l['balance'] for l in nacionales))
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del pool de conexiones XML-RPC.
+"""
+
+import pytest
+
+from services import odoo_transport
+from services.odoo_transport import OdooConnectionPool
+
+
+def test_failed_slot_construction_does_not_use_up_the_pool(monkeypatch):
+    pool = OdooConnectionPool('http://127.0.0.1:9/xmlrpc/2/object', size=1, wait_timeout=0.1)
+    original = odoo_transport._PoolSlot
+    fallos = []
+
+    def slot_que_falla(*args, **kwargs):
+        if len(fallos) < 3:
+            fallos.append(1)
+            raise OSError('no se pudo crear el transporte')
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(odoo_transport, '_PoolSlot', slot_que_falla)
+    for _ in range(3):
+        with pytest.raises(OSError):
+            with pool.connection():
+                pass
+    assert pool.stats()['created'] == 0
+
+    # El único slot sigue disponible
+    with pool.connection() as proxy:
+        assert proxy is not None
+    assert pool.stats() == {'size': 1, 'created': 1, 'in_use': 0, 'idle': 1}
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del cubo de ventas: sus rollups deben coincidir con sumar las líneas.
+"""
+
+import pytest
+
+from conftest import MES
+from utils.sales_aggregation import aggregate_sales
+from utils.sales_cube import SalesCube
+
+
+def _internacional(line):
+    linea = (line.get('commercial_line_national_id') or [0, ''])[1].upper()
+    canal = (line.get('sales_channel_id') or [0, ''])[1].upper()
+    return 'INTERNACIONAL' in linea or 'INTERNACIONAL' in canal
+
+
+def _sumar(lines, key):
+    totals = {}
+    for line in lines:
+        name = key(line)
+        if name:
+            totals[name] = totals.get(name, 0.0) + line['balance']
+    return {k: pytest.approx(v) for k, v in totals.items() if v != 0}
+
+
+def test_cube_rollups_match_the_raw_lines(manager):
+    lines = manager.get_sales_lines_month(MES)
+    nacionales = [line for line in lines if not _internacional(line)]
+    linea = lambda line: (line.get('commercial_line_national_id') or [0, ''])[1].upper()
+    ruta = [line for line in nacionales if (line.get('route_id') or [0])[0] in (18, 19)]
+    assert lines and ruta and len(nacionales) < len(lines)
+
+    agregados = aggregate_sales(manager.get_sales_cube(MES))
+    assert agregados['ventas_por_linea'] == _sumar(nacionales, linea)
+    assert agregados['ventas_ruta_por_linea'] == _sumar(ruta, linea)
+    assert agregados['ventas_ipn_por_linea'] == _sumar(
+        [line for line in nacionales if line.get('product_life_cycle') == 'nuevo'], linea)
+    assert agregados['ventas_por_vendedor'] == _sumar(
+        nacionales, lambda line: str(line['invoice_user_id'][0]) if line.get('invoice_user_id') else '')
+
+    # El cubo conserva las medidas de todas las líneas
+    totals = manager.get_sales_cube(MES).totals()
+    assert totals['balance'] == pytest.approx(sum(line['balance'] for line in lines))
+    assert totals['quantity'] == pytest.approx(sum(line['quantity'] for line in lines))
+    assert totals['line_count'] == len(lines)
+
+
+def test_concatenated_months_match_one_cube_per_month(manager):
+    anterior = f"{int(MES[:4]) - (MES[5:] == '01')}-{12 if MES[5:] == '01' else int(MES[5:]) - 1:02d}"
+    rango = manager.get_sales_cube_range([anterior, MES])
+    assert rango.rollup('mes') == pytest.approx({
+        mes: manager.get_sales_cube(mes).totals()['balance'] for mes in (anterior, MES)
+    })
+    lineas = manager.get_sales_lines_month(anterior) + manager.get_sales_lines_month(MES)
+    por_producto = SalesCube.from_lines(lineas, 'todo').rollup('producto')
+    assert rango.rollup('producto') == pytest.approx(por_producto)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de los snapshots de ventas de meses cerrados contra el servidor falso.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from conftest import MES
+from services.sales_snapshots import SalesSnapshotStore
+
+
+@pytest.fixture
+def snapshots(manager, tmp_path):
+    # Se verifica la versión del mes en cada lectura
+    manager.sales_snapshots = SalesSnapshotStore(str(tmp_path / 'snapshots'), check_interval=0)
+    return manager
+
+
+def _lecturas_de_lineas(manager, monkeypatch):
+    """Registra las lecturas completas de líneas (no las de versión, con limit=1)."""
+    reads = []
+    original = manager.connection._call
+
+    def spy(model, method, *args, **kwargs):
+        if model == 'account.move.line' and method == 'search_read' and args[1].get('limit') != 1:
+            reads.append(args)
+        return original(model, method, *args, **kwargs)
+
+    monkeypatch.setattr(manager.connection, '_call', spy)
+    return reads
+
+
+def _mes_lines(fake):
+    lines = fake.db['account.move.line']
+    moves = fake.db['account.move']
+    fecha = moves.fields['invoice_date'].data[lines.fields['move_id'].data - 1]
+    mes = fecha.astype('datetime64[M]') == np.datetime64(MES, 'M')
+    producto = lines.fields['display_type'].data == 'product'
+    return np.flatnonzero(mes & producto & (lines.fields['parent_state'].data == 'posted'))
+
+
+def test_snapshot_is_reused_while_the_month_version_is_unchanged(snapshots, monkeypatch):
+    lines = snapshots.get_sales_lines_month(MES)
+    assert lines and snapshots.sales_snapshots._load(MES) is not None
+
+    reads = _lecturas_de_lineas(snapshots, monkeypatch)
+    assert snapshots.get_sales_lines_month(MES) == lines
+    assert reads == []
+
+
+def test_snapshot_is_rebuilt_when_a_line_is_edited(snapshots, fake_odoo, monkeypatch):
+    fake = fake_odoo[0]
+    fields = fake.db['account.move.line'].fields
+    row = _mes_lines(fake)
+    original = fields['quantity'].data[row].copy(), fields['write_date'].data[row].copy()
+    antes = snapshots.get_sales_lines_month(MES)
+    try:
+        fields['quantity'].data[row] = 12345.0
+        fields['write_date'].data[row] = np.datetime64(datetime.utcnow().replace(microsecond=0), 's')
+
+        reads = _lecturas_de_lineas(snapshots, monkeypatch)
+        despues = snapshots.get_sales_lines_month(MES)
+        assert reads
+        assert len(despues) == len(antes)
+        assert {line['quantity'] for line in despues} == {12345.0}
+    finally:
+        fields['quantity'].data[row], fields['write_date'].data[row] = original
+
+
+def test_snapshot_is_rebuilt_when_the_line_count_changes(snapshots, fake_odoo, monkeypatch):
+    fake = fake_odoo[0]
+    state = fake.db['account.move'].fields['state'].data
+    move = fake.db['account.move.line'].fields['move_id'].data[_mes_lines(fake)[0]] - 1
+    original = state[move]
+    antes = snapshots.get_sales_lines_month(MES)
+    try:
+        # Anular una factura quita sus líneas sin tocar el write_date
+        state[move] = 'cancel'
+
+        reads = _lecturas_de_lineas(snapshots, monkeypatch)
+        despues = snapshots.get_sales_lines_month(MES)
+        assert reads
+        assert 0 < len(despues) < len(antes)
+    finally:
+        state[move] = original
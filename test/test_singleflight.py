@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la coalescencia de lecturas idénticas y de StampedeCache.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_odoo import Latency
+from services.singleflight import StampedeCache
+
+HILOS = 8
+
+
+def _a_la_vez(func, hilos=HILOS):
+    barrier = threading.Barrier(hilos)
+
+    def run(i):
+        barrier.wait()
+        return func(i)
+
+    with ThreadPoolExecutor(hilos) as pool:
+        return list(pool.map(run, range(hilos)))
+
+
+def test_concurrent_identical_reads_make_one_backend_call(fake_odoo, monkeypatch):
+    fake, connection = fake_odoo
+    # Latencia para que las llamadas se solapen
+    monkeypatch.setattr(fake, 'latency', Latency(base_ms=200))
+    before = fake.calls
+
+    results = _a_la_vez(lambda i: connection._call(
+        'res.partner', 'search_read', [[('country_code', '=', 'PE')]], {'fields': ['name'], 'limit': 20}))
+
+    assert fake.calls - before == 1
+    assert all(r == results[0] for r in results) and len(results[0]) == 20
+    # Cada llamador recibe su propia copia
+    assert len({id(r) for r in results}) == HILOS
+
+
+def test_different_reads_are_not_coalesced(fake_odoo, monkeypatch):
+    fake, connection = fake_odoo
+    monkeypatch.setattr(fake, 'latency', Latency(base_ms=100))
+    before = fake.calls
+
+    _a_la_vez(lambda i: connection._call(
+        'res.partner', 'search_read', [[('id', '=', i + 1)]], {'fields': ['name']}), hilos=4)
+
+    assert fake.calls - before == 4
+
+
+def test_stampede_cache_loads_an_expired_key_once():
+    cache = StampedeCache(ttl=60)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.2)
+        return {'valor': len(loads)}
+
+    results = _a_la_vez(lambda i: cache.get_or_load('clave', loader))
+
+    assert len(loads) == 1
+    assert all(r == {'valor': 1} for r in results)
+    assert cache.get_or_load('clave', loader) == {'valor': 1} and len(loads) == 1
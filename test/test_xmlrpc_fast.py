@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Equivalencia de services.xmlrpc_fast.loads con xmlrpc.client.loads.
+"""
+
+import xmlrpc.client
+
+import pytest
+
+from services import xmlrpc_fast
+
+
+def _response(value):
+    return xmlrpc.client.dumps((value,), methodresponse=True, allow_none=True).encode('utf-8')
+
+
+RECORDS = [
+    {'id': 1, 'name': 'INV/2026/0001', 'partner_id': [7, 'ACME, S.A.'], 'amount_residual': 1250.5,
+     'payment_state': 'not_paid', 'invoice_date_due': False, 'ref': None},
+    {'id': 2, 'name': 'INV/2026/0002', 'partner_id': [7, 'ACME, S.A.'], 'amount_residual': 0.0,
+     'payment_state': 'paid', 'invoice_date_due': '2026-03-31', 'ref': ''},
+]
+
+
+@pytest.mark.parametrize('value', [
+    'ACME,]',
+    'a,}b',
+    ['x,', ']'],
+    {'name': 'Cliente,}', 'tags': ['a,]', 'b']},
+    [{'name': 'x,]', 'lines': [1, 'a,}']}],
+    'comillas " y barra \\ y tab\t',
+    'línea\nsiguiente',
+    '\n',
+    '',
+    '<b>&amp; "entidades"</b>',
+    'ñandú, café y 東京',
+    [1, -2, 3.5, 2.0, True, False, None],
+    {'vacío': {}, 'lista': [], 'anidado': [[1, [2, {'k': 'v'}]]]},
+    RECORDS,
+])
+def test_loads_equals_xmlrpc_client(value):
+    body = _response(value)
+    assert xmlrpc_fast.loads(body) == xmlrpc.client.loads(body)[0]
+
+
+def test_fault_is_raised():
+    body = xmlrpc.client.dumps(xmlrpc.client.Fault(1, 'Access Denied'), methodresponse=True).encode('utf-8')
+    with pytest.raises(xmlrpc.client.Fault) as fast:
+        xmlrpc_fast.loads(body)
+    with pytest.raises(xmlrpc.client.Fault) as reference:
+        xmlrpc.client.loads(body)
+    assert (fast.value.faultCode, fast.value.faultString) == (reference.value.faultCode, reference.value.faultString)
+
+
+@pytest.mark.parametrize('name', ['ACME, S.A.', 'ACME,] S.A.'])
+def test_many2one_pairs_share_the_name_but_not_the_list(name):
+    # 'ACME,]' obliga al nivel expat
+    records = [dict(record, partner_id=[7, name]) for record in RECORDS]
+    partners = [record['partner_id'] for record in xmlrpc_fast.loads(_response(records))[0]]
+    assert partners[0] is not partners[1]
+    assert partners[0][1] is partners[1][1]
+    partners[0][1] = 'OTRO'
+    assert partners[1] == [7, name]
+
+
+def test_odoo_records_use_json_level():
+    # Las respuestas habituales no caen al nivel expat
+    assert xmlrpc_fast._to_json(_response(RECORDS))
+    with pytest.raises(xmlrpc_fast._Unsupported):
+        xmlrpc_fast._to_json(_response('ACME,]'))
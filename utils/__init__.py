@@ -5,6 +5,8 @@ Utilidades de la aplicación Dashboard Cobranzas.
 Este paquete contiene funciones auxiliares:
 - calculators: Cálculos financieros (mora, DSO, CEI, aging)
 - filters: Filtros de datos (Nacional/Internacional)
+- sales_cube: Cubo materializado de ventas (mes × línea × vendedor × producto...)
+- sales_aggregation: Desgloses de ventas de los dashboards sobre el cubo
 """
 
 from .calculators import (
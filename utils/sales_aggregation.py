@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de agregación de ventas para los dashboards.
+
+Calcula todos los desgloses de ventas (línea comercial, ruta 18/19, IPN,
+top de productos, ciclo de vida, forma farmacéutica y vendedor) como
+rollups del cubo de ventas (`utils.sales_cube`). Lo usan /dashboard y
+/dashboard_linea para que ambos apliquen exactamente los mismos criterios.
+"""
+
+from .sales_cube import SalesCube
+
+
+def _nonzero(totals):
+    """Descarta claves vacías y totales en cero (como los bucles originales)."""
+    return {str(k): float(v) for k, v in totals.items() if k != '' and v != 0}
+
+
+def _sorted_records(totals, key_name):
+    items = sorted(_nonzero(totals).items(), key=lambda x: x[1], reverse=True)
+    return [{key_name: k, 'venta': v} for k, v in items]
+
+
+def aggregate_sales(source, linea=None, top_n=7):
+    """
+    Calcula todos los desgloses de ventas de los dashboards.
+
+    Se excluyen siempre las ventas internacionales (línea "VENTA
+    INTERNACIONAL" o canal con "INTERNACIONAL"). Si se indica `linea`, solo
+    se consideran las ventas de esa línea comercial que tienen vendedor
+    (vista de /dashboard_linea).
+
+    Args:
+        source (SalesCube | list): Cubo de ventas o líneas de venta
+        linea (str, optional): Nombre de línea comercial a filtrar
+        top_n (int): Cantidad de productos del top
+
+    Returns:
+        dict: {
+            'ventas_por_linea', 'ventas_ruta_por_linea', 'ventas_ipn_por_linea',
+            'ventas_por_vendedor', 'ventas_ruta_por_vendedor', 'ventas_ipn_por_vendedor':
+                dict nombre/id -> venta,
+            'top_productos': [{'nombre', 'venta', 'ciclo_vida'}],
+            'ciclo_vida': [{'ciclo', 'venta'}],
+            'forma_farmaceutica': [{'forma', 'venta'}],
+        }
+    """
+    cube = source if isinstance(source, SalesCube) else SalesCube.from_lines(source, 'lineas')
+
+    cube = cube.slice(internacional=False)
+    if linea is not None:
+        cube = cube.slice(linea=linea.upper(), vendedor=bool)
+
+    ruta = cube.slice(ruta=True)
+    ipn = cube.slice(ciclo='nuevo')
+
+    por_producto = _nonzero(cube.rollup('producto'))
+    top = sorted(por_producto.items(), key=lambda x: x[1], reverse=True)[:top_n]
+
+    # Ciclo de vida predominante de cada producto del top
+    ciclo_por_producto = {}
+    for (producto, ciclo), venta in cube.slice(producto=[n for n, _ in top]).rollup(['producto', 'ciclo']).items():
+        if producto not in ciclo_por_producto or venta > ciclo_por_producto[producto][1]:
+            ciclo_por_producto[producto] = (ciclo, venta)
+
+    return {
+        'ventas_por_linea': _nonzero(cube.rollup('linea')),
+        'ventas_ruta_por_linea': _nonzero(ruta.rollup('linea')),
+        'ventas_ipn_por_linea': _nonzero(ipn.rollup('linea')),
+        'ventas_por_vendedor': _nonzero(cube.rollup('vendedor')),
+        'ventas_ruta_por_vendedor': _nonzero(ruta.rollup('vendedor')),
+        'ventas_ipn_por_vendedor': _nonzero(ipn.rollup('vendedor')),
+        'top_productos': [
+            {'nombre': nombre, 'venta': venta, 'ciclo_vida': ciclo_por_producto.get(nombre, ('No definido',))[0]}
+            for nombre, venta in top
+        ],
+        'ciclo_vida': _sorted_records(cube.rollup('ciclo'), 'ciclo'),
+        'forma_farmaceutica': _sorted_records(cube.rollup('forma'), 'forma'),
+    }
+